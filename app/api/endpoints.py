@@ -1,22 +1,161 @@
 """API endpoints for GFF conversion service"""
-from typing import Dict, Any
-from fastapi import APIRouter, File, Form, HTTPException, UploadFile
-from fastapi.responses import JSONResponse, Response
+from typing import Dict, Any, List, Optional
+from fastapi import APIRouter, File, Form, Header, HTTPException, Query, UploadFile
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
 import json
 import os
+import struct
 
-from ..services.gff_parser import GffParser, GffParserError
-from ..services.gff_converter import GffConverter, GffConverterError
+from ..services.batch import (
+    ARCHIVE_EXTENSIONS,
+    INVALID_FORMAT,
+    BatchBudget,
+    BatchError,
+    convert_gff_file,
+    convert_many,
+    get_process_pool,
+    is_gff_name,
+    iter_archive,
+    stream_ndjson,
+    stream_zip,
+)
+from ..services.erf_reader import ErfArchive, ErfReaderError
+from ..services.field_index import SEARCH_LIMIT, SEARCH_MAX_LIMIT, FieldIndex, FieldIndexError
+from ..services.gff_parser import GffInputError, GffParser, GffParserError
+from ..services.gff_converter import GffConverter, GffConverterError, loads_json, loads_msgpack
+from ..services.gff_diff import diff_gff
+from ..services.gff_schema import SCHEMAS
+from ..services.gff_patch import GffPatchError, parse_operations, patch_gff
+from ..services.gff_view import GffView, GffViewError, lookup_json, validate_gff
+from ..services.json_stream import JsonStreamError, stream_json_to_gff
+from ..services.metrics import stage_timer
+from ..services.msgpack_codec import MSGPACK_MEDIA_TYPE, MSGPACK_MEDIA_TYPES, MsgpackError, accepts_msgpack
+from ..services.profiling import ProfileStore, ProfilingError, admin_token_matches
+from ..services.result_cache import CachedResult, ConversionCache, LruCache, content_key
 from ..services.sqlite_handler import SqliteHandler, SqliteHandlerError
+from ..services.sqlite_query import (
+    SqliteQueryError,
+    SqliteQueryTimeout,
+    iter_ndjson_rows,
+    open_database,
+    run_query,
+)
+from ..services.tlk_reader import shared_resolver
+from ..services.upload import read_upload, too_large, upload_size
+from ..services.worker_pool import WorkerPool, WorkerPoolError, WorkerPoolFull
 from ..models.gff_models import SUPPORTED_FORMATS
+from .. import config
 
 
 router = APIRouter()
-gff_parser = GffParser()
-gff_converter = GffConverter()
+gff_parser = GffParser(SCHEMAS)
+gff_converter = GffConverter(SCHEMAS)
 sqlite_handler = SqliteHandler()
+worker_pool = WorkerPool.from_config()
+batch_pool = WorkerPool.batch_from_config()
+result_cache = ConversionCache(
+    config.CACHE_MAX_BYTES,
+    disk_dir=config.CACHE_DIR,
+    disk_max_bytes=config.CACHE_DISK_MAX_BYTES
+)
+# Decompressed embedded databases, keyed by the content hash of the GFF they came from
+sqlite_cache: LruCache[bytes] = LruCache(config.SQLITE_CACHE_MAX_BYTES)
+# Recent profiles captured for requests sent with X-Profile
+profile_store = ProfileStore(config.PROFILE_HISTORY)
+# Field values of the files under config.INDEX_SOURCES, when enabled
+field_index: Optional[FieldIndex] = FieldIndex(config.INDEX_PATH) if config.INDEX_PATH else None
+# Converter that also inlines talk table text for CExoLocString StrRefs
+tlk_converter: Optional[GffConverter] = GffConverter(
+    SCHEMAS, shared_resolver(config.TLK_PATH, config.TLK_CUSTOM_PATH, config.TLK_CACHE_BYTES)
+) if config.TLK_PATH else None
 
-MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+MAX_UPLOAD_SIZES = config.MAX_UPLOAD_SIZES
+
+# Request body limit per route (path below the /api/v1 prefix), enforced by
+# UploadLimitMiddleware while the body is still arriving
+ROUTE_UPLOAD_KINDS = {
+    "/convert/gff-to-json": ("gff",),
+    "/convert/json-to-gff": ("json",),
+    "/convert/batch": ("batch",),
+    "/query": ("gff",),
+    "/patch": ("gff",),
+    "/diff": ("gff", "gff"),
+    "/convert/sqlite-embed": ("gff", "sqlite"),
+    "/convert/sqlite-extract": ("gff",),
+    "/sqlite/query": ("gff",),
+}
+
+
+def upload_limit_for(path: str) -> Optional[int]:
+    """Largest accepted request body for a path, or None if it takes no uploads"""
+    if not path.startswith("/api/v1/"):
+        return None
+    route = path[len("/api/v1"):]
+    if route.startswith("/erf/"):
+        return MAX_UPLOAD_SIZES["erf"]
+    kinds = ROUTE_UPLOAD_KINDS.get(route)
+    if kinds is None:
+        return None
+    return sum(MAX_UPLOAD_SIZES[kind] for kind in kinds)
+
+GFF_DOWNLOAD_HEADERS = {"Content-Disposition": 'attachment; filename="converted.gff"'}
+# gff-to-json picks JSON or MessagePack from the Accept header
+VARY_ACCEPT = {"Vary": "Accept"}
+
+
+def worker_pool_http_error(e: WorkerPoolError) -> HTTPException:
+    """503 with Retry-After when the pool is saturated, 504 when a stage times out"""
+    if isinstance(e, WorkerPoolFull):
+        return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    return HTTPException(status_code=504, detail=str(e))
+
+
+def etag_matches(if_none_match: Optional[str], key: str) -> bool:
+    """Whether an If-None-Match header lists the ETag for key"""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == "*" or tag.strip('"') == key:
+            return True
+    return False
+
+
+def cached_response(key: str, result: CachedResult, hit: bool, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Response for a cached or freshly cached conversion result"""
+    return Response(
+        content=result.body,
+        media_type=result.media_type,
+        headers={"ETag": f'"{key}"', "X-Cache": "HIT" if hit else "MISS", **(headers or {})}
+    )
+
+
+def not_modified(key: str) -> Response:
+    return Response(status_code=304, headers={"ETag": f'"{key}"'})
+
+
+def require_admin(token: Optional[str]) -> None:
+    """404 when debug features are disabled, 403 on a missing or wrong admin token"""
+    if not config.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not admin_token_matches(config.ADMIN_TOKEN, token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+def require_index() -> FieldIndex:
+    if field_index is None:
+        raise HTTPException(status_code=404, detail="Field index is not enabled")
+    return field_index
+
+
+def require_tlk() -> GffConverter:
+    if tlk_converter is None:
+        raise HTTPException(status_code=404, detail="Talk table resolution is not enabled")
+    return tlk_converter
 
 
 @router.get("/health")
@@ -30,9 +169,17 @@ async def health_check():
 
 
 @router.post("/convert/gff-to-json")
-async def gff_to_json(file: UploadFile = File(...)):
-    """Convert GFF file to JSON format"""
+async def gff_to_json(
+    file: UploadFile = File(...),
+    stream: bool = Query(False, description="Stream sorted JSON as it is produced"),
+    resolve_tlk: bool = Query(False, description="Add talk table text to CExoLocStrings as \"tlk\""),
+    if_none_match: Optional[str] = Header(None),
+    accept: Optional[str] = Header(None)
+):
+    """Convert GFF file to JSON format, or MessagePack when the Accept header asks for it"""
     try:
+        converter = require_tlk() if resolve_tlk else gff_converter
+        
         # Validate file format
         file_ext = os.path.splitext(file.filename)[1].lower().lstrip('.')
         if file_ext not in SUPPORTED_FORMATS["gff"]:
@@ -41,25 +188,61 @@ async def gff_to_json(file: UploadFile = File(...)):
                 detail=f"Invalid file format. Expected GFF file, got: {file_ext}"
             )
         
-        # Read file content
-        content = await file.read()
-        if len(content) > MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=413,
-                detail="File too large (max 10MB)"
+        # Read file content; large uploads are mapped from their temp file
+        upload = await read_upload(file, MAX_UPLOAD_SIZES["gff"], config.UPLOAD_SPILL_BYTES)
+        content = upload.data
+        
+        # Identical uploads map to the same cached result and ETag
+        msgpack = accepts_msgpack(accept)
+        operation = "gff-to-msgpack" if msgpack else "gff-to-json"
+        key = content_key(content, operation + "+tlk" if resolve_tlk else operation)
+        if etag_matches(if_none_match, key):
+            upload.close()
+            return not_modified(key)
+        cached = result_cache.get(key)
+        if cached is not None:
+            upload.close()
+            return cached_response(key, cached, hit=True, headers=VARY_ACCEPT)
+        
+        if msgpack:
+            with upload:
+                gff_root = await worker_pool.run("parse", gff_parser.read_gff_root, content, True)
+            msgpack_bytes = await worker_pool.run("convert", converter.to_msgpack, gff_root)
+            result = CachedResult(MSGPACK_MEDIA_TYPE, msgpack_bytes)
+            result_cache.put(key, result)
+            return cached_response(key, result, hit=False, headers=VARY_ACCEPT)
+        
+        if stream:
+            # Check the whole file on the pool first, so malformed data is a 400 rather than a truncated 200
+            try:
+                await worker_pool.run("parse", validate_gff, content)
+            except Exception:
+                upload.close()
+                raise
+            # Walk a lazy view and emit pre-sorted chunks as they are produced
+            view = GffView(content, validate=True)
+            return StreamingResponse(
+                converter.iter_json(view),
+                media_type="application/json",
+                headers={"ETag": f'"{key}"', **VARY_ACCEPT},
+                background=BackgroundTask(upload.close)
             )
         
         # Parse GFF
-        gff_root = gff_parser.read_gff_root(content, validate=True)
-        
-        # Convert to JSON
-        json_data = gff_converter.to_json(gff_root)
+        with upload:
+            gff_root = await worker_pool.run("parse", gff_parser.read_gff_root, content, True)
         
-        # Post-process (sort fields)
-        json_data = gff_converter.post_process_json(json_data)
+        # Convert and encode JSON off the event loop (keys are emitted already sorted)
+        json_bytes = await worker_pool.run("convert", converter.to_json_bytes, gff_root)
         
-        return json_data
+        result = CachedResult("application/json", json_bytes)
+        result_cache.put(key, result)
+        return cached_response(key, result, hit=False, headers=VARY_ACCEPT)
         
+    except HTTPException:
+        raise
+    except WorkerPoolError as e:
+        raise worker_pool_http_error(e)
     except GffParserError as e:
         raise HTTPException(status_code=400, detail=f"Failed to parse GFF file: {str(e)}")
     except GffConverterError as e:
@@ -69,51 +252,413 @@ async def gff_to_json(file: UploadFile = File(...)):
 
 
 @router.post("/convert/json-to-gff")
-async def json_to_gff(file: UploadFile = File(...)):
-    """Convert JSON file to GFF format"""
+async def json_to_gff(
+    file: UploadFile = File(...),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Convert JSON (or MessagePack) file to GFF format"""
     try:
         # Validate file format
         file_ext = os.path.splitext(file.filename)[1].lower().lstrip('.')
-        if file_ext != "json":
+        msgpack = file_ext in SUPPORTED_FORMATS["msgpack"] or (
+            (file.content_type or "").split(";")[0].strip().lower() in MSGPACK_MEDIA_TYPES
+        )
+        if file_ext != "json" and not msgpack:
             raise HTTPException(
                 status_code=400,
                 detail=f"Invalid file format. Expected JSON file, got: {file_ext}"
             )
         
-        # Read and parse JSON
-        content = await file.read()
-        if len(content) > MAX_FILE_SIZE:
+        # Read the upload; large ones are mapped from their temp file
+        upload = await read_upload(file, MAX_UPLOAD_SIZES["json"], config.JSON_STREAM_BYTES)
+        content = upload.data
+        
+        key = content_key(content, "msgpack-to-gff" if msgpack else "json-to-gff")
+        if etag_matches(if_none_match, key):
+            upload.close()
+            return not_modified(key)
+        cached = result_cache.get(key)
+        if cached is not None:
+            upload.close()
+            return cached_response(key, cached, hit=True, headers=GFF_DOWNLOAD_HEADERS)
+        
+        if not msgpack and len(content) > config.JSON_STREAM_BYTES:
+            # Tokenize straight into the GFF writer without building the document
+            with upload:
+                try:
+                    gff_data = await worker_pool.run("convert", stream_json_to_gff, content)
+                except JsonStreamError as e:
+                    raise HTTPException(status_code=400, detail=f"Invalid JSON format: {str(e)}")
+        else:
+            with upload:
+                try:
+                    json_data = await worker_pool.run("decode", loads_msgpack if msgpack else loads_json, content)
+                except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                    raise HTTPException(status_code=400, detail="Invalid JSON format")
+                except MsgpackError as e:
+                    raise HTTPException(status_code=400, detail=f"Invalid MessagePack: {str(e)}")
+            
+            # Convert to GFF
+            gff_root = await worker_pool.run("convert", gff_converter.gff_root_from_json, json_data)
+            
+            # Write to GFF format
+            gff_data = await worker_pool.run("write", gff_parser.write_gff_root, gff_root)
+        
+        # Return as downloadable file
+        result = CachedResult("application/octet-stream", gff_data)
+        result_cache.put(key, result)
+        return cached_response(key, result, hit=False, headers=GFF_DOWNLOAD_HEADERS)
+        
+    except HTTPException:
+        raise
+    except WorkerPoolError as e:
+        raise worker_pool_http_error(e)
+    except (GffConverterError, GffInputError) as e:
+        raise HTTPException(status_code=400, detail=f"Conversion failed: {str(e)}")
+    except GffParserError as e:
+        raise HTTPException(status_code=500, detail=f"Failed to write GFF: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@router.get("/convert/result/{etag}")
+async def conversion_result(etag: str, if_none_match: Optional[str] = Header(None)):
+    """Fetch a previously converted result by ETag without re-uploading the source"""
+    key = etag.strip('"')
+    if etag_matches(if_none_match, key):
+        return not_modified(key)
+    cached = result_cache.get(key)
+    if cached is None:
+        raise HTTPException(status_code=404, detail="Result not cached")
+    headers = GFF_DOWNLOAD_HEADERS if cached.media_type == "application/octet-stream" else None
+    return cached_response(key, cached, hit=True, headers=headers)
+
+
+@router.get("/cache/stats")
+async def cache_stats():
+    """Conversion cache hit/miss/eviction counters"""
+    return dict(result_cache.stats(), sqlite=sqlite_cache.stats())
+
+
+@router.get("/index/search")
+async def index_search(
+    value: Optional[str] = Query(None, description="Field value, case-insensitive; * is a wildcard"),
+    label: Optional[str] = Query(None, description="Field label, case-insensitive; * is a wildcard"),
+    path: Optional[str] = Query(None, description="Field path such as ItemList/*/InventoryRes"),
+    file_type: Optional[str] = Query(None, description="GFF file type, e.g. BIC"),
+    limit: int = Query(SEARCH_LIMIT, ge=1, le=SEARCH_MAX_LIMIT)
+):
+    """Find indexed files and paths holding a value"""
+    index = require_index()
+    try:
+        with stage_timer("search"):
+            results = await run_in_threadpool(index.search, value, label, path, file_type, limit)
+        return {"count": len(results), "results": results}
+    except FieldIndexError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/index/stats")
+async def index_stats():
+    """Indexed file and field counts"""
+    return await run_in_threadpool(require_index().stats)
+
+
+@router.post("/index/refresh")
+async def index_refresh(x_admin_token: Optional[str] = Header(None)):
+    """Re-index changed files under every configured source"""
+    require_admin(x_admin_token)
+    index = require_index()
+    if index.updating:
+        raise HTTPException(status_code=409, detail="An index refresh is already running")
+    try:
+        sources = {}
+        for source in config.INDEX_SOURCES:
+            sources[source] = await run_in_threadpool(index.update, source, get_process_pool())
+        return {"sources": sources}
+    except FieldIndexError as e:
+        raise HTTPException(status_code=500, detail=f"Index refresh failed: {str(e)}")
+
+
+@router.post("/convert/batch")
+async def convert_batch(
+    files: List[UploadFile] = File(...),
+    output_format: str = Query("ndjson", alias="format", pattern="^(ndjson|zip)$")
+):
+    """Convert many GFF files, or zip/tar archives of them, in parallel"""
+    try:
+        # Refuse up front when the pool is saturated; later refusals are per-file errors
+        batch_pool.check_capacity("convert")
+    except WorkerPoolError as e:
+        raise worker_pool_http_error(e)
+    
+    async def inputs():
+        # Uploads and archive members are read lazily as conversions free up the window
+        budget = BatchBudget(MAX_UPLOAD_SIZES["gff"], config.MAX_BATCH_EXPANDED_SIZE)
+        for upload_file in files:
+            name = os.path.basename(upload_file.filename or "unnamed")
+            file_ext = os.path.splitext(name)[1].lower().lstrip('.')
+            
+            if upload_size(upload_file) > MAX_UPLOAD_SIZES["batch"]:
+                yield name, None, too_large(MAX_UPLOAD_SIZES["batch"]).detail
+            elif file_ext in ARCHIVE_EXTENSIONS:
+                # Archives above the spill threshold are mapped; members are decompressed on a thread
+                with await read_upload(upload_file, MAX_UPLOAD_SIZES["batch"], config.UPLOAD_SPILL_BYTES) as upload:
+                    try:
+                        async for member in iterate_in_threadpool(iter_archive(name, upload.data, budget)):
+                            yield member
+                    except BatchError as e:
+                        yield name, None, str(e)
+            elif not is_gff_name(name):
+                yield name, None, INVALID_FORMAT
+            else:
+                with await read_upload(upload_file, MAX_UPLOAD_SIZES["batch"]) as upload:
+                    yield name, upload.data, None
+    
+    results = convert_many(batch_pool, inputs())
+    if output_format == "zip":
+        return StreamingResponse(
+            stream_zip(results),
+            media_type="application/zip",
+            headers={"Content-Disposition": 'attachment; filename="converted.zip"'}
+        )
+    return StreamingResponse(stream_ndjson(results), media_type="application/x-ndjson")
+
+
+@router.api_route("/query", methods=["GET", "POST"])
+async def query_gff(
+    path: str = Query(..., description="Field path, e.g. ClassList/0/Class"),
+    file: UploadFile = File(...)
+):
+    """Read a single value from a GFF file without decoding the rest of it"""
+    try:
+        # Validate file format
+        file_ext = os.path.splitext(file.filename)[1].lower().lstrip('.')
+        if file_ext not in SUPPORTED_FORMATS["gff"]:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid file format. Expected GFF file, got: {file_ext}"
+            )
+        
+        # Read file content; large uploads are mapped from their temp file
+        with await read_upload(file, MAX_UPLOAD_SIZES["gff"], config.UPLOAD_SPILL_BYTES) as upload:
+            # Resolve the path against a lazy view; untouched subtrees are never decoded
+            kind, value = await worker_pool.run("lookup", lookup_json, upload.data, path)
+        return {"path": path, "type": kind, "value": value}
+        
+    except HTTPException:
+        raise
+    except WorkerPoolError as e:
+        raise worker_pool_http_error(e)
+    except GffViewError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except (GffParserError, struct.error) as e:
+        raise HTTPException(status_code=400, detail=f"Failed to parse GFF file: {str(e)}")
+    except GffConverterError as e:
+        raise HTTPException(status_code=500, detail=f"Conversion failed: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@router.post("/patch")
+async def patch_gff_file(
+    file: UploadFile = File(...),
+    operations: str = Form(..., description='JSON list of {"path": "Gold", "value": 500} operations')
+):
+    """Set field values in a GFF file without rebuilding it"""
+    try:
+        # Validate file format
+        file_ext = os.path.splitext(file.filename)[1].lower().lstrip('.')
+        if file_ext not in SUPPORTED_FORMATS["gff"]:
             raise HTTPException(
-                status_code=413,
-                detail="File too large (max 10MB)"
+                status_code=400,
+                detail=f"Invalid file format. Expected GFF file, got: {file_ext}"
             )
         
         try:
-            json_data = json.loads(content.decode('utf-8'))
-        except json.JSONDecodeError as e:
-            raise HTTPException(status_code=400, detail="Invalid JSON format")
-        
-        # Convert to GFF
-        gff_root = gff_converter.gff_root_from_json(json_data)
+            patch_operations = parse_operations(json.loads(operations))
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="Invalid operations: expected a JSON list")
         
-        # Write to GFF format
-        gff_data = gff_parser.write_gff_root(gff_root)
+        # Fields keep their types; only changed bytes (and a grown field data block) differ
+        with await read_upload(file, MAX_UPLOAD_SIZES["gff"], config.UPLOAD_SPILL_BYTES) as upload:
+            result = await worker_pool.run("patch", patch_gff, upload.data, patch_operations)
         
-        # Return as downloadable file
+        filename = os.path.basename(file.filename).replace('"', "")
         return Response(
-            content=gff_data,
+            content=result.data,
             media_type="application/octet-stream",
             headers={
-                "Content-Disposition": 'attachment; filename="converted.gff"'
+                "Content-Disposition": f'attachment; filename="{filename}"',
+                "X-Patched-In-Place": str(result.in_place),
+                "X-Patched-Appended": str(result.appended)
             }
         )
         
+    except HTTPException:
+        raise
+    except WorkerPoolError as e:
+        raise worker_pool_http_error(e)
+    except GffViewError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except GffPatchError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid patch: {str(e)}")
+    except (GffParserError, struct.error) as e:
+        raise HTTPException(status_code=400, detail=f"Failed to parse GFF file: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@router.post("/diff")
+async def diff_gff_files(
+    old_file: UploadFile = File(...),
+    new_file: UploadFile = File(...)
+):
+    """Report the fields that differ between two GFF files"""
+    try:
+        # Validate file formats
+        for upload_file in (old_file, new_file):
+            file_ext = os.path.splitext(upload_file.filename)[1].lower().lstrip('.')
+            if file_ext not in SUPPORTED_FORMATS["gff"]:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Invalid file format. Expected GFF file, got: {file_ext}"
+                )
+        
+        # Both trees are hashed once; identical subtrees are skipped by hash
+        with await read_upload(old_file, MAX_UPLOAD_SIZES["gff"], config.UPLOAD_SPILL_BYTES) as old_upload:
+            with await read_upload(new_file, MAX_UPLOAD_SIZES["gff"], config.UPLOAD_SPILL_BYTES) as new_upload:
+                diff = await worker_pool.run("diff", diff_gff, old_upload.data, new_upload.data)
+        
+        return {
+            "equal": diff.equal,
+            "old_hash": diff.old_hash,
+            "new_hash": diff.new_hash,
+            "changes": diff.changes
+        }
+        
+    except HTTPException:
+        raise
+    except WorkerPoolError as e:
+        raise worker_pool_http_error(e)
+    except (GffParserError, struct.error) as e:
+        raise HTTPException(status_code=400, detail=f"Failed to parse GFF file: {str(e)}")
     except GffConverterError as e:
-        raise HTTPException(status_code=400, detail=f"Conversion failed: {str(e)}")
-    except GffParserError as e:
-        raise HTTPException(status_code=500, detail=f"Failed to write GFF: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Conversion failed: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+def open_erf_upload(file: UploadFile) -> ErfArchive:
+    """mmap an uploaded ERF/MOD/HAK/SAV without copying it into memory"""
+    file_ext = os.path.splitext(file.filename)[1].lower().lstrip('.')
+    if file_ext not in SUPPORTED_FORMATS["erf"]:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid file format. Expected ERF archive, got: {file_ext}"
+        )
+    
+    if upload_size(file) > MAX_UPLOAD_SIZES["erf"]:
+        raise too_large(MAX_UPLOAD_SIZES["erf"])
+    
+    # The spooled upload is rolled to its temp file and mapped read-only
+    return ErfArchive.open(file.file)
+
+
+@router.post("/erf/list")
+async def erf_list(file: UploadFile = File(...)):
+    """List the resources in an ERF-family archive"""
+    try:
+        with open_erf_upload(file) as archive:
+            return {
+                "file_type": archive.file_type,
+                "version": archive.version,
+                "build_year": archive.build_year + 1900,
+                "build_day": archive.build_day,
+                "resources": [
+                    {
+                        "name": resource.name,
+                        "resref": resource.resref,
+                        "type": resource.extension,
+                        "size": resource.size,
+                        "gff": resource.is_gff
+                    }
+                    for resource in archive.resources
+                ]
+            }
+        
+    except HTTPException:
+        raise
+    except ErfReaderError as e:
+        raise HTTPException(status_code=400, detail=f"Failed to read archive: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@router.post("/erf/extract")
+async def erf_extract(
+    name: str = Query(..., description="Resource name, e.g. module.ifo"),
+    file: UploadFile = File(...)
+):
+    """Extract a single resource from an ERF-family archive"""
+    try:
+        with open_erf_upload(file) as archive:
+            resource = archive.find(name)
+            if resource is None:
+                raise HTTPException(status_code=404, detail=f"Resource not found: {name}")
+            content = bytes(archive.data(resource))
+        
+        return Response(
+            content=content,
+            media_type="application/octet-stream",
+            headers={
+                "Content-Disposition": f'attachment; filename="{resource.name}"'
+            }
+        )
+        
+    except HTTPException:
+        raise
+    except ErfReaderError as e:
+        raise HTTPException(status_code=400, detail=f"Failed to read archive: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@router.post("/erf/convert")
+async def erf_convert(
+    file: UploadFile = File(...),
+    output_format: str = Query("ndjson", alias="format", pattern="^(ndjson|zip)$")
+):
+    """Convert every GFF resource in an ERF-family archive to JSON in one pass"""
+    try:
+        archive = open_erf_upload(file)
+    except HTTPException:
+        raise
+    except ErfReaderError as e:
+        raise HTTPException(status_code=400, detail=f"Failed to read archive: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    
+    async def results():
+        try:
+            for resource in archive.gff_resources():
+                data = archive.data(resource)
+                try:
+                    yield await worker_pool.run("convert", convert_gff_file, resource.name, data)
+                except WorkerPoolError as e:
+                    yield resource.name, False, str(e).encode("utf-8")
+                finally:
+                    data = None
+        finally:
+            archive.close()
+    
+    if output_format == "zip":
+        return StreamingResponse(
+            stream_zip(results()),
+            media_type="application/zip",
+            headers={"Content-Disposition": 'attachment; filename="converted.zip"'}
+        )
+    return StreamingResponse(stream_ndjson(results()), media_type="application/x-ndjson")
 
 
 @router.post("/convert/sqlite-embed")
@@ -132,15 +677,13 @@ async def sqlite_embed(
         if sqlite_ext not in ["db", "sqlite"]:
             raise HTTPException(status_code=400, detail="Invalid SQLite file format")
         
-        # Read files
-        gff_content = await gff_file.read()
-        sqlite_content = await sqlite_file.read()
-        
-        if len(gff_content) > MAX_FILE_SIZE or len(sqlite_content) > MAX_FILE_SIZE:
-            raise HTTPException(status_code=413, detail="Files too large (max 10MB each)")
-        
-        # Embed SQLite
-        embedded_data = sqlite_handler.embed_sqlite(gff_content, sqlite_content)
+        # Read files; large uploads are mapped from their temp file and released on every path
+        with await read_upload(gff_file, MAX_UPLOAD_SIZES["gff"], config.UPLOAD_SPILL_BYTES) as gff_upload:
+            with await read_upload(sqlite_file, MAX_UPLOAD_SIZES["sqlite"], config.UPLOAD_SPILL_BYTES) as sqlite_upload:
+                # Embed SQLite
+                embedded_data = await worker_pool.run(
+                    "compress", sqlite_handler.embed_sqlite, gff_upload.data, sqlite_upload.data
+                )
         
         # Return as downloadable file
         return Response(
@@ -151,6 +694,12 @@ async def sqlite_embed(
             }
         )
         
+    except HTTPException:
+        raise
+    except WorkerPoolError as e:
+        raise worker_pool_http_error(e)
+    except GffParserError as e:
+        raise HTTPException(status_code=400, detail=f"Failed to parse GFF file: {str(e)}")
     except SqliteHandlerError as e:
         raise HTTPException(status_code=500, detail=f"SQLite embedding failed: {str(e)}")
     except Exception as e:
@@ -169,13 +718,9 @@ async def sqlite_extract(file: UploadFile = File(...)):
                 detail=f"Invalid file format. Expected GFF file, got: {file_ext}"
             )
         
-        # Read file
-        content = await file.read()
-        if len(content) > MAX_FILE_SIZE:
-            raise HTTPException(status_code=413, detail="File too large (max 10MB)")
-        
-        # Extract SQLite
-        sqlite_data = sqlite_handler.extract_sqlite(content)
+        # Read file; the database is located through the field index, not by scanning
+        with await read_upload(file, MAX_UPLOAD_SIZES["gff"], config.UPLOAD_SPILL_BYTES) as upload:
+            sqlite_data = await worker_pool.run("decompress", sqlite_handler.extract_sqlite, upload.data)
         if sqlite_data is None:
             raise HTTPException(
                 status_code=400,
@@ -191,12 +736,130 @@ async def sqlite_extract(file: UploadFile = File(...)):
             }
         )
         
+    except HTTPException:
+        raise
+    except WorkerPoolError as e:
+        raise worker_pool_http_error(e)
+    except GffParserError as e:
+        raise HTTPException(status_code=400, detail=f"Failed to parse GFF file: {str(e)}")
     except SqliteHandlerError as e:
         raise HTTPException(status_code=500, detail=f"SQLite extraction failed: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
+@router.post("/sqlite/query")
+async def sqlite_query(
+    file: UploadFile = File(...),
+    sql: str = Form(..., description="A single read-only SQL statement"),
+    params: Optional[str] = Form(None, description="JSON array or object of bound parameters")
+):
+    """Run a read-only query against the SQLite database embedded in a GFF file"""
+    try:
+        # Validate file format
+        file_ext = os.path.splitext(file.filename)[1].lower().lstrip('.')
+        if file_ext not in SUPPORTED_FORMATS["gff"]:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid file format. Expected GFF file, got: {file_ext}"
+            )
+        
+        try:
+            bound = json.loads(params) if params else ()
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="Invalid params: expected a JSON array or object")
+        if not isinstance(bound, (list, tuple, dict)):
+            raise HTTPException(status_code=400, detail="Invalid params: expected a JSON array or object")
+        
+        # Repeated queries against the same file skip extraction and decompression
+        with await read_upload(file, MAX_UPLOAD_SIZES["gff"], config.UPLOAD_SPILL_BYTES) as upload:
+            key = content_key(upload.data, "sqlite")
+            database = sqlite_cache.get(key)
+            hit = database is not None
+            if database is None:
+                # extract_sqlite refuses databases expanding past the SQLite upload limit
+                database = await worker_pool.run("decompress", sqlite_handler.extract_sqlite, upload.data)
+                if database is None:
+                    raise HTTPException(
+                        status_code=400,
+                        detail="No SQLite database found in GFF file"
+                    )
+                if len(database) <= config.SQLITE_CACHE_MAX_ENTRY_BYTES:
+                    sqlite_cache.put(key, database)
+        
+        # Run the statement off the event loop; rows are streamed as they are fetched
+        connection = open_database(database)
+        try:
+            cursor = await run_in_threadpool(
+                run_query, connection, sql, bound, config.STAGE_TIMEOUTS["query"]
+            )
+        except BaseException:
+            connection.close()
+            raise
+        
+        return StreamingResponse(
+            iter_ndjson_rows(cursor, connection),
+            media_type="application/x-ndjson",
+            headers={"X-Cache": "HIT" if hit else "MISS"}
+        )
+        
+    except HTTPException:
+        raise
+    except WorkerPoolError as e:
+        raise worker_pool_http_error(e)
+    except SqliteQueryTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except SqliteQueryError as e:
+        raise HTTPException(status_code=400, detail=f"Query failed: {str(e)}")
+    except GffParserError as e:
+        raise HTTPException(status_code=400, detail=f"Failed to parse GFF file: {str(e)}")
+    except SqliteHandlerError as e:
+        raise HTTPException(status_code=500, detail=f"SQLite extraction failed: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@router.get("/debug/profiles")
+async def list_profiles(x_admin_token: Optional[str] = Header(None)):
+    """Recently captured request profiles, newest first"""
+    require_admin(x_admin_token)
+    return {"profiles": profile_store.list()}
+
+
+@router.get("/debug/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    output_format: str = Query("text", alias="format", pattern="^(text|pstats|collapsed|memory|json)$"),
+    sort: str = Query("cumulative", description="pstats sort key for the text format"),
+    x_admin_token: Optional[str] = Header(None)
+):
+    """A captured profile as pstats text or binary, collapsed stacks, or a memory report"""
+    require_admin(x_admin_token)
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    try:
+        if output_format == "json":
+            return profile.summary()
+        if output_format == "pstats":
+            return Response(
+                content=profile.pstats_dump(),
+                media_type="application/octet-stream",
+                headers={"Content-Disposition": f'attachment; filename="{profile_id}.pstats"'}
+            )
+        if output_format == "collapsed":
+            return Response(content=profile.collapsed(), media_type="text/plain")
+        if output_format == "memory":
+            return Response(content=profile.memory_text(), media_type="text/plain")
+        return Response(content=profile.pstats_text(sort), media_type="text/plain")
+        
+    except ProfilingError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"Invalid sort key: {sort}")
+
+
 @router.get("/")
 async def api_info():
     """API information endpoint"""
@@ -207,7 +870,19 @@ async def api_info():
             "GET /api/v1/health",
             "POST /api/v1/convert/gff-to-json",
             "POST /api/v1/convert/json-to-gff",
+            "POST /api/v1/convert/batch",
+            "GET /api/v1/convert/result/{etag}",
+            "GET /api/v1/cache/stats",
+            "GET/POST /api/v1/query?path=...",
+            "POST /api/v1/patch",
+            "POST /api/v1/diff",
+            "GET /api/v1/index/search?value=...",
+            "POST /api/v1/erf/list",
+            "POST /api/v1/erf/extract?name=...",
+            "POST /api/v1/erf/convert",
             "POST /api/v1/convert/sqlite-embed",
-            "POST /api/v1/convert/sqlite-extract"
+            "POST /api/v1/convert/sqlite-extract",
+            "POST /api/v1/sqlite/query",
+            "GET /api/v1/debug/profiles/{id}"
         ]
     }
\ No newline at end of file
@@ -0,0 +1,131 @@
+"""Command line tools that run the service's converters without the HTTP server.
+
+    python -m app.cli convert servervault/ -o json/          # GFF -> JSON
+    python -m app.cli json-to-gff json/ -o gff/             # JSON -> GFF
+    python -m app.cli sqlite-embed *.bic --database db.sqlite3
+    python -m app.cli sqlite-extract *.bic -o databases/
+    python -m app.cli mirror servervault/ mirror/            # one pass
+    python -m app.cli mirror servervault/ mirror/ --watch    # keep syncing
+"""
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from . import config
+from .services.bulk import BulkError, plan_jobs, run_jobs
+from .services.gff_schema import load_schemas
+from .services.mirror import DEFAULT_EXTENSIONS, DEFAULT_INTERVAL, MirrorError, VaultMirror
+
+
+def bulk(args: argparse.Namespace) -> int:
+    start = time.perf_counter()
+    # Learned before the worker processes start, so they inherit the compiled codecs
+    load_schemas(config.SCHEMA_SOURCES)
+    try:
+        jobs = plan_jobs(args.inputs, args.operation, args.output, getattr(args, "database", None))
+    except BulkError as e:
+        print(f"{args.command}: {e}", file=sys.stderr)
+        return 2
+    stats: Dict[str, Any] = {"written": 0, "failed": 0, "bytes": 0, "errors": []}
+    for result in run_jobs(jobs, args.workers):
+        stats["bytes"] += result.size
+        if result.ok:
+            stats["written"] += 1
+        else:
+            stats["failed"] += 1
+            stats["errors"].append({"file": result.job.source, "error": result.error})
+    stats["seconds"] = round(time.perf_counter() - start, 3)
+
+    if args.json:
+        print(json.dumps(stats))
+    else:
+        rate = stats["bytes"] / (1024 * 1024) / max(stats["seconds"], 1e-9)
+        print(f"{stats['written']} written, {stats['failed']} failed in {stats['seconds']:.2f}s ({rate:.1f}MB/s)")
+        for error in stats["errors"]:
+            print(f"  {error['file']}: {error['error']}", file=sys.stderr)
+    return 1 if stats["failed"] else 0
+
+
+def _print_pass(stats: Dict[str, Any]) -> None:
+    print(
+        f"{stats['converted']} converted, {stats['unchanged']} unchanged, "
+        f"{stats['removed']} removed, {stats['failed']} failed in {stats['seconds']:.2f}s",
+        flush=True
+    )
+    for error in stats["errors"]:
+        print(f"  {error['file']}: {error['error']}", file=sys.stderr)
+
+
+def mirror(args: argparse.Namespace) -> int:
+    load_schemas(config.SCHEMA_SOURCES)
+    executor = ProcessPoolExecutor(max_workers=args.workers) if args.workers != 1 else None
+    try:
+        vault = VaultMirror(args.source, args.dest, args.extension or DEFAULT_EXTENSIONS, executor)
+        if args.watch:
+            try:
+                vault.watch(args.interval, on_pass=_print_pass if args.verbose else None)
+            except KeyboardInterrupt:
+                pass
+            return 0
+        stats = vault.sync()
+    except MirrorError as e:
+        print(f"mirror: {e}", file=sys.stderr)
+        return 2
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    if args.json:
+        print(json.dumps(stats))
+    else:
+        _print_pass(stats)
+    return 1 if stats["failed"] else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    for command, help_text in (
+        ("convert", "Convert GFF files to JSON"),
+        ("json-to-gff", "Convert JSON or MessagePack files to GFF"),
+        ("sqlite-embed", "Embed a SQLite database into GFF files"),
+        ("sqlite-extract", "Extract embedded SQLite databases from GFF files"),
+    ):
+        bulk_parser = commands.add_parser(command, help=help_text)
+        bulk_parser.add_argument("inputs", nargs="+", help="Files, directories (walked recursively) or quoted globs")
+        bulk_parser.add_argument(
+            "-o", "--output", metavar="DIR",
+            help="Output directory; directory inputs keep their layout under it (default: next to each input)"
+        )
+        if command == "sqlite-embed":
+            bulk_parser.add_argument("--database", required=True, help="SQLite database to embed")
+        bulk_parser.add_argument("--workers", type=int, default=None, help="Conversion processes (default: one per core)")
+        bulk_parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+        bulk_parser.set_defaults(handler=bulk, operation="gff-to-json" if command == "convert" else command)
+
+    mirror_parser = commands.add_parser("mirror", help="Keep a JSON mirror of a directory of GFF files up to date")
+    mirror_parser.add_argument("source", help="Directory to mirror, e.g. the servervault")
+    mirror_parser.add_argument("dest", help="Directory for the .json mirrors and the manifest")
+    mirror_parser.add_argument(
+        "--extension", action="append", metavar="EXT",
+        help=f"File extension to mirror; repeatable (default: {', '.join(DEFAULT_EXTENSIONS)})"
+    )
+    mirror_parser.add_argument("--workers", type=int, default=None, help="Conversion processes (default: one per core, 1 converts inline)")
+    mirror_parser.add_argument("--watch", action="store_true", help="Keep running and sync every --interval seconds")
+    mirror_parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL)
+    mirror_parser.add_argument("--verbose", action="store_true", help="With --watch, print a line per pass")
+    mirror_parser.add_argument("--json", action="store_true", help="Print the pass summary as JSON")
+    mirror_parser.set_defaults(handler=mirror)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""Service configuration read from environment variables"""
+import os
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+
+# Worker pool for CPU-bound stages (parse, convert, write, compress)
+WORKER_KIND = os.environ.get("NWN_GFF_WORKER_KIND", "thread")  # "thread" or "process"
+WORKER_COUNT = _env_int("NWN_GFF_WORKERS", os.cpu_count() or 1)
+WORKER_MAX_PENDING = _env_int("NWN_GFF_MAX_PENDING", 4 * WORKER_COUNT)
+WORKER_RETRY_AFTER = _env_int("NWN_GFF_RETRY_AFTER", 1)  # seconds
+# Process pool for /convert/batch, whose parse + convert jobs would serialize on the GIL in threads
+BATCH_WORKER_COUNT = _env_int("NWN_GFF_BATCH_WORKERS", os.cpu_count() or 1)
+BATCH_MAX_PENDING = _env_int("NWN_GFF_BATCH_MAX_PENDING", 4 * BATCH_WORKER_COUNT)
+STAGE_TIMEOUT = _env_float("NWN_GFF_STAGE_TIMEOUT", 30.0)  # seconds, per stage
+STAGE_TIMEOUTS = {
+    stage: _env_float(f"NWN_GFF_{stage.upper()}_TIMEOUT", STAGE_TIMEOUT)
+    for stage in ("parse", "convert", "decode", "write", "compress", "decompress", "query", "diff", "lookup", "patch")
+}
+
+# Conversion result cache
+CACHE_MAX_BYTES = _env_int("NWN_GFF_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+CACHE_DIR = os.environ.get("NWN_GFF_CACHE_DIR") or None  # enables the on-disk tier
+CACHE_DISK_MAX_BYTES = _env_int("NWN_GFF_CACHE_DISK_MAX_BYTES", 1024 * 1024 * 1024)
+# Decompressed embedded databases kept for /sqlite/query
+SQLITE_CACHE_MAX_BYTES = _env_int("NWN_GFF_SQLITE_CACHE_MAX_BYTES", 256 * 1024 * 1024)
+# Larger databases are queried but not cached, so one upload cannot flush the others
+SQLITE_CACHE_MAX_ENTRY_BYTES = _env_int("NWN_GFF_SQLITE_CACHE_MAX_ENTRY_BYTES", 32 * 1024 * 1024)
+
+# Upload size limits per kind of input, in bytes
+MAX_UPLOAD_SIZES = {
+    "gff": _env_int("NWN_GFF_MAX_GFF_SIZE", 10 * 1024 * 1024),
+    "json": _env_int("NWN_GFF_MAX_JSON_SIZE", 10 * 1024 * 1024),
+    "sqlite": _env_int("NWN_GFF_MAX_SQLITE_SIZE", 64 * 1024 * 1024),
+    "batch": _env_int("NWN_GFF_MAX_BATCH_SIZE", 200 * 1024 * 1024),
+    "erf": _env_int("NWN_GFF_MAX_ERF_SIZE", 1024 * 1024 * 1024),
+}
+# Decompressed bytes a batch request's archives may expand to; each member is also held to the GFF limit
+MAX_BATCH_EXPANDED_SIZE = _env_int("NWN_GFF_MAX_BATCH_EXPANDED_SIZE", 1024 * 1024 * 1024)
+# Uploads above this size are memory-mapped from their temp file instead of read into memory
+UPLOAD_SPILL_BYTES = _env_int("NWN_GFF_UPLOAD_SPILL_BYTES", 1024 * 1024)
+# JSON above this size is converted to GFF by the streaming tokenizer instead of json.loads
+JSON_STREAM_BYTES = _env_int("NWN_GFF_JSON_STREAM_BYTES", 1024 * 1024)
+
+# Admin token for debug features such as request profiling; unset disables them
+ADMIN_TOKEN = os.environ.get("NWN_GFF_ADMIN_TOKEN") or None
+PROFILE_HISTORY = _env_int("NWN_GFF_PROFILE_HISTORY", 20)  # profiles kept for /debug/profiles
+
+# Field index over GFF files on disk; unset NWN_GFF_INDEX_PATH disables /index/*
+INDEX_PATH = os.environ.get("NWN_GFF_INDEX_PATH") or None
+INDEX_SOURCES = [source for source in os.environ.get("NWN_GFF_INDEX_SOURCES", "").split(os.pathsep) if source]
+
+# Sample GFF files or directories to learn compiled schemas from; unset uses the generic codecs only
+SCHEMA_SOURCES = [source for source in os.environ.get("NWN_GFF_SCHEMA_SOURCES", "").split(os.pathsep) if source]
+
+# Talk tables for resolving CExoLocString StrRefs (?resolve_tlk=true); unset NWN_GFF_TLK_PATH disables it
+TLK_PATH = os.environ.get("NWN_GFF_TLK_PATH") or None  # dialog.tlk
+TLK_CUSTOM_PATH = os.environ.get("NWN_GFF_TLK_CUSTOM_PATH") or None  # module talk table for StrRefs >= 0x01000000
+TLK_CACHE_BYTES = _env_int("NWN_GFF_TLK_CACHE_BYTES", 4 * 1024 * 1024)  # resolved text kept in memory
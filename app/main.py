@@ -1,8 +1,14 @@
 """Main FastAPI application for NWN GFF Service"""
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
-from .api.endpoints import router
+from . import config
+from .api.endpoints import batch_pool, profile_store, router, upload_limit_for, worker_pool
+from .services.batch import shutdown_process_pool
+from .services.gff_schema import load_schemas
+from .services.metrics import CONTENT_TYPE, Gauge, MetricsMiddleware, registry
+from .services.profiling import ProfilingMiddleware
+from .services.upload import UploadLimitMiddleware
 
 
 app = FastAPI(
@@ -22,14 +28,45 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Reject oversized uploads before they are spooled in full
+app.add_middleware(UploadLimitMiddleware, limit_for=upload_limit_for)
+
+# Admin-only profiling of /convert/* requests sent with X-Profile
+app.add_middleware(ProfilingMiddleware, store=profile_store, prefixes=("/api/v1/convert/",))
+
+# Request metrics and Server-Timing headers (outermost, so rejections are counted too)
+app.add_middleware(MetricsMiddleware)
+
+registry.register(Gauge(
+    "nwn_gff_worker_pending", "Stages queued or running on the worker pool", callback=lambda: worker_pool.pending
+))
+registry.register(Gauge(
+    "nwn_gff_worker_active", "Stages running on the worker pool", callback=lambda: worker_pool.active
+))
+registry.register(Gauge(
+    "nwn_gff_worker_max_pending", "Worker pool admission limit", callback=lambda: worker_pool.max_pending
+))
+registry.register(Gauge(
+    "nwn_gff_workers", "Worker pool size", callback=lambda: worker_pool.max_workers
+))
+
 # Include API routes
 app.include_router(router, prefix="/api/v1")
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics"""
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
+
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize services on startup"""
     print("Starting NWN GFF API Service...")
+    if config.SCHEMA_SOURCES:
+        schemas = load_schemas(config.SCHEMA_SOURCES)
+        print(f"Compiled schemas: {', '.join(f'{t.strip()} ({len(s)} layouts)' for t, s in schemas.items()) or 'none'}")
     print("API documentation available at: http://localhost:8000/docs")
 
 
@@ -37,6 +74,9 @@ async def startup_event():
 async def shutdown_event():
     """Cleanup on shutdown"""
     print("Shutting down NWN GFF API Service...")
+    shutdown_process_pool()
+    worker_pool.shutdown()
+    batch_pool.shutdown()
 
 
 if __name__ == "__main__":
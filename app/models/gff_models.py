@@ -1,44 +1,106 @@
 """GFF data models based on the Nim implementation"""
-from dataclasses import dataclass
-from typing import Dict, List, Optional, Union
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Union
 from enum import Enum
 
 
 class GffDataType(Enum):
-    """GFF data types based on Nim implementation"""
+    """GFF data types based on Nim implementation (GFF V3.2 field type ids)"""
     GFF_BYTE = 0
     GFF_CHAR = 1
     GFF_WORD = 2
     GFF_SHORT = 3
     GFF_DWORD = 4
     GFF_INT = 5
+    GFF_DWORD64 = 6
+    GFF_INT64 = 7
     GFF_FLOAT = 8
-    GFF_STRUCT = 13
-    GFF_STRING = 14
-    GFF_RESREF = 15
-    GFF_VOID = 17
+    GFF_DOUBLE = 9
+    GFF_STRING = 10
+    GFF_RESREF = 11
+    GFF_LOCSTRING = 12
+    GFF_VOID = 13
+    GFF_STRUCT = 14
+    GFF_LIST = 15
 
 
 @dataclass
+class GffLocString:
+    """CExoLocString: a talk table StrRef plus per-language substrings"""
+    str_ref: int = 0xFFFFFFFF  # uint32, 0xFFFFFFFF means no StrRef
+    entries: Dict[int, str] = field(default_factory=dict)  # StringID (language * 2 + gender) -> text
+
+
+# Attribute that exposes GffField.value for each field kind
+FIELD_SLOTS = {
+    GffDataType.GFF_BYTE: "bval",        # uint8
+    GffDataType.GFF_CHAR: "cval",        # int8
+    GffDataType.GFF_WORD: "wval",        # uint16
+    GffDataType.GFF_SHORT: "sval",       # int16
+    GffDataType.GFF_DWORD: "dval",       # uint32
+    GffDataType.GFF_INT: "ival",         # int32
+    GffDataType.GFF_DWORD64: "d64val",   # uint64
+    GffDataType.GFF_INT64: "i64val",     # int64
+    GffDataType.GFF_FLOAT: "fval",       # float32
+    GffDataType.GFF_DOUBLE: "dblval",    # float64
+    GffDataType.GFF_STRING: "strval",    # string
+    GffDataType.GFF_RESREF: "resval",    # resref
+    GffDataType.GFF_LOCSTRING: "locval",  # localized string
+    GffDataType.GFF_VOID: "voidval",     # void (binary data)
+    GffDataType.GFF_STRUCT: "structval",  # nested struct
+    GffDataType.GFF_LIST: "listval",     # list of structs
+}
+
+_SLOT_KINDS = {slot: kind for kind, slot in FIELD_SLOTS.items()}
+
+
+def _slot_property(kind: GffDataType) -> property:
+    def getter(self):
+        return self.value if self.kind is kind else None
+
+    def setter(self, value):
+        self.kind = kind
+        self.value = value
+
+    return property(getter, setter, doc=f"value when kind is {kind.name}, else None")
+
+
 class GffField:
-    """Represents a single GFF field with its data"""
-    kind: GffDataType
-    bval: Optional[int] = None      # uint8
-    cval: Optional[str] = None      # char
-    wval: Optional[int] = None      # uint16
-    sval: Optional[int] = None      # int16
-    dval: Optional[int] = None      # uint32
-    ival: Optional[int] = None      # int32
-    fval: Optional[float] = None    # float32
-    structval: Optional['GffStruct'] = None  # Nested struct
-    strval: Optional[str] = None    # string
-    resval: Optional[str] = None    # resref
-    voidval: Optional[bytes] = None  # void (binary data)
+    """Represents a single GFF field with its data.
+
+    Only the kind and one value are stored. The per-type attributes
+    (bval, ival, strval, ...) read value when the kind matches and None
+    otherwise; assigning one sets both kind and value.
+    """
+    __slots__ = ("kind", "value")
+
+    def __init__(self, kind: GffDataType, value: Any = None, **slot_values: Any):
+        self.kind = kind
+        self.value = value
+        if slot_values:
+            for slot, slot_value in slot_values.items():
+                if slot not in _SLOT_KINDS:
+                    raise TypeError(f"GffField got an unexpected keyword argument {slot!r}")
+                if slot_value is not None:
+                    setattr(self, slot, slot_value)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, GffField):
+            return NotImplemented
+        return self.kind is other.kind and self.value == other.value
+
+    def __repr__(self) -> str:
+        return f"GffField(kind={self.kind}, {FIELD_SLOTS.get(self.kind, 'value')}={self.value!r})"
+
+
+for _slot, _kind in _SLOT_KINDS.items():
+    setattr(GffField, _slot, _slot_property(_kind))
 
 
 @dataclass
 class GffStruct:
     """Represents a GFF structure containing fields"""
+    __slots__ = ("id", "fields")
     id: int  # uint32
     fields: Dict[str, GffField]
 
@@ -48,14 +110,23 @@ class GffRoot:
     """Root container for GFF data"""
     structs: List[GffStruct]
     top_level_struct: GffStruct
+    file_type: str = "GFF "
+    file_version: str = "V3.2"
 
 
 # Supported file extensions
 GFF_EXTENSIONS = [
-    "gff", "bic", "utc", "utd", "ute", "uti", "utm", "utp", "uts", "utt", "utw"
+    "gff", "bic", "utc", "utd", "ute", "uti", "utm", "utp", "uts", "utt", "utw",
+    "are", "git", "gic", "ifo", "dlg", "fac", "jrl", "itp", "ptm", "ptt"
+]
+
+ERF_EXTENSIONS = [
+    "erf", "mod", "hak", "sav", "nwm"
 ]
 
 SUPPORTED_FORMATS = {
     "json": ["json"],
-    "gff": GFF_EXTENSIONS
-}
\ No newline at end of file
+    "msgpack": ["msgpack", "mpk"],
+    "gff": GFF_EXTENSIONS,
+    "erf": ERF_EXTENSIONS
+}
@@ -0,0 +1,242 @@
+"""Batch GFF to JSON conversion on a process worker pool"""
+import asyncio
+import io
+import json
+import mmap
+import os
+import posixpath
+import tarfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterable, AsyncIterator, BinaryIO, Iterator, List, Optional, Tuple, Union
+
+from ..models.gff_models import SUPPORTED_FORMATS
+from .gff_converter import GffConverter
+from .gff_parser import GffParser
+from .gff_schema import SCHEMAS
+from .worker_pool import WorkerPool, WorkerPoolError
+
+
+ARCHIVE_EXTENSIONS = ["zip", "tar", "tgz", "gz", "bz2", "xz"]
+MEMBER_CHUNK_SIZE = 1024 * 1024
+INVALID_FORMAT = "Invalid file format. Expected GFF file"
+
+# (name, data, None) for a file to convert, (name, None, error message) for a rejected one
+BatchInput = Tuple[str, Optional[bytes], Optional[str]]
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+class BatchError(Exception):
+    """Custom exception for batch input errors"""
+    pass
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Shared process pool for whole-source jobs (index refreshes) that outlast a stage timeout"""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+    return _pool
+
+
+def shutdown_process_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def convert_gff_file(name: str, data: bytes) -> Tuple[str, bool, bytes]:
+    """Parse and convert one file on a pool worker.
+
+    Returns (name, ok, payload) where payload is the sorted JSON document
+    on success and the UTF-8 error message otherwise.
+    """
+    try:
+        root = GffParser(SCHEMAS).read_gff_root(data, validate=True)
+        return name, True, b"".join(GffConverter(SCHEMAS).iter_json(root))
+    except Exception as e:
+        return name, False, str(e).encode("utf-8")
+
+
+def safe_member_name(name: str) -> str:
+    """Archive member name with absolute and parent components removed"""
+    parts = [p for p in posixpath.normpath(name.replace("\\", "/")).split("/") if p not in ("", ".", "..")]
+    return "/".join(parts) or "unnamed"
+
+
+def is_gff_name(name: str) -> bool:
+    return os.path.splitext(name)[1].lower().lstrip(".") in SUPPORTED_FORMATS["gff"]
+
+
+class BatchBudget:
+    """Decompressed size limits for the archive members of one batch request.
+
+    A member over max_member_size is rejected on its own; once members add
+    up to max_total_size the rest of the batch is refused. Sizes declared in
+    the archive are checked first and the actual bytes are counted while
+    they are read, so a lying header cannot get past either limit.
+    """
+
+    def __init__(self, max_member_size: int, max_total_size: int):
+        self.max_member_size = max_member_size
+        self.remaining = max_total_size
+        self.max_total_size = max_total_size
+
+    def read(self, fp: BinaryIO, declared_size: int) -> Tuple[Optional[bytes], Optional[str]]:
+        """(data, None) for a member within budget, (None, message) for one too large on its own"""
+        if declared_size > self.max_member_size:
+            return None, self._member_too_large()
+        if declared_size > self.remaining:
+            raise self._total_exceeded()
+        limit = min(self.max_member_size, self.remaining)
+        chunks = []
+        size = 0
+        while True:
+            chunk = fp.read(min(MEMBER_CHUNK_SIZE, limit + 1 - size))
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > limit:
+                if size > self.max_member_size:
+                    return None, self._member_too_large()
+                raise self._total_exceeded()
+            chunks.append(chunk)
+        self.remaining -= size
+        return b"".join(chunks), None
+
+    def _member_too_large(self) -> str:
+        return f"File too large (max {self.max_member_size} bytes decompressed)"
+
+    def _total_exceeded(self) -> BatchError:
+        return BatchError(f"Batch expands past {self.max_total_size} bytes")
+
+
+def iter_archive(filename: str, data: Union[bytes, bytearray, mmap.mmap], budget: BatchBudget) -> Iterator[BatchInput]:
+    """Yield a batch input for every regular file in a zip or tar archive.
+
+    Members are read one at a time as the iterator advances, so only the
+    members being converted are held in memory. Raises BatchError for an
+    unreadable archive or when the batch budget is spent.
+    """
+    fileobj = data if isinstance(data, mmap.mmap) else io.BytesIO(data)
+    try:
+        fileobj.seek(0)
+        if zipfile.is_zipfile(fileobj):
+            with zipfile.ZipFile(fileobj) as archive:
+                for info in archive.infolist():
+                    if not info.is_dir():
+                        name = safe_member_name(info.filename)
+                        if not is_gff_name(name):
+                            yield name, None, INVALID_FORMAT
+                            continue
+                        with archive.open(info) as member_fp:
+                            yield (name,) + budget.read(member_fp, info.file_size)
+            return
+        fileobj.seek(0)
+        with tarfile.open(fileobj=fileobj, mode="r:*") as archive:
+            for member in archive:
+                if member.isfile():
+                    name = safe_member_name(member.name)
+                    if not is_gff_name(name):
+                        yield name, None, INVALID_FORMAT
+                        continue
+                    yield (name,) + budget.read(archive.extractfile(member), member.size)
+    except (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError) as e:
+        raise BatchError(f"Unreadable archive {filename}: {e}")
+
+
+class ZipStreamBuffer:
+    """Write-only sink for ZipFile that hands back bytes as they are produced"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+async def _convert_on(pool: WorkerPool, name: str, data: bytes) -> Tuple[str, bool, bytes]:
+    try:
+        return await pool.run("convert", convert_gff_file, name, data)
+    except WorkerPoolError as e:
+        return name, False, str(e).encode("utf-8")
+
+
+async def convert_many(
+    pool: WorkerPool,
+    inputs: AsyncIterable[BatchInput],
+    window: Optional[int] = None
+) -> AsyncIterator[Tuple[str, bool, bytes]]:
+    """Convert inputs on pool, yielding results as each one finishes.
+
+    Inputs are (name, data, None) for files to convert and (name, None,
+    message) for rejected ones. At most window files (default: the pool's
+    worker count) are in flight, and the next input is not read until one
+    finishes. Each file is a "convert" stage, so it counts against the
+    pool's pending limit and stage timeout; a file the pool refuses or times
+    out is reported as an error. The API passes a process pool, so files
+    are parsed and converted on every core rather than under one GIL.
+    """
+    window = window or pool.max_workers
+    pending = set()
+    try:
+        async for name, data, error in inputs:
+            if error is not None:
+                yield name, False, error.encode("utf-8")
+                continue
+            if len(pending) >= window:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+            pending.add(asyncio.ensure_future(_convert_on(pool, name, data)))
+            data = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def ndjson_line(name: str, ok: bool, payload: bytes) -> bytes:
+    """One NDJSON result record; successful payloads are embedded without re-parsing"""
+    if ok:
+        return b'{"name":' + json.dumps(name).encode() + b',"status":"ok","data":' + payload + b"}\n"
+    return json.dumps({"name": name, "status": "error", "error": payload.decode("utf-8")}).encode() + b"\n"
+
+
+async def stream_ndjson(results: AsyncIterator[Tuple[str, bool, bytes]]) -> AsyncIterator[bytes]:
+    async for name, ok, payload in results:
+        yield ndjson_line(name, ok, payload)
+
+
+async def stream_zip(results: AsyncIterator[Tuple[str, bool, bytes]]) -> AsyncIterator[bytes]:
+    """Zip of <name>.json results plus an errors.json listing failed files"""
+    loop = asyncio.get_running_loop()
+    sink = ZipStreamBuffer()
+    errors = []
+    archive = zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED)
+    try:
+        async for name, ok, payload in results:
+            if ok:
+                # Deflate on a thread so large documents do not stall the event loop
+                await loop.run_in_executor(None, archive.writestr, f"{name}.json", payload)
+                yield sink.drain()
+            else:
+                errors.append({"name": name, "error": payload.decode("utf-8")})
+        archive.writestr("errors.json", json.dumps(errors, indent=2))
+    finally:
+        archive.close()
+    yield sink.drain()
@@ -0,0 +1,178 @@
+"""Bulk conversion of files on disk without going through HTTP"""
+import glob
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from .. import config
+from ..models.gff_models import SUPPORTED_FORMATS
+from .gff_converter import GffConverter, loads_json, loads_msgpack
+from .gff_parser import GffParser
+from .gff_schema import SCHEMAS
+from .json_stream import stream_json_to_gff
+from .mirror import atomic_write, iter_source_files
+from .sqlite_handler import SqliteHandler
+
+
+# Input kinds per operation, as keys of SUPPORTED_FORMATS
+OPERATION_INPUTS = {
+    "gff-to-json": ("gff",),
+    "json-to-gff": ("json", "msgpack"),
+    "sqlite-embed": ("gff",),
+    "sqlite-extract": ("gff",),
+}
+
+
+class BulkError(Exception):
+    """Custom exception for bulk conversion errors"""
+    pass
+
+
+class BulkJob(NamedTuple):
+    operation: str
+    source: str
+    dest: str
+    database: Optional[str] = None  # sqlite-embed only
+
+
+class BulkResult(NamedTuple):
+    job: BulkJob
+    ok: bool
+    error: Optional[str]
+    size: int  # bytes read from source
+
+
+def _extension(name: str) -> str:
+    return os.path.splitext(name)[1].lower().lstrip(".")
+
+
+def output_name(operation: str, name: str) -> str:
+    """Output file name for an input: goblin.bic <-> goblin.bic.json, goblin.bic -> goblin.bic.db"""
+    if operation == "gff-to-json":
+        return name + ".json"
+    if operation == "json-to-gff":
+        stem = os.path.splitext(name)[0]
+        return stem if _extension(stem) in SUPPORTED_FORMATS["gff"] else stem + ".gff"
+    if operation == "sqlite-extract":
+        return name + ".db"
+    return name
+
+
+def expand_inputs(inputs: Sequence[str], operation: str) -> List[Tuple[str, str]]:
+    """(path, name) for every input file; directories are walked and globs expanded.
+
+    name is relative to a directory argument, so the output tree mirrors the
+    input tree, and the base name for files given directly or by glob.
+    """
+    extensions = [e for kind in OPERATION_INPUTS[operation] for e in SUPPORTED_FORMATS[kind]]
+    found: List[Tuple[str, str]] = []
+    for argument in inputs:
+        if os.path.isdir(argument):
+            found.extend((f.path, f.name) for f in iter_source_files(argument, extensions))
+        elif os.path.isfile(argument):
+            found.append((argument, os.path.basename(argument)))
+        elif glob.has_magic(argument):
+            paths = sorted(path for path in glob.glob(argument, recursive=True) if os.path.isfile(path))
+            found.extend((path, os.path.basename(path)) for path in paths if _extension(path) in extensions)
+        else:
+            raise BulkError(f"No such file or directory: {argument}")
+    return found
+
+
+def plan_jobs(
+    inputs: Sequence[str],
+    operation: str,
+    output_dir: Optional[str] = None,
+    database: Optional[str] = None
+) -> List[BulkJob]:
+    """One job per input file. Outputs go under output_dir, or next to their input when it is None."""
+    if operation not in OPERATION_INPUTS:
+        raise BulkError(f"Unknown operation: {operation}")
+    if operation == "sqlite-embed" and (database is None or not os.path.isfile(database)):
+        raise BulkError(f"SQLite database not found: {database}")
+    jobs = []
+    destinations = {}
+    for path, name in expand_inputs(inputs, operation):
+        if output_dir is None:
+            dest = os.path.join(os.path.dirname(path), output_name(operation, os.path.basename(path)))
+        else:
+            dest = os.path.join(output_dir, *output_name(operation, name).split("/"))
+        dest = os.path.abspath(dest)
+        if dest in destinations:
+            raise BulkError(f"{path} and {destinations[dest]} would both be written to {dest}")
+        destinations[dest] = path
+        jobs.append(BulkJob(operation, path, dest, database))
+    return jobs
+
+
+@contextmanager
+def map_file(path: str) -> Iterator[Union[mmap.mmap, bytes]]:
+    """Read-only mmap of a file, so large inputs are parsed without being copied"""
+    with open(path, "rb") as fp:
+        try:
+            mapped = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            mapped = None  # empty files cannot be mapped
+    if mapped is None:
+        yield b""
+        return
+    try:
+        yield mapped
+    finally:
+        try:
+            mapped.close()
+        except BufferError:
+            # A view into the mapping is still alive; it is freed with it
+            pass
+
+
+def _convert(job: BulkJob, data: Union[mmap.mmap, bytes]) -> bytes:
+    if job.operation == "gff-to-json":
+        root = GffParser(SCHEMAS).read_gff_root(data, validate=True)
+        return b"".join(GffConverter(SCHEMAS).iter_json(root))
+    if job.operation == "json-to-gff":
+        if _extension(job.source) in SUPPORTED_FORMATS["msgpack"]:
+            document = loads_msgpack(data)
+        elif len(data) > config.JSON_STREAM_BYTES:
+            return stream_json_to_gff(data)
+        else:
+            document = loads_json(bytes(data))
+        converter = GffConverter()
+        return GffParser().write_gff_root(converter.gff_root_from_json(document))
+    if job.operation == "sqlite-extract":
+        database = SqliteHandler().extract_sqlite(data)
+        if database is None:
+            raise BulkError("No embedded SQLite database found")
+        return database
+    with map_file(job.database) as database:
+        return SqliteHandler().embed_sqlite(data, database)
+
+
+def run_job(job: BulkJob) -> BulkResult:
+    """Convert one file and write its output atomically; errors are returned, not raised"""
+    size = 0
+    try:
+        with map_file(job.source) as data:
+            size = len(data)
+            output = _convert(job, data)
+        atomic_write(job.dest, output)
+        return BulkResult(job, True, None, size)
+    except Exception as e:
+        return BulkResult(job, False, str(e) or type(e).__name__, size)
+
+
+def run_jobs(jobs: Sequence[BulkJob], workers: Optional[int] = None) -> Iterator[BulkResult]:
+    """Results of jobs in order, converted on workers processes (inline for 1).
+
+    Workers receive paths and map the files themselves, so no file contents
+    pass between processes.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) <= 1:
+        yield from map(run_job, jobs)
+        return
+    chunksize = max(1, min(64, len(jobs) // (workers * 4)))
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+        yield from executor.map(run_job, jobs, chunksize=chunksize)
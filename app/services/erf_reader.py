@@ -0,0 +1,151 @@
+"""ERF/MOD/HAK/SAV archive reading"""
+import mmap
+import struct
+from typing import BinaryIO, Dict, Iterator, List, NamedTuple, Optional, Union
+
+from ..models.gff_models import GFF_EXTENSIONS
+
+
+ERF_HEADER = struct.Struct("<4s4s9I")
+ERF_HEADER_SIZE = 160
+ERF_FILE_TYPES = (b"ERF ", b"MOD ", b"HAK ", b"SAV ", b"NWM ")
+
+# Key list entries: ResRef, ResID, ResType, unused
+_KEY_FORMATS = {
+    b"V1.0": "<16sIHH",
+    b"V1.1": "<32sIHH",
+}
+_RESOURCE_FORMAT = "<II"  # offset, size
+
+# Resource type ids used in key tables
+RESOURCE_TYPES: Dict[int, str] = {
+    1: "bmp", 3: "tga", 4: "wav", 6: "plt", 7: "ini", 10: "txt",
+    2002: "mdl", 2009: "nss", 2010: "ncs", 2012: "are", 2013: "set", 2014: "ifo",
+    2015: "bic", 2016: "wok", 2017: "2da", 2018: "tlk", 2022: "txi", 2023: "git",
+    2025: "uti", 2027: "utc", 2029: "dlg", 2030: "itp", 2032: "utt", 2033: "dds",
+    2035: "uts", 2036: "ltr", 2037: "gff", 2038: "fac", 2040: "ute", 2042: "utd",
+    2044: "utp", 2045: "dft", 2046: "gic", 2047: "gui", 2051: "utm", 2052: "dwk",
+    2053: "pwk", 2056: "jrl", 2058: "utw", 2060: "ssf", 2064: "ndb", 2065: "ptm",
+    2066: "ptt", 9997: "erf", 9998: "bif", 9999: "key",
+}
+RESOURCE_TYPE_IDS = {extension: type_id for type_id, extension in RESOURCE_TYPES.items()}
+
+
+class ErfReaderError(Exception):
+    """Custom exception for ERF archive errors"""
+    pass
+
+
+class ErfResource(NamedTuple):
+    """One key/resource list entry; the payload itself is not read"""
+    resref: str
+    res_type: int
+    offset: int
+    size: int
+
+    @property
+    def extension(self) -> str:
+        return RESOURCE_TYPES.get(self.res_type, str(self.res_type))
+
+    @property
+    def name(self) -> str:
+        return f"{self.resref}.{self.extension}"
+
+    @property
+    def is_gff(self) -> bool:
+        return self.extension in GFF_EXTENSIONS
+
+
+class ErfArchive:
+    """Indexed view of an ERF-family archive.
+
+    Only the header, key list and resource list are decoded when the archive
+    is opened. Payloads are handed out as zero-copy memoryview slices of the
+    underlying buffer, which is normally a read-only mmap of the file.
+    """
+
+    def __init__(self, data: Union[bytes, bytearray, memoryview, mmap.mmap]):
+        self._mmap = data if isinstance(data, mmap.mmap) else None
+        self.buffer = memoryview(data).cast("B")
+        try:
+            self._read_index()
+        except struct.error as e:
+            self.close()
+            raise ErfReaderError(f"Binary parsing error: {e}")
+        except ErfReaderError:
+            self.close()
+            raise
+
+    @classmethod
+    def open(cls, source: Union[str, BinaryIO]) -> "ErfArchive":
+        """mmap a path or an open file object and index it"""
+        if isinstance(source, str):
+            with open(source, "rb") as fp:
+                return cls.open(fp)
+        try:
+            mapped = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as e:  # empty file
+            raise ErfReaderError(f"Cannot map archive: {e}")
+        return cls(mapped)
+
+    def _read_index(self) -> None:
+        if len(self.buffer) < ERF_HEADER_SIZE:
+            raise ErfReaderError("File too small to be a valid ERF archive")
+        (file_type, version, self.language_count, self.localized_string_size, entry_count,
+         self.localized_string_offset, key_offset, resource_offset, self.build_year,
+         self.build_day, self.description_str_ref) = ERF_HEADER.unpack_from(self.buffer, 0)
+
+        if file_type not in ERF_FILE_TYPES:
+            raise ErfReaderError(f"Invalid ERF file type: {file_type!r}")
+        key_format = _KEY_FORMATS.get(version)
+        if key_format is None:
+            raise ErfReaderError(f"Unsupported ERF version: {version!r}")
+        self.file_type = file_type.decode("ascii")
+        self.version = version.decode("ascii")
+
+        key_size = struct.calcsize(key_format)
+        if key_offset + entry_count * key_size > len(self.buffer) or \
+                resource_offset + entry_count * 8 > len(self.buffer):
+            raise ErfReaderError("ERF key or resource list extends past end of file")
+
+        ranges = list(struct.iter_unpack(
+            _RESOURCE_FORMAT, self.buffer[resource_offset:resource_offset + entry_count * 8]
+        ))
+        self.resources: List[ErfResource] = []
+        for raw_resref, res_id, res_type, _ in struct.iter_unpack(
+                key_format, self.buffer[key_offset:key_offset + entry_count * key_size]):
+            if res_id >= entry_count:
+                raise ErfReaderError(f"Resource id {res_id} out of range")
+            offset, size = ranges[res_id]
+            if offset + size > len(self.buffer):
+                raise ErfReaderError(f"Resource {res_id} extends past end of file")
+            resref = raw_resref.split(b"\0", 1)[0].decode("cp1252", "replace").lower()
+            self.resources.append(ErfResource(resref, res_type, offset, size))
+        self._by_name = {resource.name: resource for resource in self.resources}
+
+    def find(self, name: str) -> Optional[ErfResource]:
+        """Look up a resource by "resref.ext" (case-insensitive)"""
+        return self._by_name.get(name.lower())
+
+    def data(self, resource: ErfResource) -> memoryview:
+        """Zero-copy view of a resource payload"""
+        return self.buffer[resource.offset:resource.offset + resource.size]
+
+    def gff_resources(self) -> Iterator[ErfResource]:
+        return (resource for resource in self.resources if resource.is_gff)
+
+    def close(self) -> None:
+        self.buffer.release()
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Resource views are still referenced; the mapping goes away with them
+                pass
+            self._mmap = None
+
+    def __enter__(self) -> "ErfArchive":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
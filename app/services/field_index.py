@@ -0,0 +1,357 @@
+"""Persistent SQLite index of field values across GFF files on disk"""
+import os
+import sqlite3
+import threading
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from ..models.gff_models import SUPPORTED_FORMATS, GffDataType
+from .erf_reader import ErfArchive, ErfReaderError
+from .gff_parser import GffParser
+from .result_cache import content_key
+
+
+INDEX_SCHEMA_VERSION = 1
+INDEX_BATCH_SIZE = 64  # changed files parsed (and committed) per batch
+SEARCH_LIMIT = 100
+SEARCH_MAX_LIMIT = 10000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    name TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    file_type TEXT,
+    error TEXT,
+    UNIQUE (source, name)
+);
+CREATE TABLE IF NOT EXISTS fields (
+    file_id INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    label TEXT NOT NULL COLLATE NOCASE,
+    type INTEGER NOT NULL,
+    value TEXT COLLATE NOCASE
+);
+CREATE INDEX IF NOT EXISTS fields_value ON fields (value);
+CREATE INDEX IF NOT EXISTS fields_label_value ON fields (label, value);
+CREATE INDEX IF NOT EXISTS fields_file ON fields (file_id);
+"""
+
+_INTEGER_KINDS = frozenset({
+    GffDataType.GFF_BYTE, GffDataType.GFF_CHAR, GffDataType.GFF_WORD, GffDataType.GFF_SHORT,
+    GffDataType.GFF_DWORD, GffDataType.GFF_INT, GffDataType.GFF_DWORD64, GffDataType.GFF_INT64,
+})
+_FLOAT_KINDS = frozenset({GffDataType.GFF_FLOAT, GffDataType.GFF_DOUBLE})
+
+
+class FieldIndexError(Exception):
+    """Custom exception for field index errors"""
+    pass
+
+
+class IndexEntry(NamedTuple):
+    """A file found under a source, with a loader for its bytes"""
+    name: str
+    mtime_ns: int
+    size: int
+    load: Callable[[], bytes]
+
+
+FieldRow = Tuple[str, str, int, Any]  # path, label, type id, value
+
+
+def extract_rows(data: bytes) -> Tuple[str, List[FieldRow]]:
+    """File type and one (path, label, type id, value) row per value in a GFF.
+
+    Paths use the /query syntax. Locstrings give one row per substring
+    ("FirstName/0") plus "FirstName/id" for the StrRef, as in the JSON
+    output. VOID fields are skipped. DWORD64 values are given as text, since
+    SQLite cannot bind integers of 2^63 and up; the value column has TEXT
+    affinity, so every other integer is stored as the same digits anyway.
+    """
+    root = GffParser().read_gff_root(data, validate=True)
+    rows: List[FieldRow] = []
+    stack = [("", root.top_level_struct)]
+    while stack:
+        prefix, struct = stack.pop()
+        for label, gff_field in struct.fields.items():
+            path = prefix + label
+            kind = gff_field.kind
+            if kind == GffDataType.GFF_STRUCT:
+                if gff_field.structval is not None:
+                    stack.append((path + "/", gff_field.structval))
+            elif kind == GffDataType.GFF_LIST:
+                for position, element in enumerate(gff_field.listval or ()):
+                    stack.append((f"{path}/{position}/", element))
+            elif kind == GffDataType.GFF_LOCSTRING:
+                locstring = gff_field.value
+                if locstring is None:
+                    continue
+                for string_id, text in locstring.entries.items():
+                    rows.append((f"{path}/{string_id}", label, kind.value, text))
+                if locstring.str_ref != 0xFFFFFFFF:
+                    rows.append((f"{path}/id", label, kind.value, locstring.str_ref))
+            elif kind == GffDataType.GFF_DWORD64:
+                rows.append((path, label, kind.value, str(gff_field.value)))
+            elif kind != GffDataType.GFF_VOID:
+                rows.append((path, label, kind.value, gff_field.value))
+    return root.file_type, rows
+
+
+def _extract(data: bytes) -> Tuple[Optional[str], List[FieldRow], Optional[str]]:
+    """extract_rows for a worker: (file type, rows, error message)"""
+    try:
+        file_type, rows = extract_rows(data)
+        return file_type, rows, None
+    except Exception as e:
+        return None, [], str(e) or type(e).__name__
+
+
+def _is_extension(name: str, kind: str) -> bool:
+    return os.path.splitext(name)[1].lower().lstrip(".") in SUPPORTED_FORMATS[kind]
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as fp:
+        return fp.read()
+
+
+def iter_source(source: str) -> Iterator[IndexEntry]:
+    """GFF files in a directory tree, resources in an ERF, or a single GFF file"""
+    if os.path.isdir(source):
+        for directory, subdirectories, filenames in os.walk(source):
+            subdirectories.sort()
+            for filename in sorted(filenames):
+                if not _is_extension(filename, "gff"):
+                    continue
+                path = os.path.join(directory, filename)
+                stat = os.stat(path)
+                name = os.path.relpath(path, source).replace(os.sep, "/")
+                yield IndexEntry(name, stat.st_mtime_ns, stat.st_size, lambda path=path: _read_file(path))
+    elif _is_extension(source, "erf"):
+        stat = os.stat(source)
+        with ErfArchive.open(source) as archive:
+            for resource in archive.gff_resources():
+                yield IndexEntry(
+                    resource.name, stat.st_mtime_ns, resource.size,
+                    lambda resource=resource: bytes(archive.data(resource))
+                )
+    elif _is_extension(source, "gff") and os.path.isfile(source):
+        stat = os.stat(source)
+        yield IndexEntry(os.path.basename(source), stat.st_mtime_ns, stat.st_size, lambda: _read_file(source))
+    else:
+        raise FieldIndexError(f"Not a directory, ERF archive or GFF file: {source}")
+
+
+def _like_pattern(pattern: str) -> str:
+    """SQL LIKE pattern for a value where * matches any run of characters"""
+    escaped = pattern.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped.replace("*", "%")
+
+
+def _typed_value(type_id: int, path: str, value: Any) -> Any:
+    """Stored text back to the value's JSON form"""
+    kind = GffDataType(type_id)
+    if value is None:
+        return None
+    if kind in _INTEGER_KINDS or (kind == GffDataType.GFF_LOCSTRING and path.endswith("/id")):
+        return int(value)
+    if kind in _FLOAT_KINDS:
+        return float(value)
+    return value
+
+
+class FieldIndex:
+    """Field values of many GFF files in one SQLite database.
+
+    Each source (a directory, ERF or GFF file) is indexed incrementally:
+    files whose mtime and size are unchanged are skipped without being
+    read, and files whose content hash is unchanged are not parsed again.
+    Searches use a fresh connection, so they never wait on an update
+    beyond SQLite's own locking.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._update_lock = threading.Lock()
+        connection = self._connect()
+        try:
+            if connection.execute("PRAGMA user_version").fetchone()[0] != INDEX_SCHEMA_VERSION:
+                connection.executescript("DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS fields;")
+                connection.execute(f"PRAGMA user_version = {INDEX_SCHEMA_VERSION}")
+            connection.executescript(_SCHEMA)
+        except sqlite3.Error as e:
+            raise FieldIndexError(f"Cannot open field index {path}: {e}")
+        finally:
+            connection.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = NORMAL")
+        return connection
+
+    @property
+    def updating(self) -> bool:
+        return self._update_lock.locked()
+
+    def update(self, source: str, executor: Optional[Executor] = None) -> Dict[str, int]:
+        """Bring the index for source up to date and report what changed.
+
+        Changed files are parsed in batches, on executor when one is given.
+        Files that fail to parse are recorded with their error and no fields.
+        """
+        source = os.path.abspath(source)
+        with self._update_lock:
+            connection = self._connect()
+            try:
+                return self._update(connection, source, executor)
+            finally:
+                connection.close()
+
+    def _update(self, connection: sqlite3.Connection, source: str, executor: Optional[Executor]) -> Dict[str, int]:
+        stats = {"indexed": 0, "unchanged": 0, "removed": 0, "failed": 0}
+        known = {
+            name: (file_id, mtime_ns, size, file_hash)
+            for file_id, name, mtime_ns, size, file_hash in connection.execute(
+                "SELECT id, name, mtime_ns, size, hash FROM files WHERE source = ?", (source,)
+            )
+        }
+        pending: List[Tuple[IndexEntry, str, bytes]] = []
+        try:
+            for entry in iter_source(source):
+                previous = known.pop(entry.name, None)
+                if previous is not None and previous[1:3] == (entry.mtime_ns, entry.size):
+                    stats["unchanged"] += 1
+                    continue
+                data = entry.load()
+                file_hash = content_key(data)
+                if previous is not None and previous[3] == file_hash:
+                    connection.execute(
+                        "UPDATE files SET mtime_ns = ?, size = ? WHERE id = ?",
+                        (entry.mtime_ns, entry.size, previous[0])
+                    )
+                    stats["unchanged"] += 1
+                    continue
+                pending.append((entry, file_hash, data))
+                if len(pending) >= INDEX_BATCH_SIZE:
+                    self._store(connection, source, pending, executor, stats)
+                    pending = []
+            self._store(connection, source, pending, executor, stats)
+        except (OSError, ErfReaderError) as e:
+            connection.rollback()
+            raise FieldIndexError(f"Cannot read {source}: {e}")
+
+        for file_id, _, _, _ in known.values():
+            connection.execute("DELETE FROM fields WHERE file_id = ?", (file_id,))
+            connection.execute("DELETE FROM files WHERE id = ?", (file_id,))
+            stats["removed"] += 1
+        connection.commit()
+        return stats
+
+    def _store(
+        self,
+        connection: sqlite3.Connection,
+        source: str,
+        pending: List[Tuple[IndexEntry, str, bytes]],
+        executor: Optional[Executor],
+        stats: Dict[str, int]
+    ) -> None:
+        """Parse a batch of changed files and replace their rows"""
+        if not pending:
+            return
+        datas = [data for _, _, data in pending]
+        results = executor.map(_extract, datas, chunksize=8) if executor is not None else map(_extract, datas)
+        for (entry, file_hash, _), (file_type, rows, error) in zip(pending, results):
+            connection.execute(
+                "INSERT INTO files (source, name, mtime_ns, size, hash, file_type, error) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (source, name) DO UPDATE SET mtime_ns = excluded.mtime_ns, size = excluded.size, "
+                "hash = excluded.hash, file_type = excluded.file_type, error = excluded.error",
+                (source, entry.name, entry.mtime_ns, entry.size, file_hash, file_type, error)
+            )
+            file_id = connection.execute(
+                "SELECT id FROM files WHERE source = ? AND name = ?", (source, entry.name)
+            ).fetchone()[0]
+            connection.execute("DELETE FROM fields WHERE file_id = ?", (file_id,))
+            connection.executemany(
+                "INSERT INTO fields (file_id, path, label, type, value) VALUES (?, ?, ?, ?, ?)",
+                ((file_id,) + row for row in rows)
+            )
+            stats["failed" if error else "indexed"] += 1
+        connection.commit()
+
+    def search(
+        self,
+        value: Optional[str] = None,
+        label: Optional[str] = None,
+        path: Optional[str] = None,
+        file_type: Optional[str] = None,
+        limit: int = SEARCH_LIMIT
+    ) -> List[Dict[str, Any]]:
+        """Fields matching every given filter.
+
+        value and label compare case-insensitively and path exactly; all
+        three accept * as a wildcard. file_type is the four-letter GFF type
+        such as "BIC".
+        """
+        conditions = []
+        params: List[Any] = []
+        for column, pattern in (("fields.value", value), ("fields.label", label)):
+            if pattern is None:
+                continue
+            if "*" in pattern:
+                conditions.append(f"{column} LIKE ? ESCAPE '\\'")
+                params.append(_like_pattern(pattern))
+            else:
+                conditions.append(f"{column} = ?")
+                params.append(pattern)
+        if path is not None:
+            conditions.append("fields.path GLOB ?" if "*" in path else "fields.path = ?")
+            params.append(path)
+        if not conditions:
+            raise FieldIndexError("Give at least one of value, label or path")
+        if file_type is not None:
+            conditions.append("RTRIM(files.file_type) = ?")
+            params.append(file_type.strip().upper())
+        params.append(max(1, min(limit, SEARCH_MAX_LIMIT)))
+
+        connection = self._connect()
+        try:
+            cursor = connection.execute(
+                "SELECT files.source, files.name, files.file_type, fields.path, fields.label, fields.type, fields.value "
+                "FROM fields JOIN files ON files.id = fields.file_id "
+                f"WHERE {' AND '.join(conditions)} LIMIT ?",
+                params
+            )
+            return [
+                {
+                    "source": source,
+                    "file": name,
+                    "file_type": (row_file_type or "").strip(),
+                    "path": field_path,
+                    "label": field_label,
+                    "type": GffDataType(type_id).name,
+                    "value": _typed_value(type_id, field_path, field_value)
+                }
+                for source, name, row_file_type, field_path, field_label, type_id, field_value in cursor
+            ]
+        except sqlite3.Error as e:
+            raise FieldIndexError(f"Search failed: {e}")
+        finally:
+            connection.close()
+
+    def stats(self) -> Dict[str, Any]:
+        connection = self._connect()
+        try:
+            files, failed = connection.execute(
+                "SELECT COUNT(*), COUNT(error) FROM files"
+            ).fetchone()
+            fields = connection.execute("SELECT COUNT(*) FROM fields").fetchone()[0]
+            sources = [source for source, in connection.execute("SELECT DISTINCT source FROM files ORDER BY source")]
+            return {"files": files, "failed": failed, "fields": fields, "sources": sources, "updating": self.updating}
+        finally:
+            connection.close()
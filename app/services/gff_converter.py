@@ -1,7 +1,62 @@
 """GFF to JSON conversion logic based on the Nim implementation"""
 import json
-from typing import Any, Dict, List
-from ..models.gff_models import GffDataType, GffField, GffStruct, GffRoot
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple, Union
+from ..models.gff_models import GffDataType, GffField, GffLocString, GffStruct, GffRoot
+from . import msgpack_codec
+from .msgpack_codec import encoded_str
+
+
+JSON_CHUNK_SIZE = 4096  # fields per streamed chunk
+
+
+LABEL_ORDER_CACHE_SIZE = 4096  # distinct (struct id, label set) signatures kept
+
+
+@lru_cache(maxsize=LABEL_ORDER_CACHE_SIZE)
+def sorted_labels(struct_id: int, labels: Tuple[str, ...]) -> Tuple[str, ...]:
+    """Case-insensitive output order for a struct signature.
+
+    Structs sharing an id and label layout (every ItemList or ClassList
+    entry, say) reuse the same ordering, so the sort runs once per
+    signature instead of once per struct, across requests.
+    """
+    return tuple(sorted(labels, key=str.lower))
+
+
+# MessagePack encoder per numeric field kind; FLOAT stays single precision
+_SCALAR_PACKERS = {
+    GffDataType.GFF_BYTE: msgpack_codec.pack_int,
+    GffDataType.GFF_CHAR: msgpack_codec.pack_int,
+    GffDataType.GFF_WORD: msgpack_codec.pack_int,
+    GffDataType.GFF_SHORT: msgpack_codec.pack_int,
+    GffDataType.GFF_DWORD: msgpack_codec.pack_int,
+    GffDataType.GFF_INT: msgpack_codec.pack_int,
+    GffDataType.GFF_DWORD64: msgpack_codec.pack_int,
+    GffDataType.GFF_INT64: msgpack_codec.pack_int,
+    GffDataType.GFF_FLOAT: msgpack_codec.pack_float32,
+    GffDataType.GFF_DOUBLE: msgpack_codec.pack_float64,
+}
+
+
+def json_scalar(value: Any) -> Tuple[GffDataType, Any]:
+    """GFF kind and value for a JSON scalar (or MessagePack bytes); integers past 64 bits raise GffConverterError"""
+    if isinstance(value, str):
+        return GffDataType.GFF_STRING, value
+    if isinstance(value, bool):
+        return GffDataType.GFF_BYTE, 1 if value else 0
+    if isinstance(value, int):
+        if -2 ** 31 <= value < 2 ** 31:
+            return GffDataType.GFF_INT, value
+        if -2 ** 63 <= value < 2 ** 63:
+            return GffDataType.GFF_INT64, value
+        raise GffConverterError(f"Integer {value} does not fit a 64-bit field")
+    if isinstance(value, float):
+        return GffDataType.GFF_FLOAT, value
+    if isinstance(value, (bytes, bytearray)):
+        # Only MessagePack input carries raw bytes
+        return GffDataType.GFF_VOID, bytes(value)
+    return GffDataType.GFF_STRING, str(value)
 
 
 class GffConverterError(Exception):
@@ -9,23 +64,59 @@ class GffConverterError(Exception):
     pass
 
 
+def _reject_duplicate_keys(pairs: List[Tuple[str, Any]]) -> Dict[str, Any]:
+    obj = dict(pairs)
+    if len(obj) != len(pairs):
+        seen = set()
+        for label, _ in pairs:
+            if label in seen:
+                raise GffConverterError(f"Duplicate key {label!r}")
+            seen.add(label)
+    return obj
+
+
+def loads_json(data: Union[str, bytes, bytearray]) -> Any:
+    """json.loads that rejects duplicate keys, like stream_json_to_gff"""
+    return json.loads(data, object_pairs_hook=_reject_duplicate_keys)
+
+
+def loads_msgpack(data: Union[bytes, bytearray, memoryview]) -> Any:
+    """msgpack_codec.unpackb that rejects duplicate map keys, as loads_json does"""
+    return msgpack_codec.unpackb(data, object_pairs_hook=_reject_duplicate_keys)
+
+
 class GffConverter:
     """Handles conversion between GFF and JSON formats"""
     
+    def __init__(self, schemas: Optional[Mapping[str, Any]] = None, tlk: Optional[Any] = None):
+        # Compiled GffSchema per file type (see gff_schema); unmatched structs are encoded generically
+        self.schemas = schemas if schemas is not None else {}
+        # TlkResolver (see tlk_reader); when set, CExoLocStrings also carry their StrRef's text
+        self.tlk = tlk
+    
     def to_json(self, root: GffRoot) -> Dict[str, Any]:
-        """Convert GffRoot to JSON-compatible dictionary"""
+        """Convert GffRoot to JSON-compatible dictionary with keys in sorted order"""
         try:
-            result = {}
-            
             # Convert top-level struct to JSON
-            for key, field in root.top_level_struct.fields.items():
-                result[key] = self._field_to_json(field)
-            
-            return result
+            return self._struct_to_json(root.top_level_struct)
             
         except Exception as e:
             raise GffConverterError(f"Failed to convert GFF to JSON: {e}")
     
+    def value_to_json(self, node: Union[GffField, GffStruct]) -> Any:
+        """JSON form of one field or struct, as it appears inside to_json output.
+
+        Accepts GffField/GffStruct as well as their lazy GffView counterparts.
+        """
+        if isinstance(node, GffField):
+            return self._field_to_json(node)
+        try:
+            return self._struct_to_json(node)
+        except GffConverterError:
+            raise
+        except Exception as e:
+            raise GffConverterError(f"Failed to convert struct: {e}")
+    
     def _field_to_json(self, field: GffField) -> Any:
         """Convert a single GFF field to JSON value"""
         try:
@@ -39,13 +130,28 @@ class GffConverter:
                 return field.bval or 0
             elif field.kind == GffDataType.GFF_DWORD:
                 return field.dval or 0
+            elif field.kind == GffDataType.GFF_CHAR:
+                return field.cval or 0
+            elif field.kind == GffDataType.GFF_WORD:
+                return field.wval or 0
+            elif field.kind == GffDataType.GFF_SHORT:
+                return field.sval or 0
+            elif field.kind == GffDataType.GFF_DWORD64:
+                return field.d64val or 0
+            elif field.kind == GffDataType.GFF_INT64:
+                return field.i64val or 0
+            elif field.kind == GffDataType.GFF_DOUBLE:
+                return field.dblval or 0.0
+            elif field.kind == GffDataType.GFF_RESREF:
+                return field.resval or ""
+            elif field.kind == GffDataType.GFF_LOCSTRING:
+                return self._locstring_to_json(field.locval)
             elif field.kind == GffDataType.GFF_STRUCT:
                 if field.structval:
-                    result = {}
-                    for k, v in field.structval.fields.items():
-                        result[k] = self._field_to_json(v)
-                    return result
+                    return self._struct_to_json(field.structval)
                 return {}
+            elif field.kind == GffDataType.GFF_LIST:
+                return [self._struct_to_json(s) for s in field.listval or []]
             elif field.kind == GffDataType.GFF_VOID:
                 return field.voidval.decode('latin-1') if field.voidval else ""
             else:
@@ -54,12 +160,194 @@ class GffConverter:
         except Exception as e:
             raise GffConverterError(f"Failed to convert field {field}: {e}")
     
+    def _struct_to_json(self, struct: GffStruct) -> Dict[str, Any]:
+        """Convert a GFF struct to a JSON object, emitting keys case-insensitively sorted"""
+        fields = struct.fields
+        return {
+            label: self._field_to_json(fields[label])
+            for label in sorted_labels(struct.id, tuple(fields))
+        }
+    
+    def _locstring_to_json(self, locstring: Optional[GffLocString]) -> Dict[str, Any]:
+        """Convert a CExoLocString to {"id": strref, "<string id>": text, ..., "tlk": talk table text}"""
+        result = {}
+        if locstring is None:
+            return result
+        for string_id in sorted(locstring.entries, key=str):
+            result[str(string_id)] = locstring.entries[string_id]
+        if locstring.str_ref != 0xFFFFFFFF:
+            result["id"] = locstring.str_ref
+            if self.tlk is not None:
+                text = self.tlk.resolve(locstring.str_ref)
+                if text is not None:
+                    result["tlk"] = text
+        return result
+    
+    def iter_json(self, root: GffRoot, chunk_size: int = JSON_CHUNK_SIZE) -> Iterator[bytes]:
+        """Stream root as UTF-8 JSON with keys already sorted case-insensitively.
+
+        Produces the same document as serializing post_process_json(to_json(root)),
+        but only keeps one iterator per open struct/list plus the pending chunk,
+        so memory is bounded by nesting depth rather than file size. Works on
+        GffRoot and on lazy GffView trees. Structs matching a layout of the
+        schema registered for root.file_type are encoded by its compiled
+        encoder, a run of scalar fields at a time. A struct reachable more
+        than once raises GffConverterError instead of looping.
+        """
+        try:
+            dumps = json.dumps
+            schema = self.schemas.get(root.file_type) if self.schemas else None
+            fields_of = self._sorted_fields if schema is None else (
+                lambda struct: self._schema_fields(schema, struct)
+            )
+            # A tree reaching one struct twice (a cycle) would never finish streaming.
+            # GffView hands out a new view per access, so views are keyed by struct index.
+            seen = set()
+
+            def struct_items(struct):
+                if struct is not None:
+                    key = id(struct) if struct.__class__ is GffStruct else struct.index
+                    if key in seen:
+                        raise GffConverterError("Struct is reachable more than once")
+                    seen.add(key)
+                return fields_of(struct)
+
+            parts = ["{"]
+            pending = 1
+            stack = [(struct_items(root.top_level_struct), "}")]
+            first = True
+            while stack:
+                items, closer = stack[-1]
+                item = next(items, None)
+                if item is None:
+                    stack.pop()
+                    parts.append(closer)
+                    first = False
+                    continue
+                if not first:
+                    parts.append(",")
+                first = False
+                
+                if closer == "]":
+                    # List element
+                    parts.append("{")
+                    stack.append((struct_items(item), "}"))
+                    first = True
+                    continue
+                
+                if item.__class__ is str:
+                    # A run of scalar fields already encoded by a schema layout
+                    parts.append(item)
+                    pending += 1
+                    continue
+                
+                label, field = item
+                parts.append(dumps(label, ensure_ascii=False))
+                parts.append(":")
+                if field.kind == GffDataType.GFF_STRUCT:
+                    parts.append("{")
+                    stack.append((struct_items(field.structval), "}"))
+                    first = True
+                elif field.kind == GffDataType.GFF_LIST:
+                    parts.append("[")
+                    stack.append((iter(field.listval or ()), "]"))
+                    first = True
+                else:
+                    parts.append(self._scalar_json(field))
+                
+                pending += 1
+                if pending >= chunk_size:
+                    yield "".join(parts).encode("utf-8")
+                    parts = []
+                    pending = 0
+            
+            yield "".join(parts).encode("utf-8")
+            
+        except GffConverterError:
+            raise
+        except Exception as e:
+            raise GffConverterError(f"Failed to stream GFF as JSON: {e}")
+    
+    def to_json_bytes(self, root: GffRoot) -> bytes:
+        """Convert root straight to a UTF-8 JSON document with sorted keys"""
+        return b"".join(self.iter_json(root))
+    
+    def to_msgpack(self, root: GffRoot) -> bytes:
+        """Encode root as MessagePack straight from the GFF tree.
+
+        Keys come out in the same order as the JSON output and values map the
+        same way, except that FLOAT is sent as float32, DOUBLE as float64 and
+        VOID as bin rather than a latin-1 string, so nothing is lost.
+        """
+        try:
+            out = bytearray()
+            self._pack_struct(out, root.top_level_struct)
+            return bytes(out)
+        except GffConverterError:
+            raise
+        except Exception as e:
+            raise GffConverterError(f"Failed to convert GFF to MessagePack: {e}")
+    
+    def _pack_struct(self, out: bytearray, struct: Optional[GffStruct]) -> None:
+        if struct is None:
+            msgpack_codec.pack_map_header(out, 0)
+            return
+        fields = struct.fields
+        labels = sorted_labels(struct.id, tuple(fields))
+        msgpack_codec.pack_map_header(out, len(labels))
+        for label in labels:
+            out += encoded_str(label)
+            self._pack_field(out, fields[label])
+    
+    def _pack_field(self, out: bytearray, field: GffField) -> None:
+        kind = field.kind
+        packer = _SCALAR_PACKERS.get(kind)
+        if packer is not None:
+            packer(out, field.value or 0)
+        elif kind == GffDataType.GFF_STRUCT:
+            self._pack_struct(out, field.structval)
+        elif kind == GffDataType.GFF_LIST:
+            structs = field.listval or []
+            msgpack_codec.pack_array_header(out, len(structs))
+            for struct in structs:
+                self._pack_struct(out, struct)
+        elif kind in (GffDataType.GFF_STRING, GffDataType.GFF_RESREF):
+            msgpack_codec.pack_str(out, field.value or "")
+        elif kind == GffDataType.GFF_VOID:
+            msgpack_codec.pack_bin(out, field.value or b"")
+        elif kind == GffDataType.GFF_LOCSTRING:
+            msgpack_codec.pack(out, self._locstring_to_json(field.locval))
+        else:
+            msgpack_codec.pack_str(out, "")  # Default for unsupported types, as in JSON
+    
+    def _scalar_json(self, field: GffField) -> str:
+        """JSON text of a non-struct, non-list field"""
+        return json.dumps(self._field_to_json(field), ensure_ascii=False, separators=(",", ":"))
+    
+    def _schema_fields(self, schema: Any, struct: Optional[GffStruct]) -> Iterator[Any]:
+        """iter_json items for a struct, pre-encoded when it matches a layout of schema"""
+        if struct.__class__ is GffStruct:
+            fields = struct.fields
+            layout = schema.json_layout(tuple(fields))
+            if layout is not None:
+                values = tuple(fields.values())
+                if layout.kinds == tuple([field.kind for field in values]):
+                    return iter(layout.encode_json(values, self._scalar_json))
+        return self._sorted_fields(struct)
+    
+    def _sorted_fields(self, struct: Optional[GffStruct]) -> Iterator[Tuple[str, GffField]]:
+        """Iterate a struct's fields in case-insensitive label order"""
+        if struct is None:
+            return iter(())
+        fields = struct.fields
+        return ((label, fields[label]) for label in sorted_labels(struct.id, tuple(fields)))
+    
     def gff_root_from_json(self, json_data: Dict[str, Any]) -> GffRoot:
         """Create GffRoot from JSON data"""
         try:
             root = GffRoot(
                 structs=[],
-                top_level_struct=GffStruct(id=0, fields={})
+                top_level_struct=GffStruct(id=0xFFFFFFFF, fields={})
             )
             
             for key, value in json_data.items():
@@ -73,21 +361,23 @@ class GffConverter:
     def _json_to_field(self, key: str, value: Any) -> GffField:
         """Convert JSON value to GFF field"""
         try:
-            if isinstance(value, str):
-                return GffField(kind=GffDataType.GFF_STRING, strval=value)
-            elif isinstance(value, int):
-                return GffField(kind=GffDataType.GFF_INT, ival=value)
-            elif isinstance(value, float):
-                return GffField(kind=GffDataType.GFF_FLOAT, fval=value)
-            elif isinstance(value, bool):
-                return GffField(kind=GffDataType.GFF_BYTE, bval=1 if value else 0)
-            elif isinstance(value, dict):
+            if isinstance(value, dict):
                 struct = GffStruct(id=0, fields={})
                 for k, v in value.items():
                     struct.fields[k] = self._json_to_field(k, v)
                 return GffField(kind=GffDataType.GFF_STRUCT, structval=struct)
+            elif isinstance(value, list):
+                elements = []
+                for item in value:
+                    if not isinstance(item, dict):
+                        raise GffConverterError(f"List {key} may only contain objects")
+                    element = GffStruct(id=0, fields={})
+                    for k, v in item.items():
+                        element.fields[k] = self._json_to_field(k, v)
+                    elements.append(element)
+                return GffField(kind=GffDataType.GFF_LIST, listval=elements)
             else:
-                return GffField(kind=GffDataType.GFF_STRING, strval=str(value))
+                return GffField(*json_scalar(value))
                 
         except Exception as e:
             raise GffConverterError(f"Failed to convert JSON field {key}: {e}")
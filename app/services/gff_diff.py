@@ -0,0 +1,203 @@
+"""Structural GFF diff and content hashing over Merkle subtree hashes"""
+import hashlib
+from typing import Any, Dict, List, NamedTuple, Optional, Union
+
+from ..models.gff_models import GffDataType, GffField, GffLocString, GffRoot, GffStruct
+from .gff_converter import GffConverter
+from .gff_parser import INLINE_FORMATS, GffParser, GffWriter
+
+
+DIGEST_SIZE = 16
+_converter = GffConverter()
+_parser = GffParser()
+
+
+class HashNode(NamedTuple):
+    """A field or struct together with the hash of everything below it.
+
+    children holds label -> HashNode for structs, the element nodes for
+    lists, and is None for plain values. Plain values use their canonical
+    bytes as the digest; they are short and hashing each one costs more
+    than it saves.
+    """
+    digest: bytes
+    kind: GffDataType
+    value: Union[GffField, GffStruct]
+    children: Any = None
+    struct_id: Optional[int] = None
+
+
+class GffDiff(NamedTuple):
+    old_hash: str
+    new_hash: str
+    changes: List[Dict[str, Any]]
+
+    @property
+    def equal(self) -> bool:
+        return self.old_hash == self.new_hash
+
+
+def _digest(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=DIGEST_SIZE).digest()
+
+
+def _value_bytes(gff_field: GffField) -> bytes:
+    """Canonical bytes for a plain field value, as GffWriter would store it"""
+    inline = INLINE_FORMATS.get(gff_field.kind)
+    if inline is not None:
+        return inline.pack(gff_field.value or 0)
+    value = gff_field.value
+    if gff_field.kind == GffDataType.GFF_LOCSTRING and value is not None:
+        # Substring order in the file carries no meaning
+        value = GffLocString(value.str_ref, dict(sorted(value.entries.items())))
+    return GffWriter.encode_payload(gff_field.kind, value)
+
+
+def hash_struct(struct: GffStruct) -> HashNode:
+    """Hash a struct and every subtree below it in one pass.
+
+    A struct hashes its id and its fields in label order, so files that
+    differ only in field order hash the same. Each field adds its label, its
+    type and the digest of its value bytes or of the struct or list below
+    it, so equal digests mean equal subtrees.
+    """
+    hasher = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    hasher.update(struct.id.to_bytes(4, "little"))
+    children: Dict[str, HashNode] = {}
+    fields = struct.fields
+    update = hasher.update
+    for label in sorted(fields):
+        node = _hash_field(fields[label])
+        children[label] = node
+        raw_label = label.encode("utf-8")
+        update(b"%c%s%c%s%s" % (
+            len(raw_label), raw_label, node.kind.value, len(node.digest).to_bytes(4, "little"), node.digest
+        ))
+    return HashNode(hasher.digest(), GffDataType.GFF_STRUCT, struct, children, struct.id)
+
+
+def _hash_field(gff_field: GffField) -> HashNode:
+    kind = gff_field.kind
+    if kind == GffDataType.GFF_STRUCT:
+        return hash_struct(gff_field.structval)._replace(value=gff_field)
+    if kind == GffDataType.GFF_LIST:
+        elements = [hash_struct(element) for element in gff_field.listval or ()]
+        digest = _digest(len(elements).to_bytes(4, "little") + b"".join(e.digest for e in elements))
+        return HashNode(digest, kind, gff_field, elements)
+    return HashNode(_value_bytes(gff_field), kind, gff_field)
+
+
+def _file_hash(root: GffRoot, node: HashNode) -> str:
+    return _digest(f"{root.file_type}{root.file_version}".encode("ascii", "replace") + node.digest).hex()
+
+
+def content_hash(data: Union[bytes, bytearray, memoryview]) -> str:
+    """Canonical hash of a GFF's content: file type, version and the whole field tree.
+
+    Two files hash equal when they hold the same values, whatever order or
+    layout their writers used for fields, labels and field data.
+    """
+    root = _parser.read_gff_root(data, True)
+    return _file_hash(root, hash_struct(root.top_level_struct))
+
+
+def _typed(node: HashNode) -> Dict[str, Any]:
+    """{"type", "value"} for reporting a node, value in the JSON output's form"""
+    value = node.value
+    if isinstance(value, GffStruct):
+        return {"type": GffDataType.GFF_STRUCT.name, "id": node.struct_id, "value": _converter.value_to_json(value)}
+    typed = {"type": node.kind.name, "value": _converter.value_to_json(value)}
+    if node.struct_id is not None:
+        typed["id"] = node.struct_id
+    return typed
+
+
+def _join(path: str, step: Union[str, int]) -> str:
+    return f"{path}/{step}" if path else str(step)
+
+
+def diff_nodes(old: HashNode, new: HashNode, path: str = "", changes: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """Append the differences between two hashed subtrees to changes.
+
+    Subtrees with equal digests are skipped without being visited.
+    """
+    if changes is None:
+        changes = []
+    if old.kind == new.kind and old.digest == new.digest:
+        return changes
+    if old.kind != new.kind:
+        changes.append({"path": path, "change": "changed", "old": _typed(old), "new": _typed(new)})
+    elif old.kind == GffDataType.GFF_STRUCT:
+        if old.struct_id != new.struct_id:
+            changes.append({
+                "path": path,
+                "change": "changed",
+                "old": {"type": old.kind.name, "id": old.struct_id},
+                "new": {"type": new.kind.name, "id": new.struct_id}
+            })
+        for label, old_child in old.children.items():
+            new_child = new.children.get(label)
+            if new_child is None:
+                changes.append({"path": _join(path, label), "change": "removed", "old": _typed(old_child)})
+            else:
+                diff_nodes(old_child, new_child, _join(path, label), changes)
+        for label, new_child in new.children.items():
+            if label not in old.children:
+                changes.append({"path": _join(path, label), "change": "added", "new": _typed(new_child)})
+    elif old.kind == GffDataType.GFF_LIST:
+        _diff_lists(old.children, new.children, path, changes)
+    else:
+        changes.append({"path": path, "change": "changed", "old": _typed(old), "new": _typed(new)})
+    return changes
+
+
+def _diff_lists(old: List[HashNode], new: List[HashNode], path: str, changes: List[Dict[str, Any]]) -> None:
+    """Diff list entries, matching unchanged runs at both ends by digest.
+
+    An entry inserted or removed in the middle of a long list is reported
+    once instead of shifting every entry after it. The remaining entries
+    are compared position by position.
+    """
+    prefix = 0
+    while prefix < min(len(old), len(new)) and old[prefix].digest == new[prefix].digest:
+        prefix += 1
+    suffix = 0
+    while (suffix < min(len(old), len(new)) - prefix
+           and old[len(old) - 1 - suffix].digest == new[len(new) - 1 - suffix].digest):
+        suffix += 1
+
+    old_middle = old[prefix:len(old) - suffix]
+    new_middle = new[prefix:len(new) - suffix]
+    paired = min(len(old_middle), len(new_middle))
+    for offset in range(paired):
+        diff_nodes(old_middle[offset], new_middle[offset], _join(path, prefix + offset), changes)
+    for offset in range(paired, len(old_middle)):
+        changes.append({"path": _join(path, prefix + offset), "change": "removed", "old": _typed(old_middle[offset])})
+    for offset in range(paired, len(new_middle)):
+        changes.append({"path": _join(path, prefix + offset), "change": "added", "new": _typed(new_middle[offset])})
+
+
+def diff_gff(old_data: Union[bytes, bytearray, memoryview], new_data: Union[bytes, bytearray, memoryview]) -> GffDiff:
+    """Differing paths between two GFF files, with old and new typed values.
+
+    Paths use the /query syntax. Removed list entries are numbered as in the
+    old file and added ones as in the new file.
+    """
+    old_root = _parser.read_gff_root(old_data, True)
+    new_root = _parser.read_gff_root(new_data, True)
+    old_node = hash_struct(old_root.top_level_struct)
+    new_node = hash_struct(new_root.top_level_struct)
+    changes: List[Dict[str, Any]] = []
+    # Header fields are part of the file hash, so a difference in either is reported too
+    for attribute, change_type in (("file_type", "FILE_TYPE"), ("file_version", "FILE_VERSION")):
+        old_value = getattr(old_root, attribute)
+        new_value = getattr(new_root, attribute)
+        if old_value != new_value:
+            changes.append({
+                "path": "",
+                "change": "changed",
+                "old": {"type": change_type, "value": old_value},
+                "new": {"type": change_type, "value": new_value}
+            })
+    diff_nodes(old_node, new_node, "", changes)
+    return GffDiff(_file_hash(old_root, old_node), _file_hash(new_root, new_node), changes)
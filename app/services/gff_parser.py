@@ -1,7 +1,40 @@
 """GFF binary parsing logic based on the Nim implementation"""
 import struct
-from typing import Dict, List, Optional, Union
-from ..models.gff_models import GffDataType, GffField, GffStruct, GffRoot
+from array import array
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Union
+from ..models.gff_models import GffDataType, GffField, GffLocString, GffStruct, GffRoot
+
+
+GFF_VERSION = b"V3.2"
+GFF_ENCODING = "cp1252"
+GFF_HEADER = struct.Struct("<4s4s12I")
+LABEL_SIZE = 16
+
+_UINT8 = struct.Struct("<B")
+_UINT32 = struct.Struct("<I")
+_LOCSTRING_HEADER = struct.Struct("<III")  # total size, StrRef, string count
+_LOCSTRING_ENTRY = struct.Struct("<iI")    # StringID, length
+
+_KINDS = {kind.value: kind for kind in GffDataType}
+_UNSEEN = object()
+
+# Simple types stored directly in the 4-byte DataOrDataOffset slot of the field entry
+INLINE_FORMATS = {
+    GffDataType.GFF_BYTE: struct.Struct("<B"),
+    GffDataType.GFF_CHAR: struct.Struct("<b"),
+    GffDataType.GFF_WORD: struct.Struct("<H"),
+    GffDataType.GFF_SHORT: struct.Struct("<h"),
+    GffDataType.GFF_DWORD: struct.Struct("<I"),
+    GffDataType.GFF_INT: struct.Struct("<i"),
+    GffDataType.GFF_FLOAT: struct.Struct("<f"),
+}
+
+# Fixed-size types stored in the field data block
+WIDE_FORMATS = {
+    GffDataType.GFF_DWORD64: struct.Struct("<Q"),
+    GffDataType.GFF_INT64: struct.Struct("<q"),
+    GffDataType.GFF_DOUBLE: struct.Struct("<d"),
+}
 
 
 class GffParserError(Exception):
@@ -9,47 +42,235 @@ class GffParserError(Exception):
     pass
 
 
+class GffInputError(GffParserError):
+    """Raised by GffWriter for a label or value that a GFF file cannot hold.
+
+    This is a fault of the document being written, not of the writer, so
+    callers can answer it as bad input rather than an internal failure.
+    """
+    pass
+
+
+class GffHeader(NamedTuple):
+    """The 56-byte GFF V3.2 header: section offsets and counts"""
+    file_type: bytes
+    file_version: bytes
+    struct_offset: int
+    struct_count: int
+    field_offset: int
+    field_count: int
+    label_offset: int
+    label_count: int
+    field_data_offset: int
+    field_data_size: int
+    field_indices_offset: int
+    field_indices_size: int
+    list_indices_offset: int
+    list_indices_size: int
+
+
+def read_gff_header(buf: memoryview, validate: bool = True) -> GffHeader:
+    """Decode and sanity check the GFF header at the start of buf"""
+    if len(buf) < GFF_HEADER.size:
+        raise GffParserError("File too small to be a valid GFF file")
+
+    header = GffHeader(*GFF_HEADER.unpack_from(buf, 0))
+
+    if validate:
+        if not header.file_type.isascii() or not header.file_type.strip():
+            raise GffParserError(f"Invalid GFF file type: {header.file_type!r}")
+        if header.file_version != GFF_VERSION:
+            raise GffParserError(f"Unsupported GFF version: {header.file_version!r}")
+        sections = (
+            (header.struct_offset, header.struct_count * 12),
+            (header.field_offset, header.field_count * 12),
+            (header.label_offset, header.label_count * LABEL_SIZE),
+            (header.field_data_offset, header.field_data_size),
+            (header.field_indices_offset, header.field_indices_size),
+            (header.list_indices_offset, header.list_indices_size),
+        )
+        for offset, size in sections:
+            if offset + size > len(buf):
+                raise GffParserError("GFF section extends past end of file")
+        if header.struct_count == 0:
+            raise GffParserError("GFF file has no top-level struct")
+
+    return header
+
+
+def decode_label(raw: bytes) -> str:
+    """Decode a NUL-padded 16-byte label"""
+    return raw.split(b"\0", 1)[0].decode(GFF_ENCODING, "replace")
+
+
+def read_string(buf: memoryview, offset: int) -> str:
+    size = _UINT32.unpack_from(buf, offset)[0]
+    return str(buf[offset + 4:offset + 4 + size], GFF_ENCODING, "replace")
+
+
+def read_resref(buf: memoryview, offset: int) -> str:
+    size = _UINT8.unpack_from(buf, offset)[0]
+    return str(buf[offset + 1:offset + 1 + size], GFF_ENCODING, "replace")
+
+
+def read_void(buf: memoryview, offset: int) -> bytes:
+    size = _UINT32.unpack_from(buf, offset)[0]
+    if offset + 4 + size > len(buf):
+        raise GffParserError("VOID field extends past end of file")
+    return bytes(buf[offset + 4:offset + 4 + size])
+
+
+def read_locstring(buf: memoryview, offset: int) -> GffLocString:
+    _, str_ref, count = _LOCSTRING_HEADER.unpack_from(buf, offset)
+    entries = {}
+    pos = offset + _LOCSTRING_HEADER.size
+    for _ in range(count):
+        string_id, size = _LOCSTRING_ENTRY.unpack_from(buf, pos)
+        pos += _LOCSTRING_ENTRY.size
+        entries[string_id] = str(buf[pos:pos + size], GFF_ENCODING, "replace")
+        pos += size
+    return GffLocString(str_ref=str_ref, entries=entries)
+
+
+class StructTable:
+    """The structs of one file, each handed out to at most one STRUCT field or list.
+
+    Indexing claims a struct, so a file in which a struct is referenced twice
+    (or the top-level struct at all) fails to parse instead of producing a
+    shared or cyclic tree that every walker would loop over.
+    """
+
+    __slots__ = ("structs", "claimed")
+
+    def __init__(self, structs: List[GffStruct]):
+        self.structs = structs
+        self.claimed = bytearray(len(structs))
+        if structs:
+            self.claimed[0] = 1
+
+    def __getitem__(self, index: int) -> GffStruct:
+        if self.claimed[index]:
+            raise GffParserError(f"Struct {index} is referenced more than once")
+        self.claimed[index] = 1
+        return self.structs[index]
+
+
+def read_list(buf: memoryview, structs: Union[StructTable, List[GffStruct]], offset: int) -> List[GffStruct]:
+    """The structs of a list whose count and indices start at an absolute offset"""
+    count = _UINT32.unpack_from(buf, offset)[0]
+    return [structs[i] for i in struct.unpack_from(f"<{count}I", buf, offset + 4)]
+
+
+# Reader per variable-size type stored in the field data block
+FIELD_DATA_READERS = {
+    GffDataType.GFF_STRING: read_string,
+    GffDataType.GFF_RESREF: read_resref,
+    GffDataType.GFF_VOID: read_void,
+    GffDataType.GFF_LOCSTRING: read_locstring,
+}
+
+
+def decode_field_data(buf: memoryview, kind: GffDataType, offset: int):
+    """Decode a complex (non-inline, non-struct, non-list) value at an absolute offset"""
+    wide = WIDE_FORMATS.get(kind)
+    if wide is not None:
+        return wide.unpack_from(buf, offset)[0]
+
+    reader = FIELD_DATA_READERS.get(kind)
+    if reader is not None:
+        return reader(buf, offset)
+
+    raise GffParserError(f"Unsupported GFF field type: {kind}")
+
+
 class GffParser:
     """GFF binary file parser"""
     
-    def __init__(self):
-        self.header_format = '<4sIII'  # Little-endian: magic, version, structCount, fieldCount
-        self.field_format = '<III'     # type, offset, size
+    def __init__(self, schemas: Optional[Mapping[str, Any]] = None):
+        self.header_format = GFF_HEADER.format  # Little-endian: type, version, 6 x (offset, count)
+        self.field_format = '<III'     # type, label index, data or data offset
+        # Compiled GffSchema per file type (see gff_schema); unmatched structs are decoded generically
+        self.schemas = schemas if schemas is not None else {}
     
-    def read_gff_root(self, data: bytes, validate: bool = True) -> GffRoot:
+    def read_gff_root(self, data: Union[bytes, bytearray, memoryview], validate: bool = True) -> GffRoot:
         """Read GFF data from bytes and return GffRoot"""
         try:
-            if len(data) < 16:  # Minimum header size
-                raise GffParserError("File too small to be a valid GFF file")
-            
-            # Parse header
-            magic, version, struct_count, field_count = struct.unpack_from(self.header_format, data, 0)
-            
-            if validate:
-                if magic != b'GFF ':
-                    raise GffParserError(f"Invalid GFF magic: {magic}")
-                if version != 0x56455220:  # 'VER ' in little-endian
-                    raise GffParserError(f"Unsupported GFF version: {version}")
-            
-            # Create root structure
-            root = GffRoot(
-                structs=[],
-                top_level_struct=GffStruct(id=0, fields={})
-            )
-            
-            # For now, create a simple stub implementation
-            # This would need the full binary parsing logic based on the Nim implementation
-            root.top_level_struct.fields["Test"] = GffField(
-                kind=GffDataType.GFF_STRING,
-                strval="Hello World"
-            )
-            root.top_level_struct.fields["Version"] = GffField(
-                kind=GffDataType.GFF_INT,
-                ival=1
+            buf = memoryview(data).cast("B")
+            header = read_gff_header(buf, validate)
+
+            labels = [
+                decode_label(raw) for (raw,) in struct.iter_unpack(
+                    "16s",
+                    buf[header.label_offset:header.label_offset + header.label_count * LABEL_SIZE]
+                )
+            ]
+            struct_entries = list(struct.iter_unpack(
+                "<III", buf[header.struct_offset:header.struct_offset + header.struct_count * 12]
+            ))
+            field_entries = list(struct.iter_unpack(
+                self.field_format, buf[header.field_offset:header.field_offset + header.field_count * 12]
+            ))
+
+            structs = [GffStruct(id=struct_id, fields={}) for struct_id, _, _ in struct_entries]
+            table = StructTable(structs)
+
+            field_data = header.field_data_offset
+            field_indices = header.field_indices_offset
+            list_indices = header.list_indices_offset
+            field_base = header.field_offset + 8
+
+            schema = self.schemas.get(header.file_type.decode("ascii", "replace")) if self.schemas else None
+            if schema is not None:
+                # Structs are matched to the schema's layouts by their (type, label) sequence
+                field_keys = [type_id << 32 | label_index for type_id, label_index, _ in field_entries]
+                words = [value for _, _, value in field_entries]
+                decoders: Dict[tuple, Any] = {}
+
+            for gff_struct, (_, data_or_offset, field_count) in zip(structs, struct_entries):
+                if field_count == 1:
+                    indices = (data_or_offset,)
+                elif field_count:
+                    indices = struct.unpack_from(f"<{field_count}I", buf, field_indices + data_or_offset)
+                else:
+                    continue
+
+                if schema is not None:
+                    signature = tuple(map(field_keys.__getitem__, indices))
+                    decode = decoders.get(signature, _UNSEEN)
+                    if decode is _UNSEEN:
+                        decode = decoders[signature] = schema.decoder(signature, labels)
+                    if decode is not None:
+                        gff_struct.fields = decode(buf, indices, words, table, field_data, list_indices, field_base)
+                        continue
+
+                fields = gff_struct.fields
+                for index in indices:
+                    type_id, label_index, value = field_entries[index]
+                    kind = _KINDS.get(type_id)
+                    if kind is None:
+                        raise GffParserError(f"Unknown GFF field type {type_id} in field {index}")
+
+                    inline = INLINE_FORMATS.get(kind)
+                    if inline is not None:
+                        value = inline.unpack_from(buf, field_base + index * 12)[0]
+                    elif kind == GffDataType.GFF_STRUCT:
+                        value = table[value]
+                    elif kind == GffDataType.GFF_LIST:
+                        value = read_list(buf, table, list_indices + value)
+                    else:
+                        value = decode_field_data(buf, kind, field_data + value)
+
+                    fields[labels[label_index]] = GffField(kind, value)
+
+            return GffRoot(
+                structs=structs,
+                top_level_struct=structs[0] if structs else GffStruct(id=0xFFFFFFFF, fields={}),
+                file_type=header.file_type.decode("ascii", "replace"),
+                file_version=header.file_version.decode("ascii", "replace")
             )
             
-            return root
-            
+        except GffParserError:
+            raise
         except struct.error as e:
             raise GffParserError(f"Binary parsing error: {e}")
         except Exception as e:
@@ -58,24 +279,195 @@ class GffParser:
     def write_gff_root(self, root: GffRoot) -> bytes:
         """Write GffRoot to binary GFF format"""
         try:
-            # For now, create a simple stub implementation
-            # This would need the full binary writing logic based on the Nim implementation
-            output = bytearray()
-            
-            # Add simple header
-            output.extend(b'GFF ')  # Magic
-            output.extend(b'\x20\x52\x45\x56')  # Version ('VER ' in little-endian)
-            output.extend(b'\x01\x00\x00\x00')  # structCount = 1
-            output.extend(b'\x02\x00\x00\x00')  # fieldCount = 2
-            
-            # Add field data (simplified)
-            for key, field in root.top_level_struct.fields.items():
-                if field.kind == GffDataType.GFF_STRING:
-                    output.extend(f"{key}: {field.strval}\n".encode())
-                elif field.kind == GffDataType.GFF_INT:
-                    output.extend(f"{key}: {field.ival}\n".encode())
-            
-            return bytes(output)
+            writer = GffWriter()
+            writer.write_struct(root.top_level_struct)
+            return writer.finish(root.file_type, root.file_version)
             
+        except GffParserError:
+            raise
         except Exception as e:
-            raise GffParserError(f"Failed to write GFF file: {e}")
\ No newline at end of file
+            raise GffParserError(f"Failed to write GFF file: {e}")
+
+
+class GffWriter:
+    """Single-pass GFF section builder.
+
+    Structs and fields are fed in document order, either from a GffStruct
+    tree via write_struct or as begin/add/end events. Labels are interned,
+    identical field-data payloads are stored once, and finish() lays every
+    section out in one preallocated buffer.
+    """
+
+    def __init__(self):
+        self.struct_table = array("I")      # (id, data or offset, field count) triples
+        self.field_table = array("I")       # (type, label index, data or offset) triples
+        self.field_indices = array("I")
+        self.list_indices = array("I")
+        self.labels: Dict[str, int] = {}
+        self.field_data: List[bytes] = []
+        self.field_data_size = 0
+        self._payloads: Dict[bytes, int] = {}
+        # Open structs ("struct", struct index, field indices) and lists ("list", field index, struct indices)
+        self._stack: List[tuple] = []
+
+    def write_struct(self, gff_struct: GffStruct, label: Optional[str] = None) -> None:
+        """Emit a struct tree, as a field of the open struct when label is given"""
+        self.begin_struct(gff_struct.id, label)
+        for field_label, gff_field in gff_struct.fields.items():
+            kind = gff_field.kind
+            if kind == GffDataType.GFF_STRUCT:
+                self.write_struct(gff_field.structval or GffStruct(id=0, fields={}), field_label)
+            elif kind == GffDataType.GFF_LIST:
+                self.begin_list(field_label)
+                for element in gff_field.listval or ():
+                    self.write_struct(element)
+                self.end_list()
+            else:
+                self.add_field(field_label, kind, gff_field.value)
+        self.end_struct()
+
+    def begin_struct(self, struct_id: int, label: Optional[str] = None) -> int:
+        """Open a struct: top-level, a list element, or a STRUCT field named label"""
+        index = len(self.struct_table) // 3
+        self.struct_table.extend((struct_id & 0xFFFFFFFF, 0, 0))
+        if label is not None:
+            self._add_entry(label, GffDataType.GFF_STRUCT, index)
+        elif self._stack:
+            frame = self._stack[-1]
+            if frame[0] != "list":
+                raise GffParserError("Nested struct needs a label outside of a list")
+            frame[2].append(index)
+        elif index:
+            raise GffParserError("GFF file can only have one top-level struct")
+        self._stack.append(("struct", index, []))
+        return index
+
+    def end_struct(self) -> None:
+        kind, index, field_indices = self._stack.pop()
+        if kind != "struct":
+            raise GffParserError("end_struct called while a list is open")
+        count = len(field_indices)
+        if count == 1:
+            data = field_indices[0]
+        else:
+            data = len(self.field_indices) * 4
+            self.field_indices.extend(field_indices)
+        self.struct_table[index * 3 + 1] = data
+        self.struct_table[index * 3 + 2] = count
+
+    def begin_list(self, label: str) -> None:
+        field_index = self._add_entry(label, GffDataType.GFF_LIST, 0)
+        self._stack.append(("list", field_index, []))
+
+    def end_list(self) -> None:
+        kind, field_index, struct_indices = self._stack.pop()
+        if kind != "list":
+            raise GffParserError("end_list called while a struct is open")
+        self.field_table[field_index * 3 + 2] = len(self.list_indices) * 4
+        self.list_indices.append(len(struct_indices))
+        self.list_indices.extend(struct_indices)
+
+    def add_field(self, label: str, kind: GffDataType, value) -> None:
+        """Add a non-struct, non-list field to the open struct"""
+        inline = INLINE_FORMATS.get(kind)
+        try:
+            if inline is not None:
+                data = int.from_bytes(inline.pack(value), "little")
+            else:
+                payload = self.encode_payload(kind, value)
+        except (struct.error, OverflowError) as e:
+            raise GffInputError(f"Value of field {label!r} does not fit {kind.name}: {e}")
+        if inline is None:
+            data = self._add_payload(payload)
+        self._add_entry(label, kind, data)
+
+    @staticmethod
+    def encode_payload(kind: GffDataType, value) -> bytes:
+        """Field-data bytes for a complex field value"""
+        wide = WIDE_FORMATS.get(kind)
+        if wide is not None:
+            return wide.pack(value)
+        if kind == GffDataType.GFF_STRING:
+            raw = (value or "").encode(GFF_ENCODING, "replace")
+            return _UINT32.pack(len(raw)) + raw
+        if kind == GffDataType.GFF_RESREF:
+            raw = (value or "").encode(GFF_ENCODING, "replace")
+            return _UINT8.pack(len(raw)) + raw
+        if kind == GffDataType.GFF_VOID:
+            raw = value or b""
+            return _UINT32.pack(len(raw)) + raw
+        if kind == GffDataType.GFF_LOCSTRING:
+            locstring = value or GffLocString()
+            parts = []
+            for string_id, text in locstring.entries.items():
+                raw = text.encode(GFF_ENCODING, "replace")
+                parts.append(_LOCSTRING_ENTRY.pack(string_id, len(raw)))
+                parts.append(raw)
+            body = b"".join(parts)
+            return _LOCSTRING_HEADER.pack(8 + len(body), locstring.str_ref, len(locstring.entries)) + body
+        raise GffParserError(f"Unsupported GFF field type: {kind}")
+
+    def _add_payload(self, payload: bytes) -> int:
+        offset = self._payloads.get(payload)
+        if offset is None:
+            offset = self.field_data_size
+            self._payloads[payload] = offset
+            self.field_data.append(payload)
+            self.field_data_size += len(payload)
+        return offset
+
+    def _add_entry(self, label: str, kind: GffDataType, data: int) -> int:
+        if not self._stack or self._stack[-1][0] != "struct":
+            raise GffParserError(f"Field {label!r} added outside of a struct")
+        label_index = self.labels.get(label)
+        if label_index is None:
+            if len(label.encode(GFF_ENCODING, "replace")) > LABEL_SIZE:
+                raise GffInputError(f"Label {label!r} is longer than {LABEL_SIZE} characters")
+            label_index = self.labels[label] = len(self.labels)
+        field_index = len(self.field_table) // 3
+        self.field_table.extend((kind.value, label_index, data))
+        self._stack[-1][2].append(field_index)
+        return field_index
+
+    def finish(self, file_type: str = "GFF ", file_version: str = "V3.2") -> bytes:
+        """Lay out all sections behind the header in a single buffer"""
+        if self._stack:
+            raise GffParserError("Unclosed struct or list")
+        if not self.struct_table:
+            raise GffParserError("GFF file has no top-level struct")
+
+        sizes = (
+            len(self.struct_table) * 4,
+            len(self.field_table) * 4,
+            len(self.labels) * LABEL_SIZE,
+            self.field_data_size,
+            len(self.field_indices) * 4,
+            len(self.list_indices) * 4,
+        )
+        offsets = []
+        position = GFF_HEADER.size
+        for size in sizes:
+            offsets.append(position)
+            position += size
+
+        buf = bytearray(position)
+        GFF_HEADER.pack_into(
+            buf, 0,
+            file_type.encode("ascii")[:4].ljust(4), file_version.encode("ascii")[:4].ljust(4),
+            offsets[0], len(self.struct_table) // 3,
+            offsets[1], len(self.field_table) // 3,
+            offsets[2], len(self.labels),
+            offsets[3], sizes[3],
+            offsets[4], sizes[4],
+            offsets[5], sizes[5],
+        )
+        for offset, table in ((offsets[0], self.struct_table), (offsets[1], self.field_table),
+                              (offsets[4], self.field_indices), (offsets[5], self.list_indices)):
+            struct.pack_into(f"<{len(table)}I", buf, offset, *table)
+        for label, index in self.labels.items():
+            struct.pack_into("16s", buf, offsets[2] + index * LABEL_SIZE, label.encode(GFF_ENCODING, "replace"))
+        position = offsets[3]
+        for payload in self.field_data:
+            struct.pack_into(f"{len(payload)}s", buf, position, payload)
+            position += len(payload)
+        return bytes(buf)
@@ -0,0 +1,224 @@
+"""In-place patching of binary GFF files"""
+import struct
+from collections import Counter
+from typing import Any, Dict, List, NamedTuple, Optional, Union
+
+from ..models.gff_models import GffDataType, GffLocString
+from .gff_parser import (
+    GFF_ENCODING,
+    GFF_HEADER,
+    INLINE_FORMATS,
+    WIDE_FORMATS,
+    GffParserError,
+    GffWriter,
+)
+from .gff_view import GffStructView, GffView, GffViewError
+
+
+_UINT8 = struct.Struct("<B")
+_UINT32 = struct.Struct("<I")
+RESREF_MAX_LENGTH = 16
+
+# Kinds whose DataOrDataOffset slot points into the field data block
+_DATA_KINDS = frozenset(WIDE_FORMATS) | {
+    GffDataType.GFF_STRING,
+    GffDataType.GFF_RESREF,
+    GffDataType.GFF_LOCSTRING,
+    GffDataType.GFF_VOID,
+}
+_DATA_TYPE_IDS = frozenset(kind.value for kind in _DATA_KINDS)
+
+
+class GffPatchError(Exception):
+    """Custom exception for GFF patch errors"""
+    pass
+
+
+class PatchOperation(NamedTuple):
+    """Set the field at path (as used by /query) to value, keeping its type"""
+    path: str
+    value: Any
+
+
+class PatchResult(NamedTuple):
+    data: bytes
+    in_place: int  # operations written over the existing bytes
+    appended: int  # operations whose new value was appended to the field data
+
+
+def parse_operations(raw: Any) -> List[PatchOperation]:
+    """Validate a decoded JSON list of {"path": ..., "value": ...} objects"""
+    if not isinstance(raw, list) or not raw:
+        raise GffPatchError("Operations must be a non-empty list")
+    operations = []
+    for position, item in enumerate(raw):
+        if not isinstance(item, dict) or not isinstance(item.get("path"), str) or "value" not in item:
+            raise GffPatchError(f"Operation {position} must be an object with a path and a value")
+        operations.append(PatchOperation(item["path"], item["value"]))
+    return operations
+
+
+def encode_value(kind: GffDataType, value: Any) -> Union[int, bytes]:
+    """The 4-byte slot (inline kinds) or field-data payload for a new value of kind"""
+    try:
+        inline = INLINE_FORMATS.get(kind)
+        if inline is not None:
+            if kind == GffDataType.GFF_FLOAT:
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    raise TypeError("expected a number")
+                return int.from_bytes(inline.pack(value), "little")
+            return int.from_bytes(inline.pack(_integer(value)), "little")
+        if kind in WIDE_FORMATS:
+            if kind == GffDataType.GFF_DOUBLE:
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    raise TypeError("expected a number")
+                return WIDE_FORMATS[kind].pack(value)
+            return WIDE_FORMATS[kind].pack(_integer(value))
+        if kind in (GffDataType.GFF_STRING, GffDataType.GFF_RESREF):
+            if not isinstance(value, str):
+                raise TypeError("expected a string")
+            if kind == GffDataType.GFF_RESREF and len(value.encode(GFF_ENCODING, "replace")) > RESREF_MAX_LENGTH:
+                raise ValueError(f"ResRefs are at most {RESREF_MAX_LENGTH} characters")
+            return GffWriter.encode_payload(kind, value)
+        if kind == GffDataType.GFF_VOID:
+            if isinstance(value, str):
+                value = value.encode("latin-1")  # the JSON output decodes VOID as latin-1
+            if not isinstance(value, (bytes, bytearray)):
+                raise TypeError("expected a latin-1 string")
+            return GffWriter.encode_payload(kind, bytes(value))
+        if kind == GffDataType.GFF_LOCSTRING:
+            return GffWriter.encode_payload(kind, _locstring(value))
+    except (TypeError, ValueError, OverflowError, struct.error) as e:
+        raise GffPatchError(f"Invalid value {value!r} for {kind.name}: {e}")
+    raise GffPatchError(f"Cannot patch {kind.name} fields")
+
+
+def _integer(value: Any) -> int:
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise TypeError("expected an integer")
+    return value
+
+
+def _locstring(value: Any) -> GffLocString:
+    """GffLocString from the {"id": strref, "<string id>": text} form used in JSON"""
+    if not isinstance(value, dict):
+        raise TypeError('expected an object like {"id": 123, "0": "text"}')
+    locstring = GffLocString()
+    for key, text in value.items():
+        if key == "id":
+            locstring.str_ref = _integer(text)
+            _UINT32.pack(locstring.str_ref)  # range check
+        elif key.lstrip("-").isdigit() and isinstance(text, str):
+            locstring.entries[int(key)] = text
+        else:
+            raise ValueError(f"unexpected entry {key!r}")
+    return locstring
+
+
+def payload_size(buf: memoryview, kind: GffDataType, offset: int) -> int:
+    """Size in bytes of the field-data payload of kind at an absolute offset"""
+    wide = WIDE_FORMATS.get(kind)
+    if wide is not None:
+        return wide.size
+    if kind == GffDataType.GFF_RESREF:
+        return 1 + _UINT8.unpack_from(buf, offset)[0]
+    # STRING and VOID carry a length, LOCSTRING a total size after the first dword
+    return 4 + _UINT32.unpack_from(buf, offset)[0]
+
+
+def _field_index(view: GffView, path: str) -> int:
+    """Field table index of the (non-struct, non-list) field at path"""
+    steps = [step for step in path.split("/") if step]
+    if not steps:
+        raise GffPatchError("Path must name a field")
+    parent = view.resolve("/".join(steps[:-1]))
+    if not isinstance(parent, GffStructView):
+        if parent.kind != GffDataType.GFF_STRUCT:
+            raise GffViewError(f"No field {steps[-1]!r} at /{'/'.join(steps[:-1])}")
+        parent = parent.structval
+    try:
+        return parent.fields.field_index(steps[-1])
+    except KeyError:
+        raise GffViewError(f"No field {steps[-1]!r} at /{'/'.join(steps[:-1])}")
+
+
+def _shared_offsets(view: GffView) -> Counter:
+    """How many fields reference each field-data offset.
+
+    GffWriter stores identical payloads once, so a payload may back several
+    fields and can only be overwritten when exactly one field uses it.
+    """
+    header = view.header
+    table = struct.unpack_from(f"<{header.field_count * 3}I", view.buffer, header.field_offset)
+    return Counter(
+        data for type_id, data in zip(table[0::3], table[2::3])
+        if type_id in _DATA_TYPE_IDS
+    )
+
+
+def patch_gff(data: Union[bytes, bytearray, memoryview], operations: List[PatchOperation]) -> PatchResult:
+    """Apply operations to a GFF without rebuilding it.
+
+    Every field keeps its type. Inline values are rewritten in the field
+    table and field-data values in place when the old payload is not shared
+    and the new one fits. Anything larger is appended to the end of the
+    field data block and the field pointed at it, which moves the sections
+    behind that block; their contents are relative to their own start and
+    are copied unchanged, as is everything else.
+    """
+    buf = bytearray(data)
+    view = GffView(buf, validate=True)
+    header = view.header
+    data_end = header.field_data_offset + header.field_data_size
+    appended = bytearray()
+    shared: Optional[Counter] = None
+    patched: Dict[int, str] = {}
+    in_place = grown = 0
+
+    for operation in operations:
+        index = _field_index(view, operation.path)
+        if index in patched:
+            raise GffPatchError(f"{operation.path!r} and {patched[index]!r} are the same field")
+        patched[index] = operation.path
+
+        entry_offset = header.field_offset + index * 12
+        type_id, _, old_data = view.field_entry(index)
+        try:
+            kind = GffDataType(type_id)
+        except ValueError:
+            raise GffParserError(f"Unknown GFF field type {type_id} in field {index}")
+        encoded = encode_value(kind, operation.value)
+        if isinstance(encoded, int):
+            _UINT32.pack_into(buf, entry_offset + 8, encoded)
+            in_place += 1
+            continue
+
+        if shared is None:
+            shared = _shared_offsets(view)
+        old_start = header.field_data_offset + old_data
+        old_size = payload_size(view.buffer, kind, old_start)
+        if old_start + old_size > data_end:
+            raise GffParserError(f"Field data of {operation.path!r} extends past the field data block")
+        if shared[old_data] == 1 and len(encoded) <= old_size:
+            buf[old_start:old_start + len(encoded)] = encoded
+            in_place += 1
+            continue
+
+        shared[old_data] -= 1
+        _UINT32.pack_into(buf, entry_offset + 8, header.field_data_size + len(appended))
+        appended += encoded
+        grown += 1
+
+    if not appended:
+        return PatchResult(bytes(buf), in_place, 0)
+
+    growth = len(appended)
+    out = bytearray(b"".join((buf[:data_end], appended, buf[data_end:])))
+    values = list(header)
+    for position in range(2, len(values), 2):
+        # Offsets of sections laid out after the field data block move with it
+        if position != 8 and values[position] >= data_end:
+            values[position] += growth
+    values[9] += growth  # field data size
+    GFF_HEADER.pack_into(out, 0, *values)
+    return PatchResult(bytes(out), in_place, grown)
@@ -0,0 +1,341 @@
+"""Schema-compiled GFF codecs for known blueprint layouts.
+
+Most files of one type (.bic, .uti, .dlg, ...) are written by the same tools
+and reuse a small set of struct layouts: the same labels with the same field
+types in the same order. A GffSchema holds those layouts for one file type
+and compiles each into two generated functions:
+
+- decode builds a struct's fields straight from the raw field table, with
+  the labels, field kinds and struct.Struct readers baked into the code
+- encode_json emits the struct's scalar fields as JSON text in final
+  (case-insensitive) key order, with the "Label": prefixes precomputed
+
+GffParser and GffConverter take the registered schemas and use a compiled
+codec for every struct whose layout matches exactly; everything else goes
+through the generic per-field path, and the output is identical either way.
+"""
+import os
+from collections import Counter
+from json.encoder import encode_basestring
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from ..models.gff_models import GffDataType, GffField, GffRoot, GffStruct
+from .gff_parser import (
+    GFF_ENCODING,
+    INLINE_FORMATS,
+    WIDE_FORMATS,
+    GffParser,
+    read_list,
+    read_locstring,
+    read_void,
+)
+
+
+SCHEMA_EXTENSIONS = ("bic", "utc", "uti", "utp", "dlg", "are", "git")
+MAX_LAYOUTS = 512  # most frequent layouts compiled per schema
+MAX_SAMPLES = 64   # sample files read per extension by load_schemas
+
+T = GffDataType
+StructLayout = Tuple[Tuple[str, GffDataType], ...]  # (label, kind) per field, in file order
+
+_KINDS = {kind.value: kind for kind in GffDataType}
+
+# Decoded value of one field; {w} is its DataOrDataOffset word and {i} its field index
+_DECODE_EXPRESSIONS = {
+    T.GFF_BYTE: "{w} & 0xFF",
+    T.GFF_CHAR: "(({w} & 0xFF) ^ 0x80) - 0x80",
+    T.GFF_WORD: "{w} & 0xFFFF",
+    T.GFF_SHORT: "(({w} & 0xFFFF) ^ 0x8000) - 0x8000",
+    T.GFF_DWORD: "{w}",
+    T.GFF_INT: "({w} ^ 0x80000000) - 0x80000000",
+    T.GFF_FLOAT: "unpack_float(buf, field_base + {i} * 12)[0]",
+    T.GFF_DWORD64: "unpack_dword64(buf, field_data + {w})[0]",
+    T.GFF_INT64: "unpack_int64(buf, field_data + {w})[0]",
+    T.GFF_DOUBLE: "unpack_double(buf, field_data + {w})[0]",
+    T.GFF_STRING: "str(buf[(o := field_data + {w}) + 4:o + 4 + unpack_dword(buf, o)[0]], ENCODING, 'replace')",
+    T.GFF_RESREF: "str(buf[(o := field_data + {w}) + 1:o + 1 + buf[o]], ENCODING, 'replace')",
+    T.GFF_LOCSTRING: "read_locstring(buf, field_data + {w})",
+    T.GFF_VOID: "read_void(buf, field_data + {w})",
+    T.GFF_STRUCT: "structs[{w}]",
+    T.GFF_LIST: "read_list(buf, structs, list_indices + {w})",
+}
+
+_DECODE_NAMESPACE = {
+    "GffField": GffField,
+    "unpack_float": INLINE_FORMATS[T.GFF_FLOAT].unpack_from,
+    "unpack_dword64": WIDE_FORMATS[T.GFF_DWORD64].unpack_from,
+    "unpack_int64": WIDE_FORMATS[T.GFF_INT64].unpack_from,
+    "unpack_double": WIDE_FORMATS[T.GFF_DOUBLE].unpack_from,
+    "unpack_dword": INLINE_FORMATS[T.GFF_DWORD].unpack_from,
+    "ENCODING": GFF_ENCODING,
+    "read_locstring": read_locstring,
+    "read_void": read_void,
+    "read_list": read_list,
+    **{f"K{kind.value}": kind for kind in GffDataType},
+}
+
+# JSON text of one field value {v} of field {f}. Values of an unexpected
+# Python type, and kinds with no fast form, go through scalar(), the
+# converter's generic encoding, so output matches the generic path exactly.
+_INT_JSON = "(int_repr({v}) if {v}.__class__ is int else scalar({f}))"
+_FLOAT_JSON = "(float_repr({v} or 0.0) if {v}.__class__ is float and {v} - {v} == 0.0 else scalar({f}))"
+_STR_JSON = "(encode_basestring({v}) if {v}.__class__ is str else scalar({f}))"
+_JSON_EXPRESSIONS = {
+    T.GFF_BYTE: _INT_JSON,
+    T.GFF_CHAR: _INT_JSON,
+    T.GFF_WORD: _INT_JSON,
+    T.GFF_SHORT: _INT_JSON,
+    T.GFF_DWORD: _INT_JSON,
+    T.GFF_INT: _INT_JSON,
+    T.GFF_DWORD64: _INT_JSON,
+    T.GFF_INT64: _INT_JSON,
+    T.GFF_FLOAT: _FLOAT_JSON,
+    T.GFF_DOUBLE: _FLOAT_JSON,
+    T.GFF_STRING: _STR_JSON,
+    T.GFF_RESREF: _STR_JSON,
+}
+
+_JSON_NAMESPACE = {
+    "int_repr": int.__repr__,
+    "float_repr": float.__repr__,
+    "encode_basestring": encode_basestring,
+}
+
+
+class GffSchemaError(Exception):
+    """Custom exception for invalid schema layouts"""
+    pass
+
+
+class CompiledLayout(NamedTuple):
+    layout: StructLayout
+    labels: Tuple[str, ...]
+    kinds: Tuple[GffDataType, ...]
+    # decode(buf, indices, words, structs, field_data, list_indices, field_base) -> fields dict;
+    # structs is GffParser's StructTable, so a struct referenced twice fails the parse
+    decode: Callable[..., Dict[str, GffField]]
+    # encode_json(fields in layout order, scalar) -> iter_json items: JSON text runs and (label, field) containers
+    encode_json: Callable[[Sequence[GffField], Callable[[GffField], str]], List[Any]]
+    source: str  # the generated Python, for debugging
+
+
+def _compile(name: str, source: str, namespace: Dict[str, Any]) -> Callable:
+    scope = dict(namespace)
+    exec(compile(source, f"<gff_schema {name}>", "exec"), scope)
+    return scope[name]
+
+
+def _unpack_line(names: List[str], source: str) -> str:
+    return f"    {', '.join(names)}, = {source}\n"
+
+
+def decoder_source(layout: StructLayout) -> str:
+    """Python source of the specialised decoder for layout"""
+    indices = [f"i{n}" for n in range(len(layout))]
+    lines = [
+        "def decode(buf, indices, words, structs, field_data, list_indices, field_base):\n",
+        _unpack_line(indices, "indices"),
+        "    return {\n",
+    ]
+    for (label, kind), index in zip(layout, indices):
+        value = _DECODE_EXPRESSIONS[kind].format(w=f"words[{index}]", i=index)
+        lines.append(f"        {label!r}: GffField(K{kind.value}, {value}),\n")
+    lines.append("    }\n")
+    return "".join(lines)
+
+
+def json_encoder_source(layout: StructLayout) -> str:
+    """Python source of the specialised JSON encoder for layout"""
+    fields = [f"f{n}" for n in range(len(layout))]
+    values = [f"v{n}" for n in range(len(layout))]
+    lines = [
+        "def encode_json(values, scalar):\n",
+        _unpack_line(fields, "values"),
+        _unpack_line(values, "(" + "".join(f"{f}.value, " for f in fields) + ")"),
+        "    return [\n",
+    ]
+    run: List[str] = []
+
+    def flush():
+        if run:
+            lines.append(f"        ''.join(({', '.join(run)},)),\n")
+            run.clear()
+
+    order = sorted(range(len(layout)), key=lambda n: layout[n][0].lower())
+    for n in order:
+        label, kind = layout[n]
+        if kind in (T.GFF_STRUCT, T.GFF_LIST):
+            flush()
+            lines.append(f"        ({label!r}, {fields[n]}),\n")
+            continue
+        prefix = ("," if run else "") + encode_basestring(label) + ":"
+        run.append(repr(prefix))
+        expression = _JSON_EXPRESSIONS.get(kind)
+        run.append(expression.format(v=values[n], f=fields[n]) if expression else f"scalar({fields[n]})")
+    flush()
+    lines.append("    ]\n")
+    return "".join(lines)
+
+
+def compile_layout(layout: StructLayout) -> CompiledLayout:
+    """Generate and compile the decoder and JSON encoder for one struct layout"""
+    layout = tuple((label, kind) for label, kind in layout)
+    if not layout:
+        raise GffSchemaError("A layout needs at least one field")
+    labels = tuple(label for label, _ in layout)
+    kinds = tuple(kind for _, kind in layout)
+    if len(set(labels)) != len(labels):
+        raise GffSchemaError(f"Duplicate labels in layout {labels}")
+    for label, kind in layout:
+        if not isinstance(label, str) or not isinstance(kind, GffDataType):
+            raise GffSchemaError(f"Invalid layout field {label!r}: {kind!r}")
+    decode = decoder_source(layout)
+    encode_json = json_encoder_source(layout)
+    return CompiledLayout(
+        layout=layout,
+        labels=labels,
+        kinds=kinds,
+        decode=_compile("decode", decode, _DECODE_NAMESPACE),
+        encode_json=_compile("encode_json", encode_json, _JSON_NAMESPACE),
+        source=decode + "\n" + encode_json,
+    )
+
+
+def normalize_file_type(file_type: str) -> str:
+    """The 4-character header form of a file type: "bic" -> "BIC " """
+    return file_type.strip().upper()[:4].ljust(4)
+
+
+def struct_layout(gff_struct: GffStruct) -> StructLayout:
+    return tuple((label, field.kind) for label, field in gff_struct.fields.items())
+
+
+def iter_structs(root: GffRoot) -> Iterator[GffStruct]:
+    """Every struct in a tree, depth first"""
+    stack = [root.top_level_struct]
+    while stack:
+        gff_struct = stack.pop()
+        yield gff_struct
+        for gff_field in gff_struct.fields.values():
+            if gff_field.kind == T.GFF_STRUCT and gff_field.value is not None:
+                stack.append(gff_field.value)
+            elif gff_field.kind == T.GFF_LIST and gff_field.value:
+                stack.extend(gff_field.value)
+
+
+class GffSchema:
+    """The known struct layouts of one file type, compiled to specialised codecs.
+
+    Pass schemas to GffParser and GffConverter as a mapping of file type to
+    schema, usually the shared SCHEMAS registry.
+    """
+
+    def __init__(self, file_type: str, layouts: Iterable[StructLayout] = ()):
+        self.file_type = normalize_file_type(file_type)
+        self.layouts: Dict[StructLayout, CompiledLayout] = {}
+        self._by_labels: Dict[Tuple[str, ...], CompiledLayout] = {}
+        for layout in layouts:
+            self.add(layout)
+
+    def __len__(self) -> int:
+        return len(self.layouts)
+
+    def __reduce__(self):
+        # Generated functions cannot be pickled. A registered schema is sent
+        # to process workers by file type and found in their own registry;
+        # any other schema is recompiled from its layouts.
+        if SCHEMAS.get(self.file_type) is self:
+            return registered_schema, (self.file_type,)
+        return GffSchema, (self.file_type, list(self.layouts))
+
+    def add(self, layout: StructLayout) -> CompiledLayout:
+        compiled = self.layouts.get(tuple(layout))
+        if compiled is None:
+            compiled = compile_layout(layout)
+            self.layouts[compiled.layout] = compiled
+            self._by_labels.setdefault(compiled.labels, compiled)
+        return compiled
+
+    def decoder(self, signature: Sequence[int], labels: Sequence[str]) -> Optional[Callable]:
+        """Decoder for a struct whose fields have these (type << 32 | label index) keys, if known"""
+        try:
+            layout = tuple((labels[key & 0xFFFFFFFF], _KINDS[key >> 32]) for key in signature)
+        except (IndexError, KeyError):
+            return None  # left for the generic path to report
+        compiled = self.layouts.get(layout)
+        return compiled.decode if compiled is not None else None
+
+    def json_layout(self, labels: Tuple[str, ...]) -> Optional[CompiledLayout]:
+        """Layout with these labels in this order; the caller still checks its kinds"""
+        return self._by_labels.get(labels)
+
+    @classmethod
+    def learn(cls, file_type: str, roots: Iterable[GffRoot], max_layouts: int = MAX_LAYOUTS) -> "GffSchema":
+        """Schema of the max_layouts most common struct layouts in sample files"""
+        counts: Counter = Counter()
+        for root in roots:
+            for gff_struct in iter_structs(root):
+                if gff_struct.fields:
+                    counts[struct_layout(gff_struct)] += 1
+        return cls(file_type, [layout for layout, _ in counts.most_common(max_layouts)])
+
+
+# Schemas in use by the service, by 4-character file type
+SCHEMAS: Dict[str, GffSchema] = {}
+
+
+def register_schema(schema: GffSchema) -> None:
+    SCHEMAS[schema.file_type] = schema
+
+
+def registered_schema(file_type: str) -> GffSchema:
+    """The schema registered for file_type in this process, or an empty one"""
+    schema = SCHEMAS.get(file_type)
+    return schema if schema is not None else GffSchema(file_type)
+
+
+def _sample_paths(source: str, extensions: Iterable[str]) -> Iterator[str]:
+    if os.path.isfile(source):
+        yield source
+        return
+    for directory, subdirectories, filenames in os.walk(source):
+        subdirectories.sort()
+        for filename in sorted(filenames):
+            if os.path.splitext(filename)[1].lower().lstrip(".") in extensions:
+                yield os.path.join(directory, filename)
+
+
+def load_schemas(
+    sources: Iterable[str],
+    extensions: Iterable[str] = SCHEMA_EXTENSIONS,
+    max_samples: int = MAX_SAMPLES
+) -> Dict[str, GffSchema]:
+    """Learn a schema per file type from sample files or directories and register it.
+
+    Up to max_samples files are read per extension; files that fail to
+    parse are skipped. Returns the schemas registered.
+    """
+    extensions = {extension.lower().lstrip(".") for extension in extensions}
+    parser = GffParser()
+    samples: Dict[str, List[GffRoot]] = {}
+    seen: Counter = Counter()
+    for source in sources:
+        for path in _sample_paths(source, extensions):
+            extension = os.path.splitext(path)[1].lower().lstrip(".")
+            if seen[extension] >= max_samples:
+                continue
+            try:
+                with open(path, "rb") as fp:
+                    root = parser.read_gff_root(fp.read(), validate=True)
+            except Exception:
+                continue
+            seen[extension] += 1
+            samples.setdefault(normalize_file_type(root.file_type), []).append(root)
+
+    learned = {}
+    for file_type, roots in samples.items():
+        schema = GffSchema.learn(file_type, roots)
+        if schema.layouts:
+            register_schema(schema)
+            learned[file_type] = schema
+    return learned
@@ -0,0 +1,237 @@
+"""Lazy, on-demand view over a binary GFF buffer"""
+import struct
+from collections.abc import Mapping, Sequence
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from ..models.gff_models import GffDataType, GffField
+from .gff_converter import GffConverter
+from .gff_parser import (
+    INLINE_FORMATS,
+    LABEL_SIZE,
+    GffParserError,
+    decode_field_data,
+    decode_label,
+    read_gff_header,
+)
+
+
+_ENTRY = struct.Struct("<III")
+_UINT32 = struct.Struct("<I")
+_KINDS = {kind.value: kind for kind in GffDataType}
+
+
+class GffViewError(Exception):
+    """Custom exception for GFF path lookup errors"""
+    pass
+
+
+class GffView:
+    """GffRoot-compatible accessor that decodes fields only when they are read.
+
+    Nothing beyond the header is decoded up front. Struct field maps, field
+    values, nested structs and list entries are decoded on first access and
+    untouched subtrees are never visited, so GffConverter.to_json(view) or a
+    single path lookup costs only what it touches.
+    """
+
+    def __init__(self, data: Union[bytes, bytearray, memoryview], validate: bool = True):
+        self.buffer = memoryview(data).cast("B")
+        self.header = read_gff_header(self.buffer, validate)
+        self.file_type = self.header.file_type.decode("ascii", "replace")
+        self.file_version = self.header.file_version.decode("ascii", "replace")
+        self._labels: Dict[int, str] = {}
+
+    @property
+    def top_level_struct(self) -> "GffStructView":
+        return self.struct(0)
+
+    def struct(self, index: int) -> "GffStructView":
+        if not 0 <= index < self.header.struct_count:
+            raise GffParserError(f"Struct index {index} out of range")
+        return GffStructView(self, index)
+
+    def label(self, index: int) -> str:
+        label = self._labels.get(index)
+        if label is None:
+            if not 0 <= index < self.header.label_count:
+                raise GffParserError(f"Label index {index} out of range")
+            start = self.header.label_offset + index * LABEL_SIZE
+            label = decode_label(bytes(self.buffer[start:start + LABEL_SIZE]))
+            self._labels[index] = label
+        return label
+
+    def struct_entry(self, index: int) -> Tuple[int, int, int]:
+        """(struct id, data or data offset, field count) of a struct"""
+        return _ENTRY.unpack_from(self.buffer, self.header.struct_offset + index * 12)
+
+    def field_entry(self, index: int) -> Tuple[int, int, int]:
+        """(type, label index, data or data offset) of a field"""
+        if not 0 <= index < self.header.field_count:
+            raise GffParserError(f"Field index {index} out of range")
+        return _ENTRY.unpack_from(self.buffer, self.header.field_offset + index * 12)
+
+    def struct_field_indices(self, index: int) -> Tuple[int, ...]:
+        _, data_or_offset, field_count = self.struct_entry(index)
+        if field_count == 1:
+            return (data_or_offset,)
+        if field_count == 0:
+            return ()
+        return struct.unpack_from(
+            f"<{field_count}I", self.buffer, self.header.field_indices_offset + data_or_offset
+        )
+
+    def list_struct_indices(self, offset: int) -> Tuple[int, ...]:
+        start = self.header.list_indices_offset + offset
+        count = _UINT32.unpack_from(self.buffer, start)[0]
+        return struct.unpack_from(f"<{count}I", self.buffer, start + 4)
+
+    def field(self, index: int) -> GffField:
+        """Decode one field; structs and lists come back as lazy views"""
+        type_id, _, data = self.field_entry(index)
+        kind = _KINDS.get(type_id)
+        if kind is None:
+            raise GffParserError(f"Unknown GFF field type {type_id} in field {index}")
+
+        inline = INLINE_FORMATS.get(kind)
+        if inline is not None:
+            value = inline.unpack_from(self.buffer, self.header.field_offset + index * 12 + 8)[0]
+        elif kind == GffDataType.GFF_STRUCT:
+            value = self.struct(data)
+        elif kind == GffDataType.GFF_LIST:
+            value = GffListView(self, self.list_struct_indices(data))
+        else:
+            value = decode_field_data(self.buffer, kind, self.header.field_data_offset + data)
+        return GffField(kind, value)
+
+    def resolve(self, path: str) -> Union[GffField, "GffStructView"]:
+        """Follow a path such as "ClassList/0/Class" from the top-level struct.
+
+        Struct steps are field labels and list steps are zero-based indices.
+        An empty path returns the top-level struct itself.
+        """
+        current: Union[GffField, GffStructView] = self.top_level_struct
+        walked: List[str] = []
+        for step in filter(None, path.split("/")):
+            if isinstance(current, GffField):
+                if current.kind == GffDataType.GFF_STRUCT:
+                    current = current.structval
+                elif current.kind == GffDataType.GFF_LIST:
+                    try:
+                        if not step.isdigit():
+                            raise ValueError(step)
+                        current = current.listval[int(step)]
+                    except (ValueError, IndexError):
+                        raise GffViewError(f"No list entry {step!r} at /{'/'.join(walked)}")
+                    walked.append(step)
+                    continue
+                else:
+                    raise GffViewError(f"Cannot descend into {current.kind.name} at /{'/'.join(walked)}")
+
+            gff_field = current.fields.get(step)
+            if gff_field is None:
+                raise GffViewError(f"No field {step!r} at /{'/'.join(walked)}")
+            current = gff_field
+            walked.append(step)
+        return current
+
+
+def lookup_json(data: Union[bytes, bytearray, memoryview], path: str) -> Tuple[str, object]:
+    """(type name, JSON value) of the field or struct at path; only what the path touches is decoded"""
+    target = GffView(data, validate=True).resolve(path)
+    kind = "GFF_STRUCT" if isinstance(target, GffStructView) else target.kind.name
+    return kind, GffConverter().value_to_json(target)
+
+
+class GffStructView:
+    """GffStruct-compatible struct whose fields are decoded on access"""
+
+    __slots__ = ("view", "index", "_fields")
+
+    def __init__(self, view: GffView, index: int):
+        self.view = view
+        self.index = index
+        self._fields: Optional[GffFieldsView] = None
+
+    @property
+    def id(self) -> int:
+        return self.view.struct_entry(self.index)[0]
+
+    @property
+    def fields(self) -> "GffFieldsView":
+        if self._fields is None:
+            self._fields = GffFieldsView(self.view, self.view.struct_field_indices(self.index))
+        return self._fields
+
+    def __repr__(self) -> str:
+        return f"GffStructView(index={self.index})"
+
+
+class GffFieldsView(Mapping):
+    """Label -> GffField mapping that decodes each value the first time it is read"""
+
+    __slots__ = ("view", "_indices", "_decoded")
+
+    def __init__(self, view: GffView, field_indices: Tuple[int, ...]):
+        self.view = view
+        self._indices = {view.label(view.field_entry(i)[1]): i for i in field_indices}
+        self._decoded: Dict[str, GffField] = {}
+
+    def __getitem__(self, label: str) -> GffField:
+        gff_field = self._decoded.get(label)
+        if gff_field is None:
+            gff_field = self.view.field(self._indices[label])
+            self._decoded[label] = gff_field
+        return gff_field
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._indices)
+
+    def __len__(self) -> int:
+        return len(self._indices)
+
+    def field_index(self, label: str) -> int:
+        return self._indices[label]
+
+
+class GffListView(Sequence):
+    """List of struct views materialised only as entries are indexed"""
+
+    __slots__ = ("view", "_indices")
+
+    def __init__(self, view: GffView, struct_indices: Tuple[int, ...]):
+        self.view = view
+        self._indices = struct_indices
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self.view.struct(i) for i in self._indices[position]]
+        return self.view.struct(self._indices[position])
+
+    def __len__(self) -> int:
+        return len(self._indices)
+
+
+def validate_gff(data: Union[bytes, bytearray, memoryview]) -> None:
+    """Decode every struct and field reachable from the top level, discarding the values.
+
+    Raises GffParserError for anything a walk over a GffView of data would
+    trip on later, so a streamed conversion can be refused before its
+    response starts. A struct reachable twice is rejected as well, since a
+    cycle would never finish streaming.
+    """
+    view = GffView(data, validate=True)
+    seen = set()
+    pending = [0]
+    try:
+        while pending:
+            index = pending.pop()
+            if index in seen:
+                raise GffParserError(f"Struct {index} is referenced more than once")
+            seen.add(index)
+            for gff_field in view.struct(index).fields.values():
+                if gff_field.kind == GffDataType.GFF_STRUCT:
+                    pending.append(gff_field.value.index)
+                elif gff_field.kind == GffDataType.GFF_LIST:
+                    pending.extend(gff_field.value._indices)
+    except struct.error as e:
+        raise GffParserError(f"Binary parsing error: {e}")
@@ -0,0 +1,187 @@
+"""Streaming JSON to GFF conversion without building intermediate trees"""
+import json
+import re
+from json.decoder import scanstring
+from typing import Any, Iterator, List, Tuple, Union
+
+from .gff_converter import GffConverterError, json_scalar
+from .gff_parser import GffWriter
+
+
+MAX_DEPTH = 512
+TOP_LEVEL_STRUCT_ID = 0xFFFFFFFF
+
+# An object key forms one token with its colon and any comma before it, which
+# cuts the tokens per field from four to two. Strings exclude raw control
+# characters, as in json.loads; their quantifiers are possessive so long
+# escaped strings do not pile up backtracking state.
+_TOKEN = re.compile(rb"""
+    [ \t\n\r]*
+    (?:
+        (?P<comma>,[ \t\n\r]*)? "(?P<key>[^"\\\x00-\x1f]*+(?:\\.[^"\\\x00-\x1f]*+)*+)" [ \t\n\r]* :
+      | (?P<punct>[{}\[\],])
+      | "(?P<string>[^"\\\x00-\x1f]*+(?:\\.[^"\\\x00-\x1f]*+)*+)"
+      | (?P<number>-?(?:0|[1-9][0-9]*)(?P<fraction>(?:\.[0-9]+)?(?:[eE][-+]?[0-9]+)?))
+      | (?P<literal>true|false|null|NaN|Infinity|-Infinity)
+    )
+""", re.VERBOSE)
+_WHITESPACE = re.compile(rb"[ \t\n\r]*")
+
+_LITERALS = {
+    b"true": True,
+    b"false": False,
+    b"null": None,
+    b"NaN": float("nan"),
+    b"Infinity": float("inf"),
+    b"-Infinity": float("-inf"),
+}
+
+Buffer = Union[bytes, bytearray, memoryview]
+Token = Tuple[str, Any, int]  # kind, value, byte offset
+
+
+class JsonStreamError(Exception):
+    """Custom exception for malformed JSON in streaming conversion"""
+    pass
+
+
+def _decode_string(raw: bytes, offset: int) -> str:
+    try:
+        text = raw.decode("utf-8")
+        if b"\\" in raw:
+            text = scanstring(text + '"', 0)[0]
+        return text
+    except (UnicodeDecodeError, ValueError) as e:
+        raise JsonStreamError(f"Invalid string at byte {offset}: {e}")
+
+
+def iter_tokens(data: Buffer) -> Iterator[Token]:
+    """Pull tokens out of a UTF-8 JSON document one at a time.
+
+    kind is a punctuation character, "key" for an object key with its
+    colon (",key" when a comma precedes it), "value" for strings, numbers
+    and literals, or "end" (repeated) once only whitespace is left.
+    Strings are decoded only when reached.
+    """
+    position = 3 if data[:3] == b"\xef\xbb\xbf" else 0
+    for token in _TOKEN.finditer(data, position):
+        if token.start() != position:
+            break  # skipped over something that is not a token
+        group = token.lastgroup
+        start = token.start(group)
+        if group in ("key", "string"):
+            start -= 1  # report strings at their opening quote
+        position = token.end()
+        if group == "punct":
+            yield chr(data[start]), None, start
+        elif group == "key":
+            yield ",key" if token.start("comma") >= 0 else "key", _decode_string(token.group("key"), start), start
+        elif group == "string":
+            yield "value", _decode_string(token.group("string"), start), start
+        elif group == "literal":
+            yield "value", _LITERALS[token.group("literal")], start
+        elif token.group("fraction"):
+            yield "value", float(token.group("number")), start
+        else:
+            yield "value", int(token.group("number")), start
+    position = _WHITESPACE.match(data, position).end()
+    if position != len(data):
+        raise JsonStreamError(f"Unexpected character at byte {position}")
+    while True:
+        yield "end", None, position
+
+
+def _utf8(data: Buffer) -> Buffer:
+    """data as UTF-8; the rare UTF-16/32 documents json.loads accepts are re-encoded"""
+    encoding = json.detect_encoding(bytes(data[:4]))
+    if encoding in ("utf-8", "utf-8-sig"):
+        return data
+    try:
+        return bytes(data).decode(encoding).encode("utf-8")
+    except UnicodeDecodeError as e:
+        raise JsonStreamError(f"Invalid {encoding} document: {e}")
+
+
+def stream_json_to_gff(data: Buffer, file_type: str = "GFF ", file_version: str = "V3.2") -> bytes:
+    """Convert a JSON document straight to GFF bytes.
+
+    Tokens are pulled one at a time and fed to GffWriter as struct, list
+    and field events, using the same type rules as
+    GffConverter.gff_root_from_json, so the output is byte-identical to
+    json.loads + gff_root_from_json + write_gff_root. Neither the decoded
+    document nor a GffRoot is ever built: memory is the writer's sections
+    plus one frame per open object or array, and a malformed document
+    fails at the first bad token. Duplicate keys in an object are
+    rejected, as a struct cannot hold two fields with one label; the
+    json.loads path (gff_converter.loads_json) rejects them too.
+    """
+    pull = iter_tokens(_utf8(data)).__next__
+    writer = GffWriter()
+
+    kind, _, offset = pull()
+    if kind == "end":
+        raise JsonStreamError("Empty document")
+    if kind != "{":
+        raise GffConverterError("The JSON document must be an object")
+    writer.begin_struct(TOP_LEVEL_STRUCT_ID)
+    # One [kind, entries so far, labels seen / list label] frame per open object or array
+    stack: List[list] = [["{", 0, set()]]
+
+    while stack:
+        frame = stack[-1]
+        kind, value, offset = pull()
+        if kind == "end":
+            raise JsonStreamError(f"Unexpected end of document at byte {offset}")
+        closing = "}" if frame[0] == "{" else "]"
+        if kind == closing:
+            if frame[0] == "{":
+                writer.end_struct()
+            else:
+                writer.end_list()
+            stack.pop()
+            continue
+        if frame[0] == "[":
+            if frame[1]:
+                if kind != ",":
+                    raise JsonStreamError(f"Expected ',' or ']' at byte {offset}")
+                kind, value, offset = pull()
+            frame[1] += 1
+            if kind != "{":
+                if kind in ("value", "["):
+                    raise GffConverterError(f"List {frame[2]} may only contain objects")
+                raise JsonStreamError(f"Expected a value at byte {offset}")
+            writer.begin_struct(0)
+            stack.append(["{", 0, set()])
+        else:
+            if kind != (",key" if frame[1] else "key"):
+                if frame[1] and kind == ",":
+                    # A comma not followed by a key and its colon
+                    kind, value, offset = pull()
+                    if kind == "value" and isinstance(value, str):
+                        raise JsonStreamError(f"Expected ':' after object key at byte {offset}")
+                elif frame[1]:
+                    raise JsonStreamError(f"Expected ',' or '}}' at byte {offset}")
+                raise JsonStreamError(f"Expected an object key at byte {offset}")
+            frame[1] += 1
+            label = value
+            if label in frame[2]:
+                raise GffConverterError(f"Duplicate key {label!r} at byte {offset}")
+            frame[2].add(label)
+            kind, value, offset = pull()
+            if kind == "value":
+                writer.add_field(label, *json_scalar(value))
+            elif kind == "{":
+                writer.begin_struct(0, label)
+                stack.append(["{", 0, set()])
+            elif kind == "[":
+                writer.begin_list(label)
+                stack.append(["[", 0, label])
+            else:
+                raise JsonStreamError(f"Expected a value at byte {offset}")
+        if len(stack) > MAX_DEPTH:
+            raise JsonStreamError(f"Document is nested too deeply at byte {offset}")
+
+    kind, _, offset = pull()
+    if kind != "end":
+        raise JsonStreamError(f"Extra data at byte {offset}")
+    return writer.finish(file_type, file_version)
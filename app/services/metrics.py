@@ -0,0 +1,270 @@
+"""Prometheus metrics and per-request Server-Timing"""
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base for a named metric family with optional labels"""
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} {self.kind}"
+        yield from self.samples()
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0)
+
+    def samples(self) -> Iterator[str]:
+        for label_values, value in sorted(self._values.items()):
+            yield f"{self.name}{_format_labels(self.labels, label_values)} {_format_number(value)}"
+
+
+class Gauge(Metric):
+    """Gauge that is either set directly or read from callback when scraped"""
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, callback: Optional[Callable[[], float]] = None):
+        super().__init__(name, help_text)
+        self.callback = callback
+        self._value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self.inc(-amount)
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    @property
+    def value(self) -> float:
+        return self.callback() if self.callback is not None else self._value
+
+    def samples(self) -> Iterator[str]:
+        yield f"{self.name} {_format_number(self.value)}"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labels: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+        # label values -> (per-bucket counts with a trailing +Inf slot, sum)
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1][0] += value
+
+    def count(self, *label_values: str) -> int:
+        series = self._series.get(label_values)
+        return sum(series[0]) if series else 0
+
+    def samples(self) -> Iterator[str]:
+        for label_values, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="' + _format_number(bound) + '"'
+                yield f"{self.name}_bucket{_format_labels(self.labels, label_values, le)} {cumulative}"
+            labels = _format_labels(self.labels, label_values)
+            yield f"{self.name}_sum{labels} {_format_number(total[0])}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class MetricsRegistry:
+    """Ordered collection of metrics rendered in Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+REQUESTS = registry.register(Counter(
+    "nwn_gff_requests_total", "HTTP requests by method, endpoint and status", ("method", "endpoint", "status")
+))
+REQUEST_SECONDS = registry.register(Histogram(
+    "nwn_gff_request_seconds", "Request duration including the response body", ("endpoint",)
+))
+REQUESTS_IN_FLIGHT = registry.register(Gauge(
+    "nwn_gff_requests_in_flight", "Requests currently being handled"
+))
+STAGE_SECONDS = registry.register(Histogram(
+    "nwn_gff_stage_seconds", "Time spent running a pipeline stage", ("stage",)
+))
+STAGE_QUEUE_SECONDS = registry.register(Histogram(
+    "nwn_gff_stage_queue_seconds", "Time a stage waited for a free worker", ("stage",)
+))
+STAGE_REJECTIONS = registry.register(Counter(
+    "nwn_gff_stage_rejections_total", "Stages refused because the worker queue was full", ("stage",)
+))
+STAGE_TIMEOUTS = registry.register(Counter(
+    "nwn_gff_stage_timeouts_total", "Stages that exceeded their timeout", ("stage",)
+))
+
+# (stage, seconds) recorded during the current request, for Server-Timing
+_request_timings: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+def record_stage(stage: str, seconds: float, queued: Optional[float] = None) -> None:
+    """Observe a finished stage and add it to the current request's timings"""
+    STAGE_SECONDS.observe(seconds, stage)
+    if queued is not None:
+        STAGE_QUEUE_SECONDS.observe(queued, stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+        if queued:
+            timings.append((f"{stage}-queue", queued))
+
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    """Time a block of work done on the event loop as stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+
+def server_timing(timings: List[Tuple[str, float]], total: float) -> str:
+    """Server-Timing header value; repeated stages are summed"""
+    durations: Dict[str, float] = {}
+    for stage, seconds in timings:
+        durations[stage] = durations.get(stage, 0.0) + seconds
+    durations["total"] = total
+    return ", ".join(f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in durations.items())
+
+
+def endpoint_name(scope) -> str:
+    endpoint = scope.get("endpoint")
+    return getattr(endpoint, "__name__", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request metrics and adding a Server-Timing header.
+
+    The header covers the time until the response starts, split into the
+    stages recorded while handling the request. "receive" is the time spent
+    waiting for the request body, which is what a slow client shows up as.
+    """
+
+    def __init__(self, app, exclude: Tuple[str, ...] = ("/metrics",)):
+        self.app = app
+        self.exclude = exclude
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+
+        timings: List[Tuple[str, float]] = []
+        token = _request_timings.set(timings)
+        start = time.perf_counter()
+        status = 500
+        waited = 0.0
+
+        async def timed_receive():
+            nonlocal waited
+            receive_start = time.perf_counter()
+            message = await receive()
+            waited += time.perf_counter() - receive_start
+            return message
+
+        async def timed_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if waited:
+                    timings.insert(0, ("receive", waited))
+                header = server_timing(timings, time.perf_counter() - start)
+                message = dict(message, headers=list(message.get("headers", ())) + [
+                    (b"server-timing", header.encode("latin-1"))
+                ])
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, timed_receive, timed_send)
+        finally:
+            _request_timings.reset(token)
+            REQUESTS_IN_FLIGHT.dec()
+            if waited:
+                STAGE_SECONDS.observe(waited, "receive")
+            endpoint = endpoint_name(scope)
+            REQUESTS.inc(scope["method"], endpoint, str(status))
+            REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint)
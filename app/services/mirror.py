@@ -0,0 +1,238 @@
+"""Incremental JSON mirror of a directory of GFF files"""
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Executor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, NamedTuple, Optional, Tuple
+
+from ..models.gff_models import SUPPORTED_FORMATS
+from .batch import convert_gff_file
+from .result_cache import content_key
+
+
+MANIFEST_NAME = ".manifest.json"
+MANIFEST_VERSION = 1
+MIRROR_SUFFIX = ".json"
+DEFAULT_EXTENSIONS = ("bic",)
+DEFAULT_INTERVAL = 5.0  # seconds between passes in watch mode
+
+
+class MirrorError(Exception):
+    """Custom exception for mirror errors"""
+    pass
+
+
+class SourceFile(NamedTuple):
+    name: str  # path relative to the source, with / separators
+    path: str
+    size: int
+    mtime_ns: int
+
+
+def atomic_write(path: str, data: bytes) -> None:
+    """Write data to path via a temp file in the same directory and a rename.
+
+    Readers see either the old file or the complete new one, never a
+    partial write.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fp:
+            fp.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def iter_source_files(source: str, extensions: Iterable[str]) -> Iterator[SourceFile]:
+    """Files under source with one of extensions, in a stable order"""
+    extensions = {extension.lower().lstrip(".") for extension in extensions}
+    for directory, subdirectories, filenames in os.walk(source):
+        subdirectories.sort()
+        for filename in sorted(filenames):
+            if os.path.splitext(filename)[1].lower().lstrip(".") not in extensions:
+                continue
+            path = os.path.join(directory, filename)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue  # removed while walking
+            name = os.path.relpath(path, source).replace(os.sep, "/")
+            yield SourceFile(name, path, stat.st_size, stat.st_mtime_ns)
+
+
+class VaultMirror:
+    """Keeps dest/<name>.json in step with every GFF file under source.
+
+    A manifest in dest records (size, mtime, content hash) per file. A pass
+    only stats unchanged files; files whose size or mtime moved are read
+    and hashed, and only those whose hash changed are converted, in
+    parallel when an executor is given. Mirrors of removed files are
+    deleted. Files that fail to convert are remembered with their error
+    and retried once they change.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        dest: str,
+        extensions: Iterable[str] = DEFAULT_EXTENSIONS,
+        executor: Optional[Executor] = None,
+        window: Optional[int] = None
+    ):
+        if not os.path.isdir(source):
+            raise MirrorError(f"Source is not a directory: {source}")
+        self.source = os.path.abspath(source)
+        self.dest = os.path.abspath(dest)
+        if self.dest == self.source or self.dest.startswith(self.source + os.sep):
+            raise MirrorError("The mirror cannot live inside the source directory")
+        self.extensions = tuple(extensions)
+        unknown = [e for e in self.extensions if e.lower().lstrip(".") not in SUPPORTED_FORMATS["gff"]]
+        if unknown:
+            raise MirrorError(f"Not GFF extensions: {', '.join(unknown)}")
+        self.executor = executor
+        self.window = window or 2 * (os.cpu_count() or 1)
+        self.manifest_path = os.path.join(self.dest, MANIFEST_NAME)
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.manifest_path, "rb") as fp:
+                manifest = json.load(fp)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            raise MirrorError(f"Unreadable manifest {self.manifest_path}: {e}")
+        if manifest.get("version") != MANIFEST_VERSION or manifest.get("source") != self.source:
+            return {}  # written by another version or for another source: rebuild
+        return manifest.get("files", {})
+
+    def _save_manifest(self) -> None:
+        document = {"version": MANIFEST_VERSION, "source": self.source, "files": self.manifest}
+        atomic_write(self.manifest_path, json.dumps(document, separators=(",", ":")).encode("utf-8"))
+
+    def mirror_path(self, name: str) -> str:
+        return os.path.join(self.dest, *name.split("/")) + MIRROR_SUFFIX
+
+    def sync(self) -> Dict[str, Any]:
+        """One pass: convert new and changed files, delete mirrors of removed ones"""
+        start = time.perf_counter()
+        stats: Dict[str, Any] = {"converted": 0, "unchanged": 0, "removed": 0, "failed": 0, "errors": []}
+        seen = set()
+        dirty = False
+
+        def changed_files() -> Iterator[Tuple[SourceFile, str, bytes]]:
+            # Consumed by _convert while the walk goes on, so only in-flight files are held in memory
+            nonlocal dirty
+            for source_file in iter_source_files(self.source, self.extensions):
+                seen.add(source_file.name)
+                entry = self.manifest.get(source_file.name)
+                has_mirror = entry is not None and (entry.get("error") or os.path.exists(self.mirror_path(source_file.name)))
+                if has_mirror and (entry["size"], entry["mtime_ns"]) == (source_file.size, source_file.mtime_ns):
+                    stats["unchanged"] += 1
+                    continue
+                try:
+                    with open(source_file.path, "rb") as fp:
+                        data = fp.read()
+                except FileNotFoundError:
+                    seen.discard(source_file.name)
+                    continue
+                file_hash = content_key(data)
+                if has_mirror and entry["hash"] == file_hash:
+                    # Touched but identical: only the manifest needs the new mtime
+                    entry.update(size=source_file.size, mtime_ns=source_file.mtime_ns)
+                    stats["unchanged"] += 1
+                    dirty = True
+                    continue
+                yield source_file, file_hash, data
+
+        for (source_file, file_hash), (_, ok, payload) in self._convert(changed_files()):
+            entry = {"size": source_file.size, "mtime_ns": source_file.mtime_ns, "hash": file_hash}
+            if ok:
+                atomic_write(self.mirror_path(source_file.name), payload)
+                stats["converted"] += 1
+            else:
+                entry["error"] = payload.decode("utf-8", "replace")
+                self._remove_mirror(source_file.name)
+                stats["failed"] += 1
+                stats["errors"].append({"file": source_file.name, "error": entry["error"]})
+            self.manifest[source_file.name] = entry
+            payload = None
+            dirty = True
+
+        for name in [name for name in self.manifest if name not in seen]:
+            self._remove_mirror(name)
+            del self.manifest[name]
+            stats["removed"] += 1
+            dirty = True
+
+        if dirty or not os.path.exists(self.manifest_path):
+            self._save_manifest()
+        stats["seconds"] = round(time.perf_counter() - start, 3)
+        return stats
+
+    def _convert(self, jobs: Iterable[Tuple[SourceFile, str, bytes]]) -> Iterator[Tuple[Tuple[SourceFile, str], Tuple[str, bool, bytes]]]:
+        """((source file, hash), convert_gff_file result) pairs as jobs are drawn and finish.
+
+        Jobs are submitted as soon as they are drawn, at most window at a
+        time, and the file bytes are dropped once submitted, so memory is
+        bounded by the window rather than by the number of changed files.
+        """
+        if self.executor is None:
+            for source_file, file_hash, data in jobs:
+                yield (source_file, file_hash), convert_gff_file(source_file.name, data)
+            return
+        pending = {}
+        for source_file, file_hash, data in jobs:
+            if len(pending) >= self.window:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future.result()
+            pending[self.executor.submit(convert_gff_file, source_file.name, data)] = (source_file, file_hash)
+            data = None
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future.result()
+
+    def _remove_mirror(self, name: str) -> None:
+        path = self.mirror_path(name)
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            return
+        # Drop directories the removal left empty, up to dest itself
+        directory = os.path.dirname(path)
+        while directory != self.dest and directory.startswith(self.dest + os.sep):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                break
+            directory = os.path.dirname(directory)
+
+    def watch(
+        self,
+        interval: float = DEFAULT_INTERVAL,
+        stop: Optional[threading.Event] = None,
+        on_pass: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> None:
+        """Run sync every interval seconds until stop is set.
+
+        Polling is used instead of inotify so the mirror also works on
+        network shares and non-Linux hosts; an unchanged pass is only a
+        directory walk plus one stat per file.
+        """
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            stats = self.sync()
+            if on_pass is not None:
+                on_pass(stats)
+            stop.wait(interval)
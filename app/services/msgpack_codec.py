@@ -0,0 +1,278 @@
+"""In-tree MessagePack encoding and decoding"""
+import struct
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack", "application/vnd.msgpack")
+MAX_DEPTH = 512
+
+_FLOAT32 = struct.Struct(">Bf")
+_FLOAT64 = struct.Struct(">Bd")
+_SIZED = {
+    1: struct.Struct(">B"),
+    2: struct.Struct(">H"),
+    4: struct.Struct(">I"),
+    8: struct.Struct(">Q"),
+}
+_SIGNED = {
+    1: struct.Struct(">b"),
+    2: struct.Struct(">h"),
+    4: struct.Struct(">i"),
+    8: struct.Struct(">q"),
+}
+
+
+class MsgpackError(Exception):
+    """Custom exception for MessagePack encoding and decoding errors"""
+    pass
+
+
+def pack_nil(out: bytearray) -> None:
+    out.append(0xC0)
+
+
+def pack_bool(out: bytearray, value: bool) -> None:
+    out.append(0xC3 if value else 0xC2)
+
+
+def pack_int(out: bytearray, value: int) -> None:
+    if 0 <= value < 0x80:
+        out.append(value)
+    elif -32 <= value < 0:
+        out.append(value & 0xFF)
+    elif value >= 0:
+        if value <= 0xFF:
+            out += b"\xcc" + _SIZED[1].pack(value)
+        elif value <= 0xFFFF:
+            out += b"\xcd" + _SIZED[2].pack(value)
+        elif value <= 0xFFFFFFFF:
+            out += b"\xce" + _SIZED[4].pack(value)
+        elif value <= 0xFFFFFFFFFFFFFFFF:
+            out += b"\xcf" + _SIZED[8].pack(value)
+        else:
+            raise MsgpackError(f"Integer {value} does not fit in 64 bits")
+    elif value >= -0x80:
+        out += b"\xd0" + _SIGNED[1].pack(value)
+    elif value >= -0x8000:
+        out += b"\xd1" + _SIGNED[2].pack(value)
+    elif value >= -0x80000000:
+        out += b"\xd2" + _SIGNED[4].pack(value)
+    elif value >= -0x8000000000000000:
+        out += b"\xd3" + _SIGNED[8].pack(value)
+    else:
+        raise MsgpackError(f"Integer {value} does not fit in 64 bits")
+
+
+def pack_float32(out: bytearray, value: float) -> None:
+    out += _FLOAT32.pack(0xCA, value)
+
+
+def pack_float64(out: bytearray, value: float) -> None:
+    out += _FLOAT64.pack(0xCB, value)
+
+
+def _pack_length(
+    out: bytearray, length: int, fix_base: Optional[int], fix_max: int, codes: Tuple[int, int, int]
+) -> None:
+    """Fix-format header when it fits, else the 8/16/32-bit form (a 0 code skips the 8-bit form)"""
+    if fix_base is not None and length <= fix_max:
+        out.append(fix_base | length)
+    elif length <= 0xFF and codes[0]:
+        out.append(codes[0])
+        out.append(length)
+    elif length <= 0xFFFF:
+        out.append(codes[1])
+        out += _SIZED[2].pack(length)
+    elif length <= 0xFFFFFFFF:
+        out.append(codes[2])
+        out += _SIZED[4].pack(length)
+    else:
+        raise MsgpackError(f"Length {length} exceeds the MessagePack limit")
+
+
+def pack_str_header(out: bytearray, length: int) -> None:
+    _pack_length(out, length, 0xA0, 31, (0xD9, 0xDA, 0xDB))
+
+
+def pack_str(out: bytearray, value: str) -> None:
+    raw = value.encode("utf-8")
+    pack_str_header(out, len(raw))
+    out += raw
+
+
+@lru_cache(maxsize=4096)
+def encoded_str(value: str) -> bytes:
+    """Packed form of a frequently repeated string such as a field label"""
+    out = bytearray()
+    pack_str(out, value)
+    return bytes(out)
+
+
+def pack_bin(out: bytearray, value: bytes) -> None:
+    _pack_length(out, len(value), None, -1, (0xC4, 0xC5, 0xC6))
+    out += value
+
+
+def pack_array_header(out: bytearray, length: int) -> None:
+    _pack_length(out, length, 0x90, 15, (0, 0xDC, 0xDD))
+
+
+def pack_map_header(out: bytearray, length: int) -> None:
+    _pack_length(out, length, 0x80, 15, (0, 0xDE, 0xDF))
+
+
+def pack(out: bytearray, value: Any, depth: int = 0) -> None:
+    """Append any JSON-like value (plus bytes) to out"""
+    if depth > MAX_DEPTH:
+        raise MsgpackError("Value is nested too deeply")
+    if value is None:
+        pack_nil(out)
+    elif value is True or value is False:
+        pack_bool(out, value)
+    elif isinstance(value, int):
+        pack_int(out, value)
+    elif isinstance(value, float):
+        pack_float64(out, value)
+    elif isinstance(value, str):
+        pack_str(out, value)
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        pack_bin(out, bytes(value))
+    elif isinstance(value, dict):
+        pack_map_header(out, len(value))
+        for key, item in value.items():
+            pack(out, key, depth + 1)
+            pack(out, item, depth + 1)
+    elif isinstance(value, (list, tuple)):
+        pack_array_header(out, len(value))
+        for item in value:
+            pack(out, item, depth + 1)
+    else:
+        raise MsgpackError(f"Cannot encode {type(value).__name__} as MessagePack")
+
+
+def packb(value: Any) -> bytes:
+    out = bytearray()
+    pack(out, value)
+    return bytes(out)
+
+
+class _Decoder:
+    """Recursive-descent decoder over one buffer"""
+
+    def __init__(self, data, object_pairs_hook: Optional[Callable[[List[Tuple[Any, Any]]], Any]] = None):
+        self.buffer = memoryview(data).cast("B")
+        self.position = 0
+        self.object_pairs_hook = object_pairs_hook
+
+    def _take(self, size: int) -> memoryview:
+        start = self.position
+        end = start + size
+        if end > len(self.buffer):
+            raise MsgpackError("Unexpected end of MessagePack data")
+        self.position = end
+        return self.buffer[start:end]
+
+    def _unsigned(self, size: int) -> int:
+        return _SIZED[size].unpack(self._take(size))[0]
+
+    def _str(self, size: int) -> str:
+        try:
+            return str(self._take(size), "utf-8")
+        except UnicodeDecodeError as e:
+            raise MsgpackError(f"Invalid UTF-8 in string: {e}")
+
+    def _array(self, length: int, depth: int) -> List[Any]:
+        return [self.decode(depth + 1) for _ in range(length)]
+
+    def _map(self, length: int, depth: int) -> Dict[Any, Any]:
+        pairs = []
+        for _ in range(length):
+            key = self.decode(depth + 1)
+            if isinstance(key, (dict, list)):
+                raise MsgpackError("Map keys must be scalar")
+            pairs.append((key, self.decode(depth + 1)))
+        if self.object_pairs_hook is not None:
+            return self.object_pairs_hook(pairs)
+        return dict(pairs)
+
+    def decode(self, depth: int = 0) -> Any:
+        if depth > MAX_DEPTH:
+            raise MsgpackError("MessagePack data is nested too deeply")
+        code = self._unsigned(1)
+        if code <= 0x7F:
+            return code
+        if code >= 0xE0:
+            return code - 0x100
+        if 0xA0 <= code <= 0xBF:
+            return self._str(code & 0x1F)
+        if 0x90 <= code <= 0x9F:
+            return self._array(code & 0x0F, depth)
+        if 0x80 <= code <= 0x8F:
+            return self._map(code & 0x0F, depth)
+        handler = _HANDLERS.get(code)
+        if handler is None:
+            raise MsgpackError(f"Unsupported MessagePack type 0x{code:02x}")
+        return handler(self, depth)
+
+
+_HANDLERS: Dict[int, Callable[[_Decoder, int], Any]] = {
+    0xC0: lambda d, _: None,
+    0xC2: lambda d, _: False,
+    0xC3: lambda d, _: True,
+    0xC4: lambda d, _: bytes(d._take(d._unsigned(1))),
+    0xC5: lambda d, _: bytes(d._take(d._unsigned(2))),
+    0xC6: lambda d, _: bytes(d._take(d._unsigned(4))),
+    0xCA: lambda d, _: struct.unpack(">f", d._take(4))[0],
+    0xCB: lambda d, _: struct.unpack(">d", d._take(8))[0],
+    0xCC: lambda d, _: d._unsigned(1),
+    0xCD: lambda d, _: d._unsigned(2),
+    0xCE: lambda d, _: d._unsigned(4),
+    0xCF: lambda d, _: d._unsigned(8),
+    0xD0: lambda d, _: _SIGNED[1].unpack(d._take(1))[0],
+    0xD1: lambda d, _: _SIGNED[2].unpack(d._take(2))[0],
+    0xD2: lambda d, _: _SIGNED[4].unpack(d._take(4))[0],
+    0xD3: lambda d, _: _SIGNED[8].unpack(d._take(8))[0],
+    0xD9: lambda d, _: d._str(d._unsigned(1)),
+    0xDA: lambda d, _: d._str(d._unsigned(2)),
+    0xDB: lambda d, _: d._str(d._unsigned(4)),
+    0xDC: lambda d, depth: d._array(d._unsigned(2), depth),
+    0xDD: lambda d, depth: d._array(d._unsigned(4), depth),
+    0xDE: lambda d, depth: d._map(d._unsigned(2), depth),
+    0xDF: lambda d, depth: d._map(d._unsigned(4), depth),
+}
+
+
+def unpackb(data, object_pairs_hook: Optional[Callable[[List[Tuple[Any, Any]]], Any]] = None) -> Any:
+    """Decode one complete MessagePack value; trailing bytes are an error.
+
+    object_pairs_hook, as in json.loads, builds each map from its (key,
+    value) pairs in order.
+    """
+    decoder = _Decoder(data, object_pairs_hook)
+    value = decoder.decode()
+    if decoder.position != len(decoder.buffer):
+        raise MsgpackError("Trailing data after MessagePack value")
+    return value
+
+
+def accepts_msgpack(accept: str) -> bool:
+    """Whether an Accept header asks for MessagePack over JSON"""
+    best_msgpack = best_json = -1.0
+    for item in (accept or "").split(","):
+        media_type, _, params = item.strip().partition(";")
+        media_type = media_type.strip().lower()
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if media_type in MSGPACK_MEDIA_TYPES:
+            best_msgpack = max(best_msgpack, quality)
+        elif media_type in ("application/json", "application/*", "*/*"):
+            best_json = max(best_json, quality)
+    return best_msgpack > 0 and best_msgpack >= best_json
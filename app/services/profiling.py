@@ -0,0 +1,364 @@
+"""Opt-in cProfile/tracemalloc capture of single requests"""
+import contextvars
+import cProfile
+import hmac
+import io
+import json
+import marshal
+import os
+import pstats
+import secrets
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict, defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .. import config
+
+
+MEMORY_TOP_LINES = 25
+COLLAPSED_MAX_DEPTH = 128
+
+# Raw cProfile data: (file, line, function) -> (cc, nc, tt, ct, callers)
+RawStats = Dict[Tuple[str, int, str], tuple]
+
+
+class ProfilingError(Exception):
+    """Custom exception for profiling errors"""
+    pass
+
+
+class _RawStats:
+    """Adapter that lets pstats.Stats load an already collected stats dict"""
+
+    def __init__(self, stats: RawStats):
+        self.stats = stats
+
+    def create_stats(self) -> None:
+        pass
+
+
+class RequestProfile:
+    """CPU and memory data collected for one request.
+
+    The event-loop thread is profiled for the whole request; stages run on
+    the worker pool are profiled inside the worker and merged in, since
+    cProfile only sees the thread (or process) it was enabled in.
+    """
+
+    def __init__(self, method: str, path: str, cpu: bool, memory: bool):
+        self.id = secrets.token_hex(8)
+        self.method = method
+        self.path = path
+        self.cpu = cpu
+        self.memory = memory
+        self.created = time.time()
+        self.duration = 0.0
+        self.status = 0
+        self.stages: List[str] = []
+        self.cpu_stats: Optional[pstats.Stats] = None
+        self.memory_peak = 0
+        self.memory_top: Dict[str, List[int]] = {}  # location -> [size, count]
+        self._lock = threading.Lock()
+
+    def add_cpu_stats(self, stats: RawStats) -> None:
+        with self._lock:
+            if self.cpu_stats is None:
+                self.cpu_stats = pstats.Stats(_RawStats(stats))
+            else:
+                self.cpu_stats.add(_RawStats(stats))
+
+    def add_memory(self, peak: int, top: List[Tuple[str, int, int]]) -> None:
+        with self._lock:
+            self.memory_peak = max(self.memory_peak, peak)
+            for location, size, count in top:
+                totals = self.memory_top.setdefault(location, [0, 0])
+                totals[0] += size
+                totals[1] += count
+
+    def add_stage(self, stage: str, result: "ProfiledResult") -> None:
+        self.stages.append(stage)
+        if result.cpu_stats is not None:
+            self.add_cpu_stats(result.cpu_stats)
+        if result.memory is not None:
+            self.add_memory(*result.memory)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "created": self.created,
+            "duration_ms": round(self.duration * 1000, 2),
+            "cpu": self.cpu_stats is not None,
+            "memory": self.memory,
+            "memory_peak_bytes": self.memory_peak if self.memory else None,
+            "stages": self.stages,
+        }
+
+    def pstats_text(self, sort: str = "cumulative", limit: int = 60) -> str:
+        if self.cpu_stats is None:
+            raise ProfilingError("Profile has no CPU data")
+        output = io.StringIO()
+        stats = pstats.Stats(_RawStats(self.cpu_stats.stats), stream=output)
+        stats.sort_stats(sort).print_stats(limit)
+        return output.getvalue()
+
+    def pstats_dump(self) -> bytes:
+        """Binary stats in the format written by pstats.Stats.dump_stats"""
+        if self.cpu_stats is None:
+            raise ProfilingError("Profile has no CPU data")
+        return marshal.dumps(self.cpu_stats.stats)
+
+    def collapsed(self) -> str:
+        if self.cpu_stats is None:
+            raise ProfilingError("Profile has no CPU data")
+        return collapsed_stacks(self.cpu_stats.stats)
+
+    def memory_text(self) -> str:
+        if not self.memory:
+            raise ProfilingError("Profile has no memory data")
+        lines = [f"Peak traced memory: {self.memory_peak} bytes", ""]
+        top = sorted(self.memory_top.items(), key=lambda item: item[1][0], reverse=True)
+        for location, (size, count) in top[:MEMORY_TOP_LINES]:
+            lines.append(f"{size:>12} B {count:>8} blocks  {location}")
+        return "\n".join(lines) + "\n"
+
+
+def _frame_name(func: Tuple[str, int, str]) -> str:
+    filename, line, name = func
+    if filename == "~":
+        return name.replace(";", ",")  # built-ins
+    return f"{name} ({os.path.basename(filename)}:{line})".replace(";", ",")
+
+
+def collapsed_stacks(stats: RawStats) -> str:
+    """Flamegraph input ("frame;frame;frame microseconds" lines) from cProfile data.
+
+    cProfile only records caller -> callee edges, so each callee's time is
+    split across its call paths in proportion to the edge times; recursive
+    cycles are cut at their first repetition.
+    """
+    callees: Dict[tuple, Dict[tuple, tuple]] = defaultdict(dict)
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees[caller][func] = edge
+
+    totals: Dict[str, float] = defaultdict(float)
+    path: List[tuple] = []
+    names: List[str] = []
+
+    def walk(func: tuple, self_time: float, cumulative: float) -> None:
+        if func in path or len(path) >= COLLAPSED_MAX_DEPTH:
+            return
+        path.append(func)
+        names.append(_frame_name(func))
+        totals[";".join(names)] += self_time
+        function_total = stats[func][3] if func in stats else 0.0
+        share = cumulative / function_total if function_total else 0.0
+        for callee, edge in callees.get(func, {}).items():
+            walk(callee, edge[2] * share, edge[3] * share)
+        path.pop()
+        names.pop()
+
+    for func, (_, _, tt, ct, callers) in stats.items():
+        if not callers:
+            walk(func, tt, ct)
+
+    return "".join(
+        f"{stack} {round(seconds * 1e6)}\n" for stack, seconds in totals.items() if round(seconds * 1e6) > 0
+    )
+
+
+class ProfiledResult:
+    """Result of a stage run under profiling, plus what was collected in the worker"""
+
+    __slots__ = ("value", "cpu_stats", "memory")
+
+    def __init__(self, value: Any, cpu_stats: Optional[RawStats], memory: Optional[Tuple[int, list]]):
+        self.value = value
+        self.cpu_stats = cpu_stats
+        self.memory = memory
+
+
+def _memory_top(snapshot: tracemalloc.Snapshot) -> List[Tuple[str, int, int]]:
+    return [
+        (f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}", stat.size, stat.count)
+        for stat in snapshot.statistics("lineno")[:MEMORY_TOP_LINES]
+    ]
+
+
+def profiled_call(cpu: bool, memory: bool, fn: Callable[..., Any], *args: Any) -> ProfiledResult:
+    """Run fn under cProfile and/or tracemalloc in the calling worker.
+
+    Memory is only traced here when tracing is not already on, i.e. in a
+    worker process; in thread mode the request-wide trace already covers it.
+    """
+    profiler = None
+    if cpu:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            profiler = None  # another profiler owns this interpreter (Python 3.12+)
+    trace = memory and not tracemalloc.is_tracing()
+    if trace:
+        tracemalloc.start()
+    try:
+        value = fn(*args)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        memory_result = None
+        if trace:
+            memory_result = (tracemalloc.get_traced_memory()[1], _memory_top(tracemalloc.take_snapshot()))
+            tracemalloc.stop()
+    cpu_stats = None
+    if profiler is not None:
+        profiler.create_stats()
+        cpu_stats = profiler.stats
+    return ProfiledResult(value, cpu_stats, memory_result)
+
+
+class ProfileStore:
+    """Ring buffer of the most recent request profiles"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._profiles: "OrderedDict[str, RequestProfile]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._profiles[profile.id] = profile
+            while len(self._profiles) > self.capacity:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[RequestProfile]:
+        return self._profiles.get(profile_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [profile.summary() for profile in reversed(self._profiles.values())]
+
+
+_current_profile: contextvars.ContextVar[Optional[RequestProfile]] = contextvars.ContextVar(
+    "current_profile", default=None
+)
+_profiling = threading.Lock()  # one profiled request at a time
+
+
+def current_profile() -> Optional[RequestProfile]:
+    return _current_profile.get()
+
+
+def admin_token_matches(expected: Optional[str], supplied: Optional[str]) -> bool:
+    return bool(expected) and supplied is not None and hmac.compare_digest(expected, supplied)
+
+
+def parse_profile_modes(value: str) -> Tuple[bool, bool]:
+    """(cpu, memory) from an X-Profile value such as "cpu", "memory" or "cpu,memory" """
+    modes = {mode.strip().lower() for mode in value.split(",") if mode.strip()}
+    if not modes or modes - {"cpu", "memory", "1", "true"}:
+        raise ProfilingError(f"Invalid X-Profile value: {value!r} (expected cpu, memory or cpu,memory)")
+    memory = "memory" in modes
+    cpu = "cpu" in modes or bool(modes & {"1", "true"}) or not memory
+    return cpu, memory
+
+
+class ProfilingMiddleware:
+    """Run requests carrying X-Profile and a valid X-Admin-Token under the profiler.
+
+    Requests without the header, outside the path prefixes, or when
+    NWN_GFF_ADMIN_TOKEN is not configured pass straight through. A profiled response carries
+    X-Profile-Id; while another request is being profiled it is served
+    normally with X-Profile-Status: busy.
+    """
+
+    def __init__(self, app, store: ProfileStore, prefixes: Tuple[str, ...]):
+        self.app = app
+        self.store = store
+        self.prefixes = prefixes
+
+    async def __call__(self, scope, receive, send):
+        if not config.ADMIN_TOKEN or scope["type"] != "http" or not scope["path"].startswith(self.prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        requested = supplied_token = None
+        for name, value in scope.get("headers", ()):
+            if name == b"x-profile":
+                requested = value.decode("latin-1")
+            elif name == b"x-admin-token":
+                supplied_token = value.decode("latin-1")
+        if requested is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not admin_token_matches(config.ADMIN_TOKEN, supplied_token):
+            await self._reply(send, 403, "Profiling requires a valid X-Admin-Token")
+            return
+        try:
+            cpu, memory = parse_profile_modes(requested)
+        except ProfilingError as e:
+            await self._reply(send, 400, str(e))
+            return
+
+        if not _profiling.acquire(blocking=False):
+            await self.app(scope, receive, self._with_header(send, b"x-profile-status", b"busy"))
+            return
+        try:
+            await self._profile(scope, receive, send, RequestProfile(scope["method"], scope["path"], cpu, memory))
+        finally:
+            _profiling.release()
+
+    async def _profile(self, scope, receive, send, profile: RequestProfile) -> None:
+        async def profiled_send(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+            await send(message)
+
+        token = _current_profile.set(profile)
+        profiler = cProfile.Profile() if profile.cpu else None
+        trace = profile.memory and not tracemalloc.is_tracing()
+        if trace:
+            tracemalloc.start()
+        if profiler is not None:
+            try:
+                profiler.enable()
+            except ValueError:
+                profiler = None  # another profiler is already active
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, self._with_header(profiled_send, b"x-profile-id", profile.id.encode()))
+        finally:
+            profile.duration = time.perf_counter() - start
+            if profiler is not None:
+                profiler.disable()
+                profiler.create_stats()
+                profile.add_cpu_stats(profiler.stats)
+            if trace:
+                profile.add_memory(tracemalloc.get_traced_memory()[1], _memory_top(tracemalloc.take_snapshot()))
+                tracemalloc.stop()
+            _current_profile.reset(token)
+            self.store.add(profile)
+
+    @staticmethod
+    def _with_header(send, name: bytes, value: bytes):
+        async def wrapped(message):
+            if message["type"] == "http.response.start":
+                message = dict(message, headers=list(message.get("headers", ())) + [(name, value)])
+            await send(message)
+        return wrapped
+
+    @staticmethod
+    async def _reply(send, status: int, detail: str) -> None:
+        body = json.dumps({"detail": detail}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,184 @@
+"""Content-addressed cache for conversion results"""
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, NamedTuple, Optional, TypeVar
+
+
+V = TypeVar("V")
+
+# Version of the converters' output. Bump it whenever a conversion's bytes change,
+# so disk-cached results, ETags and mirrors produced by older code stop matching.
+FORMAT_VERSION = 1
+
+
+class LruCache(Generic[V]):
+    """Thread-safe LRU bounded by the total size of its values.
+
+    size_of measures a value; entries larger than the whole budget are not
+    stored. on_evict, if given, is called with each evicted key and value.
+    Hit, miss and eviction counts are kept for monitoring.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        size_of: Callable[[V], int] = len,
+        on_evict: Optional[Callable[[str, V], None]] = None
+    ):
+        self.max_bytes = max_bytes
+        self.size_of = size_of
+        self.on_evict = on_evict
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, V]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[V]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: V) -> None:
+        size = self.size_of(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= self.size_of(old)
+            self._entries[key] = value
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                evicted_key, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= self.size_of(evicted)
+                self.evictions += 1
+                if self.on_evict is not None:
+                    self.on_evict(evicted_key, evicted)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class CachedResult(NamedTuple):
+    """A converted document and its media type"""
+    media_type: str
+    body: bytes
+
+
+def content_key(data: Any, *options: str) -> str:
+    """Hex digest identifying data plus the conversion options applied to it, under FORMAT_VERSION"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(b"v%d\0" % FORMAT_VERSION)
+    for option in options:
+        digest.update(option.encode("utf-8"))
+        digest.update(b"\0")
+    digest.update(data)
+    return digest.hexdigest()
+
+
+def is_content_key(key: str) -> bool:
+    return len(key) == 32 and all(c in "0123456789abcdef" for c in key)
+
+
+class ConversionCache:
+    """Two-tier result cache: an in-memory LRU in front of an optional directory.
+
+    The disk tier keeps one file per key (media type line, then body) and
+    evicts the least recently used files once disk_max_bytes is exceeded.
+    Disk hits are promoted back into memory.
+    """
+
+    def __init__(self, max_bytes: int, disk_dir: Optional[str] = None, disk_max_bytes: int = 0):
+        self.memory: LruCache[CachedResult] = LruCache(max_bytes, size_of=lambda result: len(result.body))
+        self.disk_dir = disk_dir
+        self.disk: Optional[LruCache[int]] = None
+        self.disk_hits = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self.disk = LruCache(disk_max_bytes, size_of=lambda size: size, on_evict=self._remove_file)
+            entries = []
+            for name in os.listdir(disk_dir):
+                path = os.path.join(disk_dir, name)
+                if os.path.isfile(path) and not name.startswith("."):
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime, name, stat.st_size))
+            for _, name, size in sorted(entries):
+                self.disk.put(name, size)
+
+    def _remove_file(self, key: str, _size: int) -> None:
+        try:
+            os.remove(os.path.join(self.disk_dir, key))
+        except OSError:
+            pass
+
+    def get(self, key: str) -> Optional[CachedResult]:
+        if not is_content_key(key):
+            return None
+        result = self.memory.get(key)
+        if result is not None or self.disk is None or self.disk.get(key) is None:
+            return result
+        try:
+            with open(os.path.join(self.disk_dir, key), "rb") as fp:
+                media_type = fp.readline().rstrip(b"\n").decode("ascii")
+                result = CachedResult(media_type, fp.read())
+        except OSError:
+            return None
+        self.disk_hits += 1
+        self.memory.put(key, result)
+        return result
+
+    def put(self, key: str, result: CachedResult) -> None:
+        self.memory.put(key, result)
+        if self.disk is None or key in self.disk:
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                fp.write(result.media_type.encode("ascii") + b"\n")
+                fp.write(result.body)
+            os.replace(tmp_path, os.path.join(self.disk_dir, key))
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+        size = len(result.body) + len(result.media_type) + 1
+        if size > self.disk.max_bytes:
+            self._remove_file(key, size)
+            return
+        self.disk.put(key, size)
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {"memory": self.memory.stats()}
+        if self.disk is not None:
+            stats["disk"] = dict(self.disk.stats(), hits=self.disk_hits)
+        return stats
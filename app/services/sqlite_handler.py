@@ -1,6 +1,27 @@
 """SQLite embedding and extraction functionality"""
+import io
+import struct
 import zlib
-from typing import Optional
+from typing import Iterator, Optional, Union
+
+from .. import config
+from ..models.gff_models import GffDataType
+from .gff_parser import GFF_ENCODING, GFF_HEADER, INLINE_FORMATS, LABEL_SIZE, GffParserError
+from .gff_view import GffView
+
+
+SQLITE_FIELD = "SQLite"  # VOID field of the top-level struct holding the compressed database
+SQLITE_CHUNK_SIZE = 1024 * 1024
+
+_UINT32 = struct.Struct("<I")
+_STRUCT_ENTRY = struct.Struct("<III")
+# Field types whose DataOrDataOffset slot points into the field data block
+_DATA_TYPE_IDS = frozenset(
+    kind.value for kind in GffDataType
+    if kind not in INLINE_FORMATS and kind not in (GffDataType.GFF_STRUCT, GffDataType.GFF_LIST)
+)
+
+Buffer = Union[bytes, bytearray, memoryview]
 
 
 class SqliteHandlerError(Exception):
@@ -9,57 +30,230 @@ class SqliteHandlerError(Exception):
 
 
 class SqliteHandler:
-    """Handles SQLite database embedding and extraction"""
-    
-    def __init__(self):
-        self.magic_sqlite = b"SQL3"
+    """Handles SQLite database embedding and extraction
+
+    The database is zlib-compressed and stored as the SQLite VOID field of
+    the GFF's top-level struct, so it is found through the field index
+    without scanning the file. Files written by earlier versions, which
+    appended "SQL3" + data after the GFF, are still read.
+    """
+
+    def __init__(self, max_size: Optional[int] = None):
+        self.magic_sqlite = b"SQL3"  # legacy trailer marker
         self.compression_level = 6  # Zstd compression level
-    
-    def embed_sqlite(self, gff_data: bytes, sqlite_data: bytes) -> bytes:
-        """Embed SQLite database into GFF data with compression"""
+        self.chunk_size = SQLITE_CHUNK_SIZE
+        # Decompressed bytes an embedded database may expand to before extraction is refused
+        self.max_size = max_size if max_size is not None else config.MAX_UPLOAD_SIZES["sqlite"]
+
+    def embed_sqlite(self, gff_data: Buffer, sqlite_data: Buffer) -> bytes:
+        """Embed SQLite database into GFF data with compression.
+
+        The GFF is spliced rather than rebuilt: each section is copied once
+        into the output, the top-level struct gains (or re-points) its SQLite
+        VOID field, and compressed chunks are written straight to the end of
+        the field data block, with the length prefix patched in once the
+        compressed size is known. A database already embedded is dropped
+        unless another field shares its payload.
+        """
         try:
-            # Compress the SQLite data
-            compressed_data = zlib.compress(sqlite_data, self.compression_level)
-            
-            # Add magic header
-            embedded_data = self.magic_sqlite + compressed_data
-            
-            # For now, return simple concatenation
-            # In full implementation, this would modify the GFF structure
-            return gff_data + embedded_data
-            
+            return self._splice_sqlite(GffView(gff_data, validate=True), sqlite_data)
+
+        except (GffParserError, SqliteHandlerError):
+            raise
+        except struct.error as e:
+            raise GffParserError(f"Binary parsing error: {e}")
         except Exception as e:
             raise SqliteHandlerError(f"Failed to embed SQLite: {e}")
-    
-    def extract_sqlite(self, gff_data: bytes) -> Optional[bytes]:
+
+    def _splice_sqlite(self, view: GffView, sqlite_data: Buffer) -> bytes:
+        header = view.header
+        buf = view.buffer
+        fields = view.top_level_struct.fields
+        table = list(struct.unpack_from(f"<{header.field_count * 3}I", buf, header.field_offset))
+        top_id, top_data, top_count = view.struct_entry(0)
+        field_data = buf[header.field_data_offset:header.field_data_offset + header.field_data_size]
+        dropped_start = dropped_size = 0
+        label_count = header.label_count
+        new_label = b""
+        new_indices = b""
+
+        if SQLITE_FIELD in fields:
+            index = fields.field_index(SQLITE_FIELD)
+            if table[index * 3] != GffDataType.GFF_VOID.value:
+                raise SqliteHandlerError(f"{SQLITE_FIELD} field is not a VOID field")
+            old = table[index * 3 + 2]
+            users = sum(1 for type_id, data in zip(table[0::3], table[2::3]) if type_id in _DATA_TYPE_IDS and data == old)
+            if users == 1:
+                dropped_start = old
+                dropped_size = 4 + _UINT32.unpack_from(field_data, old)[0]
+                if old + dropped_size > len(field_data):
+                    raise SqliteHandlerError(f"{SQLITE_FIELD} field extends past end of file")
+                # Payloads behind the dropped one move down with it
+                for position in range(0, len(table), 3):
+                    if table[position] in _DATA_TYPE_IDS and table[position + 2] > old:
+                        table[position + 2] -= dropped_size
+        else:
+            label_index = next((i for i in range(label_count) if view.label(i) == SQLITE_FIELD), None)
+            if label_index is None:
+                label_index = label_count
+                label_count += 1
+                new_label = SQLITE_FIELD.encode(GFF_ENCODING).ljust(LABEL_SIZE, b"\0")
+            index = header.field_count
+            table.extend((GffDataType.GFF_VOID.value, label_index, 0))
+            if top_count == 0:
+                top_data = index
+            else:
+                # A fresh index array at the end of the field indices block; the old one is left unused
+                new_indices = struct.pack(f"<{top_count + 1}I", *view.struct_field_indices(0), index)
+                top_data = header.field_indices_size
+            top_count += 1
+        table[index * 3 + 2] = header.field_data_size - dropped_size
+
+        out = io.BytesIO()
+        out.write(bytes(GFF_HEADER.size))
+        struct_offset = out.tell()
+        out.write(_STRUCT_ENTRY.pack(top_id, top_data, top_count))
+        out.write(buf[header.struct_offset + 12:header.struct_offset + header.struct_count * 12])
+        field_offset = out.tell()
+        out.write(struct.pack(f"<{len(table)}I", *table))
+        label_offset = out.tell()
+        out.write(buf[header.label_offset:header.label_offset + header.label_count * LABEL_SIZE])
+        out.write(new_label)
+
+        field_data_offset = out.tell()
+        out.write(field_data[:dropped_start] if dropped_size else field_data)
+        if dropped_size:
+            out.write(field_data[dropped_start + dropped_size:])
+        length_offset = out.tell()
+        out.write(bytes(4))
+        compressed_size = 0
+        for chunk in self.iter_compress(sqlite_data):
+            out.write(chunk)
+            compressed_size += len(chunk)
+        if compressed_size > 0xFFFFFFFF:
+            raise SqliteHandlerError("Compressed database is too large for a VOID field")
+        field_indices_offset = out.tell()
+        out.seek(length_offset)
+        out.write(_UINT32.pack(compressed_size))
+        out.seek(field_indices_offset)
+
+        out.write(buf[header.field_indices_offset:header.field_indices_offset + header.field_indices_size])
+        out.write(new_indices)
+        list_indices_offset = out.tell()
+        out.write(buf[header.list_indices_offset:header.list_indices_offset + header.list_indices_size])
+
+        out.seek(0)
+        out.write(GFF_HEADER.pack(
+            header.file_type, header.file_version,
+            struct_offset, header.struct_count,
+            field_offset, len(table) // 3,
+            label_offset, label_count,
+            field_data_offset, field_indices_offset - field_data_offset,
+            field_indices_offset, list_indices_offset - field_indices_offset,
+            list_indices_offset, header.list_indices_size,
+        ))
+        return out.getvalue()
+
+    def extract_sqlite(self, gff_data: Buffer) -> Optional[bytes]:
         """Extract and decompress SQLite database from GFF data"""
         try:
-            # Look for magic header
-            magic_pos = gff_data.find(self.magic_sqlite)
-            if magic_pos == -1:
+            compressed_data = self.find_sqlite(gff_data)
+            if compressed_data is None:
                 return None
-            
-            # Extract compressed data (skip magic header)
-            compressed_data = gff_data[magic_pos + len(self.magic_sqlite):]
-            
-            # Decompress
-            decompressed_data = zlib.decompress(compressed_data)
-            
-            return decompressed_data
-            
+
+            output = io.BytesIO()
+            for chunk in self.iter_decompress(compressed_data):
+                output.write(chunk)
+            return output.getvalue()
+
+        except (GffParserError, SqliteHandlerError):
+            raise
         except Exception as e:
             raise SqliteHandlerError(f"Failed to extract SQLite: {e}")
-    
+
+    def find_sqlite(self, gff_data: Buffer) -> Optional[memoryview]:
+        """Zero-copy view of the compressed database, or None if the file has none"""
+        view = GffView(gff_data, validate=True)
+        fields = view.top_level_struct.fields
+        if SQLITE_FIELD in fields:
+            type_id, _, data_offset = view.field_entry(fields.field_index(SQLITE_FIELD))
+            if type_id != GffDataType.GFF_VOID.value:
+                raise SqliteHandlerError(f"{SQLITE_FIELD} field is not a VOID field")
+            offset = view.header.field_data_offset + data_offset
+            size = _UINT32.unpack_from(view.buffer, offset)[0]
+            if offset + 4 + size > len(view.buffer):
+                raise SqliteHandlerError(f"{SQLITE_FIELD} field extends past end of file")
+            return view.buffer[offset + 4:offset + 4 + size]
+
+        # Legacy layout: the marker sits right after the last GFF section
+        header = view.header
+        end = max(
+            header.struct_offset + header.struct_count * 12,
+            header.field_offset + header.field_count * 12,
+            header.label_offset + header.label_count * 16,
+            header.field_data_offset + header.field_data_size,
+            header.field_indices_offset + header.field_indices_size,
+            header.list_indices_offset + header.list_indices_size,
+        )
+        if view.buffer[end:end + len(self.magic_sqlite)] == self.magic_sqlite:
+            return view.buffer[end + len(self.magic_sqlite):]
+        return None
+
+    def iter_compress(self, data: Buffer) -> Iterator[bytes]:
+        """zlib stream of data, fed to the compressor chunk_size bytes at a time"""
+        compressor = zlib.compressobj(self.compression_level)
+        source = memoryview(data).cast("B")
+        for start in range(0, len(source), self.chunk_size):
+            chunk = compressor.compress(source[start:start + self.chunk_size])
+            if chunk:
+                yield chunk
+        yield compressor.flush()
+
+    def iter_decompress(self, data: Buffer) -> Iterator[bytes]:
+        """Decompressed chunks of a zlib stream, read chunk_size bytes at a time.
+
+        No call produces more than chunk_size bytes, and SqliteHandlerError is
+        raised as soon as the output passes max_size, so a small, highly
+        compressible payload cannot expand without bound.
+        """
+        decompressor = zlib.decompressobj()
+        source = memoryview(data).cast("B")
+        total = 0
+        try:
+            for start in range(0, len(source), self.chunk_size):
+                pending = source[start:start + self.chunk_size]
+                while pending and not decompressor.eof:
+                    chunk = decompressor.decompress(pending, self.chunk_size)
+                    pending = decompressor.unconsumed_tail
+                    total += len(chunk)
+                    if total > self.max_size:
+                        raise SqliteHandlerError(f"Embedded SQLite database expands past {self.max_size} bytes")
+                    if chunk:
+                        yield chunk
+                if decompressor.eof:
+                    break
+            chunk = decompressor.flush()
+            if total + len(chunk) > self.max_size:
+                raise SqliteHandlerError(f"Embedded SQLite database expands past {self.max_size} bytes")
+            if chunk:
+                yield chunk
+        except zlib.error as e:
+            raise SqliteHandlerError(f"Corrupt SQLite data: {e}")
+        if not decompressor.eof:
+            raise SqliteHandlerError("Embedded SQLite data is truncated")
+
     def compress_data(self, data: bytes) -> bytes:
         """Compress data using zlib (equivalent to Zstd in Nim version)"""
         try:
             return zlib.compress(data, self.compression_level)
         except Exception as e:
             raise SqliteHandlerError(f"Failed to compress data: {e}")
-    
+
     def decompress_data(self, data: bytes) -> bytes:
-        """Decompress data using zlib"""
+        """Decompress data using zlib, held to max_size like iter_decompress"""
         try:
-            return zlib.decompress(data)
+            return b"".join(self.iter_decompress(data))
+        except SqliteHandlerError:
+            raise
         except Exception as e:
-            raise SqliteHandlerError(f"Failed to decompress data: {e}")
\ No newline at end of file
+            raise SqliteHandlerError(f"Failed to decompress data: {e}")
@@ -0,0 +1,121 @@
+"""Read-only SQL queries against embedded SQLite databases"""
+import json
+import os
+import sqlite3
+import tempfile
+import time
+from typing import Any, Iterator, Optional, Sequence, Union
+
+
+QUERY_BATCH_SIZE = 500
+
+# Authorizer actions a plain SELECT needs; everything else (writes, ATTACH, PRAGMA) is denied
+READ_ONLY_ACTIONS = frozenset((
+    sqlite3.SQLITE_SELECT,
+    sqlite3.SQLITE_READ,
+    sqlite3.SQLITE_FUNCTION,
+    sqlite3.SQLITE_RECURSIVE,
+))
+
+Params = Union[Sequence[Any], dict]
+
+
+class SqliteQueryError(Exception):
+    """Custom exception for SQL query errors"""
+    pass
+
+
+class SqliteQueryTimeout(SqliteQueryError):
+    """Raised when a query runs past its time limit"""
+
+    def __init__(self, timeout: float):
+        super().__init__(f"Query timed out after {timeout:g}s")
+
+
+def _authorize(action: int, *_args) -> int:
+    return sqlite3.SQLITE_OK if action in READ_ONLY_ACTIONS else sqlite3.SQLITE_DENY
+
+
+def open_database(data: bytes) -> sqlite3.Connection:
+    """Load a database image into a private in-memory connection that only allows reads"""
+    connection = sqlite3.connect(":memory:", check_same_thread=False)
+    try:
+        if hasattr(connection, "deserialize"):
+            connection.deserialize(data)
+        else:
+            # Python < 3.11: open a read-only copy on disk instead
+            connection.close()
+            fd, path = tempfile.mkstemp(suffix=".db")
+            try:
+                with os.fdopen(fd, "wb") as fp:
+                    fp.write(data)
+                connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+            finally:
+                os.remove(path)  # the open connection keeps the file alive
+        connection.execute("PRAGMA query_only = ON")
+    except sqlite3.Error as e:
+        connection.close()
+        raise SqliteQueryError(f"Invalid SQLite database: {e}")
+    connection.set_authorizer(_authorize)
+    return connection
+
+
+def run_query(
+    connection: sqlite3.Connection,
+    sql: str,
+    params: Params = (),
+    timeout: Optional[float] = None
+) -> sqlite3.Cursor:
+    """Execute one read-only statement; rows are fetched later from the cursor.
+
+    With a timeout, the statement is interrupted once it has run that long,
+    including while its rows are being fetched.
+    """
+    if timeout is not None:
+        deadline = time.monotonic() + timeout
+        connection.set_progress_handler(lambda: time.monotonic() > deadline, 1000)
+    try:
+        return connection.execute(sql, params)
+    except sqlite3.OperationalError as e:
+        if timeout is not None and time.monotonic() > deadline:
+            raise SqliteQueryTimeout(timeout)
+        raise SqliteQueryError(str(e))
+    except (sqlite3.Error, sqlite3.Warning, ValueError) as e:
+        raise SqliteQueryError(str(e))
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, bytes):
+        return value.decode("latin-1")  # BLOBs, the same way VOID fields are rendered
+    return value
+
+
+def iter_ndjson_rows(
+    cursor: sqlite3.Cursor,
+    connection: Optional[sqlite3.Connection] = None,
+    batch_size: int = QUERY_BATCH_SIZE
+) -> Iterator[bytes]:
+    """One JSON object per row, keyed by column name.
+
+    A failure after rows have been sent is reported as a final
+    {"error": ...} line. connection, if given, is closed at the end.
+    """
+    columns = [description[0] for description in cursor.description or ()]
+    try:
+        while True:
+            try:
+                rows = cursor.fetchmany(batch_size)
+            except sqlite3.Error as e:
+                yield json.dumps({"error": str(e)}).encode("utf-8") + b"\n"
+                return
+            if not rows:
+                return
+            yield b"".join(
+                json.dumps(
+                    dict(zip(columns, map(_json_value, row))), ensure_ascii=False, separators=(",", ":")
+                ).encode("utf-8") + b"\n"
+                for row in rows
+            )
+    finally:
+        if connection is not None:
+            connection.close()
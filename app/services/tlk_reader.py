@@ -0,0 +1,193 @@
+"""Talk table (dialog.tlk) reading and StrRef resolution"""
+import mmap
+import struct
+from typing import BinaryIO, Dict, NamedTuple, Optional, Tuple, Union
+
+from .result_cache import LruCache
+
+
+TLK_HEADER = struct.Struct("<4s4sIII")   # type, version, language id, string count, string entries offset
+TLK_ENTRY = struct.Struct("<I16sIIIIf")  # flags, sound ResRef, volume/pitch variance, offset, size, sound length
+TLK_VERSION = b"V3.0"
+
+TEXT_PRESENT = 0x1
+NO_STR_REF = 0xFFFFFFFF
+CUSTOM_TLK = 0x01000000    # StrRefs with this bit set index the module's custom talk table
+STR_REF_INDEX = 0x00FFFFFF
+TLK_CACHE_BYTES = 4 * 1024 * 1024  # resolved text kept per resolver, in characters
+
+# Code page per TLK language id; the western languages use cp1252
+_LANGUAGE_ENCODINGS = {
+    5: "cp1250",    # Polish
+    128: "cp949",   # Korean
+    129: "cp950",   # Chinese, traditional
+    130: "cp936",   # Chinese, simplified
+    131: "cp932",   # Japanese
+}
+
+
+class TlkReaderError(Exception):
+    """Custom exception for talk table errors"""
+    pass
+
+
+class TlkEntry(NamedTuple):
+    """One string data table element; the text itself is not read"""
+    flags: int
+    sound_resref: str
+    offset: int  # absolute
+    size: int
+    sound_length: float
+
+    @property
+    def text_present(self) -> bool:
+        return bool(self.flags & TEXT_PRESENT)
+
+
+class TlkFile:
+    """Indexed view of a V3.0 talk table.
+
+    Only the header is decoded when the table is opened. A string data
+    table element is unpacked, and its text decoded, when that StrRef is
+    looked up, so opening a 10+ MB dialog.tlk costs one mmap.
+    """
+
+    def __init__(self, data: Union[bytes, bytearray, memoryview, mmap.mmap]):
+        self._mmap = data if isinstance(data, mmap.mmap) else None
+        self.buffer = memoryview(data).cast("B")
+        try:
+            self._read_header()
+        except struct.error as e:
+            self.close()
+            raise TlkReaderError(f"Binary parsing error: {e}")
+        except TlkReaderError:
+            self.close()
+            raise
+
+    @classmethod
+    def open(cls, source: Union[str, BinaryIO]) -> "TlkFile":
+        """mmap a path or an open file object"""
+        if isinstance(source, str):
+            with open(source, "rb") as fp:
+                return cls.open(fp)
+        try:
+            mapped = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as e:  # empty file
+            raise TlkReaderError(f"Cannot map talk table: {e}")
+        return cls(mapped)
+
+    def _read_header(self) -> None:
+        file_type, version, self.language_id, self.string_count, self.entries_offset = \
+            TLK_HEADER.unpack_from(self.buffer, 0)
+        if file_type != b"TLK ":
+            raise TlkReaderError(f"Invalid talk table file type: {file_type!r}")
+        if version != TLK_VERSION:
+            raise TlkReaderError(f"Unsupported talk table version: {version!r}")
+        if TLK_HEADER.size + self.string_count * TLK_ENTRY.size > len(self.buffer):
+            raise TlkReaderError("String data table extends past end of file")
+        self.encoding = _LANGUAGE_ENCODINGS.get(self.language_id, "cp1252")
+
+    def __len__(self) -> int:
+        return self.string_count
+
+    def entry(self, index: int) -> Optional[TlkEntry]:
+        """String data table element for a StrRef index, or None when out of range"""
+        if not 0 <= index < self.string_count:
+            return None
+        flags, sound_resref, _, _, offset, size, sound_length = TLK_ENTRY.unpack_from(
+            self.buffer, TLK_HEADER.size + index * TLK_ENTRY.size
+        )
+        return TlkEntry(
+            flags,
+            sound_resref.split(b"\0", 1)[0].decode("cp1252", "replace"),
+            self.entries_offset + offset,
+            size,
+            sound_length,
+        )
+
+    def text(self, index: int) -> Optional[str]:
+        """Text of a StrRef index, or None when it has none"""
+        entry = self.entry(index)
+        if entry is None or not entry.text_present:
+            return None
+        if entry.offset + entry.size > len(self.buffer):
+            raise TlkReaderError(f"String {index} extends past end of file")
+        return str(self.buffer[entry.offset:entry.offset + entry.size], self.encoding, "replace")
+
+    def close(self) -> None:
+        self.buffer.release()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self) -> "TlkFile":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class TlkResolver:
+    """Resolves CExoLocString StrRefs to text.
+
+    StrRefs index dialog.tlk, or the custom talk table when their
+    0x01000000 bit is set. Resolved text is kept in an LRU bounded by
+    cache_bytes, and the resolver is thread-safe.
+    """
+
+    def __init__(self, tlk: TlkFile, custom: Optional[TlkFile] = None, cache_bytes: int = TLK_CACHE_BYTES):
+        self.tlk = tlk
+        self.custom = custom
+        self.cache: LruCache[str] = LruCache(cache_bytes)
+        self._paths: Optional[Tuple[str, Optional[str], int]] = None
+
+    @classmethod
+    def open(cls, path: str, custom_path: Optional[str] = None, cache_bytes: int = TLK_CACHE_BYTES) -> "TlkResolver":
+        tlk = TlkFile.open(path)
+        try:
+            custom = TlkFile.open(custom_path) if custom_path else None
+        except TlkReaderError:
+            tlk.close()
+            raise
+        resolver = cls(tlk, custom, cache_bytes)
+        resolver._paths = (path, custom_path, cache_bytes)
+        return resolver
+
+    def __reduce__(self):
+        # An mmap cannot be pickled; process workers open their own shared resolver
+        if self._paths is None:
+            raise TypeError("Only a TlkResolver opened from paths can be pickled")
+        return shared_resolver, self._paths
+
+    def resolve(self, str_ref: int) -> Optional[str]:
+        """Text for a StrRef, or None when it is unset or not in the talk table"""
+        if str_ref == NO_STR_REF:
+            return None
+        key = str(str_ref)
+        text = self.cache.get(key)
+        if text is not None:
+            return text
+        table = self.custom if str_ref & CUSTOM_TLK else self.tlk
+        if table is None:
+            return None
+        text = table.text(str_ref & STR_REF_INDEX)
+        if text is not None:
+            self.cache.put(key, text)
+        return text
+
+    def close(self) -> None:
+        self.tlk.close()
+        if self.custom is not None:
+            self.custom.close()
+
+
+_shared: Dict[Tuple[str, Optional[str], int], TlkResolver] = {}
+
+
+def shared_resolver(path: str, custom_path: Optional[str] = None, cache_bytes: int = TLK_CACHE_BYTES) -> TlkResolver:
+    """One resolver per set of talk tables in this process, so its mapping and cache are reused"""
+    key = (path, custom_path, cache_bytes)
+    resolver = _shared.get(key)
+    if resolver is None:
+        resolver = _shared[key] = TlkResolver.open(path, custom_path, cache_bytes)
+    return resolver
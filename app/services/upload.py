@@ -0,0 +1,163 @@
+"""Upload size enforcement and zero-copy upload access"""
+import json
+import mmap
+import os
+from typing import Callable, Optional, Union
+
+from fastapi import HTTPException, UploadFile
+
+from .metrics import stage_timer
+
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+MULTIPART_OVERHEAD = 64 * 1024  # boundaries and part headers on top of the file limit
+
+
+def too_large(limit: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"File too large (max {format_size(limit)})")
+
+
+def format_size(size: int) -> str:
+    for unit, scale in (("GB", 1 << 30), ("MB", 1 << 20), ("KB", 1 << 10)):
+        if size >= scale and size % scale == 0:
+            return f"{size // scale}{unit}"
+    return f"{size} bytes"
+
+
+class UploadLimitMiddleware:
+    """ASGI middleware that rejects oversized request bodies while they arrive.
+
+    limit_for maps a request path to its byte limit (None for no limit).
+    A declared Content-Length over the limit is answered with 413 before any
+    of the body is read; otherwise the body is counted chunk by chunk and the
+    request fails with 413 as soon as the limit is crossed, so an oversized
+    upload is never spooled in full.
+    """
+
+    def __init__(self, app, limit_for: Callable[[str], Optional[int]]):
+        self.app = app
+        self.limit_for = limit_for
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.limit_for(scope["path"])
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        body_limit = limit + MULTIPART_OVERHEAD
+
+        for name, value in scope.get("headers", ()):
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    declared = 0
+                if declared > body_limit:
+                    await self._reject(send, limit)
+                    return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > body_limit:
+                    raise too_large(limit)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    @staticmethod
+    async def _reject(send, limit: int) -> None:
+        body = json.dumps({"detail": too_large(limit).detail}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("ascii")),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+class UploadBuffer:
+    """Contents of an upload: a bytearray for small files, a read-only mmap for large ones.
+
+    Large uploads are already spooled to a temp file by the multipart parser;
+    mapping that file hands the parser the data without another copy.
+    """
+
+    def __init__(self, data: Union[bytearray, mmap.mmap]):
+        self.data = data
+
+    @property
+    def mapped(self) -> bool:
+        return isinstance(self.data, mmap.mmap)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def close(self) -> None:
+        if isinstance(self.data, mmap.mmap):
+            try:
+                self.data.close()
+            except BufferError:
+                # A lazy view still references the mapping; it is freed with it
+                pass
+
+    def __enter__(self) -> "UploadBuffer":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def upload_size(file: UploadFile) -> int:
+    file.file.seek(0, os.SEEK_END)
+    size = file.file.tell()
+    file.file.seek(0)
+    return size
+
+
+async def read_upload(file: UploadFile, limit: int, spill_threshold: Optional[int] = None) -> UploadBuffer:
+    """Check an upload against limit and return its contents.
+
+    Uploads larger than spill_threshold are memory-mapped from their temp
+    file; smaller ones (or all, when spill_threshold is None) are read in
+    fixed-size chunks straight into one preallocated bytearray.
+    """
+    size = upload_size(file)
+    if size > limit:
+        raise too_large(limit)
+
+    with stage_timer("read"):
+        return await _read_upload(file, size, spill_threshold)
+
+
+async def _read_upload(file: UploadFile, size: int, spill_threshold: Optional[int]) -> UploadBuffer:
+    if spill_threshold is not None and size > spill_threshold:
+        try:
+            return UploadBuffer(mmap.mmap(file.file.fileno(), 0, access=mmap.ACCESS_READ))
+        except (OSError, ValueError, AttributeError):
+            pass  # not backed by a real file; fall back to reading it
+
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    position = 0
+    while position < size:
+        chunk = await file.read(min(UPLOAD_CHUNK_SIZE, size - position))
+        if not chunk:
+            break
+        view[position:position + len(chunk)] = chunk
+        position += len(chunk)
+    view.release()
+    if position < size:
+        del buffer[position:]
+    return UploadBuffer(buffer)
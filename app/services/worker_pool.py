@@ -0,0 +1,170 @@
+"""Bounded worker pool that keeps CPU-bound stages off the event loop"""
+import asyncio
+import mmap
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .. import config
+from .metrics import STAGE_REJECTIONS, STAGE_TIMEOUTS, record_stage
+from .profiling import current_profile, profiled_call
+
+
+class WorkerPoolError(Exception):
+    """Custom exception for worker pool errors"""
+    pass
+
+
+class WorkerPoolFull(WorkerPoolError):
+    """Raised when the pool already has max_pending jobs queued or running"""
+
+    def __init__(self, stage: str, retry_after: int):
+        super().__init__(f"Server busy, {stage} queue is full")
+        self.retry_after = retry_after
+
+
+class WorkerTimeout(WorkerPoolError):
+    """Raised when a stage does not finish within its timeout"""
+
+    def __init__(self, stage: str, timeout: float):
+        super().__init__(f"Stage {stage!r} timed out after {timeout:g}s")
+
+
+def _timed_call(fn: Callable[..., Any], *args: Any) -> Tuple[float, float, Any]:
+    """Run fn in the worker and report when it started and finished.
+
+    time.monotonic is system-wide, so the timestamps are comparable with the
+    submitting process even when the worker is a separate process.
+    """
+    started = time.monotonic()
+    result = fn(*args)
+    return started, time.monotonic(), result
+
+
+class WorkerPool:
+    """Run blocking stages on a thread or process pool with admission control.
+
+    At most max_pending jobs may be queued or running at once; further
+    submissions fail fast with WorkerPoolFull instead of piling up. A job
+    keeps its slot until it actually finishes, even if the caller stopped
+    waiting because the stage timed out. In process mode, stage functions
+    and their arguments must be picklable; memoryview and mmap arguments are
+    copied to bytes before they are sent.
+    """
+
+    def __init__(
+        self,
+        kind: str = "thread",
+        max_workers: int = 1,
+        max_pending: int = 4,
+        timeouts: Optional[Dict[str, float]] = None,
+        default_timeout: float = 30.0,
+        retry_after: int = 1
+    ):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown worker kind: {kind}")
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeouts = dict(timeouts or {})
+        self.default_timeout = default_timeout
+        self.retry_after = retry_after
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls) -> "WorkerPool":
+        return cls(
+            kind=config.WORKER_KIND,
+            max_workers=config.WORKER_COUNT,
+            max_pending=config.WORKER_MAX_PENDING,
+            timeouts=config.STAGE_TIMEOUTS,
+            default_timeout=config.STAGE_TIMEOUT,
+            retry_after=config.WORKER_RETRY_AFTER
+        )
+
+    @classmethod
+    def batch_from_config(cls) -> "WorkerPool":
+        """Process pool for batch conversion, with the shared stage timeouts"""
+        return cls(
+            kind="process",
+            max_workers=config.BATCH_WORKER_COUNT,
+            max_pending=config.BATCH_MAX_PENDING,
+            timeouts=config.STAGE_TIMEOUTS,
+            default_timeout=config.STAGE_TIMEOUT,
+            retry_after=config.WORKER_RETRY_AFTER
+        )
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @property
+    def active(self) -> int:
+        """Jobs currently running (the rest of pending are queued)"""
+        return min(self._pending, self.max_workers)
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="gff-worker")
+        return self._executor
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    def check_capacity(self, stage: str) -> None:
+        """Raise WorkerPoolFull now if a job for stage would be refused"""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                STAGE_REJECTIONS.inc(stage)
+                raise WorkerPoolFull(stage, self.retry_after)
+
+    async def run(self, stage: str, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run fn(*args) on the pool and await its result"""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                STAGE_REJECTIONS.inc(stage)
+                raise WorkerPoolFull(stage, self.retry_after)
+            self._pending += 1
+
+        if self.kind == "process":
+            args = tuple(bytes(arg) if isinstance(arg, (memoryview, mmap.mmap)) else arg for arg in args)
+        # Profiled requests are profiled inside the worker, where the stage actually runs
+        profile = current_profile()
+        if profile is not None:
+            args = (profile.cpu, profile.memory, fn) + args
+            fn = profiled_call
+
+        submitted = time.monotonic()
+        try:
+            future = self._get_executor().submit(_timed_call, fn, *args)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+
+        timeout = self.timeouts.get(stage, self.default_timeout)
+        try:
+            started, finished, result = await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(future)), timeout
+            )
+        except asyncio.TimeoutError:
+            future.cancel()
+            STAGE_TIMEOUTS.inc(stage)
+            raise WorkerTimeout(stage, timeout)
+        record_stage(stage, finished - started, queued=started - submitted)
+        if profile is not None:
+            profile.add_stage(stage, result)
+            return result.value
+        return result
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1 @@
+"""Synthetic corpus and stage benchmarks"""
@@ -0,0 +1,330 @@
+"""Deterministic synthetic GFF corpus for benchmarks.
+
+Each generator builds a GffRoot shaped like a real game file and is seeded,
+so the same name, seed and scale always produce byte-identical output:
+
+- bic:    player character with deep ClassList/LvlStatList, nested
+          container ItemLists and an EquipItemList
+- git:    area instance file with wide Creature/Door/Placeable/Trigger lists
+- dlg:    dialogue with long EntryList/ReplyList link lists
+- sqlite: a bic carrying an embedded campaign database
+"""
+import os
+import random
+import sqlite3
+import tempfile
+from typing import Callable, Dict, List, Optional
+
+from app.models.gff_models import GffDataType, GffField, GffLocString, GffRoot, GffStruct
+from app.services.gff_parser import GffParser
+from app.services.sqlite_handler import SqliteHandler
+
+
+T = GffDataType
+TOP_LEVEL_ID = 0xFFFFFFFF
+EQUIP_SLOTS = 14
+
+
+def _struct(struct_id: int, **fields: GffField) -> GffStruct:
+    return GffStruct(id=struct_id, fields=fields)
+
+
+def _list(structs: List[GffStruct]) -> GffField:
+    return GffField(T.GFF_LIST, structs)
+
+
+def _locstring(rng: random.Random, words: int) -> GffField:
+    return GffField(T.GFF_LOCSTRING, GffLocString(str_ref=0xFFFFFFFF, entries={0: _text(rng, words)}))
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(words))
+
+
+def _resref(rng: random.Random, prefix: str) -> GffField:
+    return GffField(T.GFF_RESREF, f"{prefix}_{rng.randrange(1000):03d}")
+
+
+_WORDS = (
+    "the", "goblin", "sword", "ancient", "keep", "of", "shadow", "and", "silver", "moon",
+    "merchant", "gate", "forest", "ale", "scroll", "ring", "dragon", "road", "north", "guard",
+)
+
+
+def _item(rng: random.Random, depth: int, struct_id: int = 0) -> GffStruct:
+    item = _struct(
+        struct_id,
+        BaseItem=GffField(T.GFF_INT, rng.randrange(120)),
+        Tag=GffField(T.GFF_STRING, f"item_{rng.randrange(10 ** 6)}"),
+        LocalizedName=_locstring(rng, 3),
+        Description=_locstring(rng, 40),
+        TemplateResRef=_resref(rng, "it"),
+        StackSize=GffField(T.GFF_WORD, rng.randrange(1, 100)),
+        Charges=GffField(T.GFF_BYTE, rng.randrange(50)),
+        Cost=GffField(T.GFF_DWORD, rng.randrange(100000)),
+        AddCost=GffField(T.GFF_DWORD, 0),
+        Identified=GffField(T.GFF_BYTE, 1),
+        Cursed=GffField(T.GFF_BYTE, 0),
+        ModelPart1=GffField(T.GFF_BYTE, rng.randrange(20)),
+        Repos_PosX=GffField(T.GFF_WORD, rng.randrange(10)),
+        Repos_Posy=GffField(T.GFF_WORD, rng.randrange(10)),
+        PropertiesList=_list([
+            _struct(
+                0,
+                PropertyName=GffField(T.GFF_WORD, rng.randrange(90)),
+                Subtype=GffField(T.GFF_WORD, rng.randrange(30)),
+                CostTable=GffField(T.GFF_BYTE, rng.randrange(30)),
+                CostValue=GffField(T.GFF_WORD, rng.randrange(20)),
+                Param1=GffField(T.GFF_BYTE, 255),
+                Param1Value=GffField(T.GFF_BYTE, 0),
+                ChanceAppear=GffField(T.GFF_BYTE, 100),
+            )
+            for _ in range(rng.randrange(1, 6))
+        ]),
+    )
+    if depth > 0 and rng.random() < 0.3:
+        # Containers (bags) carry their own ItemList
+        item.fields["ItemList"] = _list([_item(rng, depth - 1, i) for i in range(rng.randrange(2, 10))])
+    return item
+
+
+def _feats(rng: random.Random, count: int) -> GffField:
+    return _list([_struct(1, Feat=GffField(T.GFF_WORD, rng.randrange(1100))) for _ in range(count)])
+
+
+def _skills(rng: random.Random) -> GffField:
+    return _list([_struct(0, Rank=GffField(T.GFF_BYTE, rng.randrange(40))) for _ in range(28)])
+
+
+def make_bic(rng: random.Random, scale: int = 1) -> GffRoot:
+    levels = 40
+    classes = []
+    for class_index in range(3):
+        known = {
+            f"KnownList{spell_level}": _list([
+                _struct(
+                    3,
+                    Spell=GffField(T.GFF_WORD, rng.randrange(800)),
+                    SpellFlags=GffField(T.GFF_BYTE, 1),
+                    SpellMetaMagic=GffField(T.GFF_BYTE, 0),
+                )
+                for _ in range(rng.randrange(5, 15))
+            ])
+            for spell_level in range(10)
+        }
+        classes.append(_struct(
+            2,
+            Class=GffField(T.GFF_INT, rng.randrange(40)),
+            ClassLevel=GffField(T.GFF_SHORT, rng.randrange(1, 20)),
+            **known,
+        ))
+
+    level_stats = [
+        _struct(
+            0,
+            LvlStatClass=GffField(T.GFF_BYTE, level % 3),
+            LvlStatHitDie=GffField(T.GFF_BYTE, rng.randrange(4, 12)),
+            SkillPoints=GffField(T.GFF_WORD, rng.randrange(10)),
+            FeatList=_feats(rng, rng.randrange(0, 3)),
+            SkillList=_skills(rng),
+            KnownList0=_list([_struct(0, Spell=GffField(T.GFF_WORD, rng.randrange(800)))]),
+        )
+        for level in range(levels)
+    ]
+
+    top = _struct(
+        TOP_LEVEL_ID,
+        FirstName=_locstring(rng, 1),
+        LastName=_locstring(rng, 1),
+        Description=_locstring(rng, 120),
+        Tag=GffField(T.GFF_STRING, "pc_bench"),
+        Race=GffField(T.GFF_BYTE, rng.randrange(7)),
+        Gender=GffField(T.GFF_BYTE, rng.randrange(2)),
+        Str=GffField(T.GFF_BYTE, rng.randrange(8, 30)),
+        Dex=GffField(T.GFF_BYTE, rng.randrange(8, 30)),
+        Con=GffField(T.GFF_BYTE, rng.randrange(8, 30)),
+        Int=GffField(T.GFF_BYTE, rng.randrange(8, 30)),
+        Wis=GffField(T.GFF_BYTE, rng.randrange(8, 30)),
+        Cha=GffField(T.GFF_BYTE, rng.randrange(8, 30)),
+        HitPoints=GffField(T.GFF_SHORT, rng.randrange(100, 600)),
+        Experience=GffField(T.GFF_DWORD, rng.randrange(10 ** 6)),
+        Gold=GffField(T.GFF_DWORD, rng.randrange(10 ** 7)),
+        ChallengeRating=GffField(T.GFF_FLOAT, 20.0),
+        Deity=GffField(T.GFF_STRING, "Tyr"),
+        ClassList=_list(classes),
+        FeatList=_feats(rng, 60),
+        SkillList=_skills(rng),
+        LvlStatList=_list(level_stats),
+        ItemList=_list([_item(rng, depth=2, struct_id=i) for i in range(120 * scale)]),
+        EquipItemList=_list([_item(rng, depth=0, struct_id=1 << slot) for slot in range(EQUIP_SLOTS)]),
+    )
+    return GffRoot(structs=[], top_level_struct=top, file_type="BIC ")
+
+
+def _placed(rng: random.Random, struct_id: int, prefix: str, extra: Dict[str, GffField]) -> GffStruct:
+    return _struct(
+        struct_id,
+        Tag=GffField(T.GFF_STRING, f"{prefix}_{rng.randrange(10 ** 6)}"),
+        LocName=_locstring(rng, 2),
+        TemplateResRef=_resref(rng, prefix),
+        XPosition=GffField(T.GFF_FLOAT, rng.uniform(0, 320)),
+        YPosition=GffField(T.GFF_FLOAT, rng.uniform(0, 320)),
+        ZPosition=GffField(T.GFF_FLOAT, rng.uniform(0, 10)),
+        XOrientation=GffField(T.GFF_FLOAT, rng.uniform(-1, 1)),
+        YOrientation=GffField(T.GFF_FLOAT, rng.uniform(-1, 1)),
+        OnUsed=_resref(rng, "scr"),
+        OnDeath=_resref(rng, "scr"),
+        OnHeartbeat=_resref(rng, "scr"),
+        OnUserDefined=_resref(rng, "scr"),
+        Faction=GffField(T.GFF_DWORD, rng.randrange(5)),
+        HP=GffField(T.GFF_SHORT, rng.randrange(1, 200)),
+        Plot=GffField(T.GFF_BYTE, 0),
+        **extra,
+    )
+
+
+def make_git(rng: random.Random, scale: int = 1) -> GffRoot:
+    count = 400 * scale
+    creatures = [
+        _placed(rng, 4, "cr", {
+            "Appearance_Type": GffField(T.GFF_WORD, rng.randrange(500)),
+            "ChallengeRating": GffField(T.GFF_FLOAT, rng.uniform(0, 30)),
+            "ClassList": _list([_struct(2, Class=GffField(T.GFF_INT, rng.randrange(40)),
+                                        ClassLevel=GffField(T.GFF_SHORT, rng.randrange(1, 20)))]),
+            "Equip_ItemList": _list([_struct(1 << slot, EquippedRes=_resref(rng, "it")) for slot in range(3)]),
+        })
+        for _ in range(count)
+    ]
+    doors = [
+        _placed(rng, 8, "door", {
+            "LinkedTo": GffField(T.GFF_STRING, f"wp_{rng.randrange(1000)}"),
+            "Locked": GffField(T.GFF_BYTE, rng.randrange(2)),
+            "OpenLockDC": GffField(T.GFF_BYTE, rng.randrange(40)),
+        })
+        for _ in range(count // 2)
+    ]
+    placeables = [
+        _placed(rng, 9, "plc", {
+            "Appearance": GffField(T.GFF_DWORD, rng.randrange(1000)),
+            "HasInventory": GffField(T.GFF_BYTE, 0),
+            "Useable": GffField(T.GFF_BYTE, rng.randrange(2)),
+        })
+        for _ in range(count)
+    ]
+    triggers = [
+        _placed(rng, 1, "trg", {
+            "Geometry": _list([
+                _struct(3, PointX=GffField(T.GFF_FLOAT, rng.uniform(-5, 5)),
+                        PointY=GffField(T.GFF_FLOAT, rng.uniform(-5, 5)),
+                        PointZ=GffField(T.GFF_FLOAT, 0.0))
+                for _ in range(rng.randrange(3, 12))
+            ]),
+        })
+        for _ in range(count // 4)
+    ]
+    top = _struct(
+        TOP_LEVEL_ID,
+        AreaProperties=GffField(T.GFF_STRUCT, _struct(
+            100,
+            AmbientSndDay=GffField(T.GFF_INT, 12),
+            AmbientSndNight=GffField(T.GFF_INT, 13),
+            MusicDay=GffField(T.GFF_INT, 4),
+            MusicNight=GffField(T.GFF_INT, 5),
+        )),
+        **{"Creature List": _list(creatures)},
+        **{"Door List": _list(doors)},
+        **{"Placeable List": _list(placeables)},
+        TriggerList=_list(triggers),
+        WaypointList=_list([_placed(rng, 5, "wp", {}) for _ in range(count // 4)]),
+        SoundList=_list([]),
+        StoreList=_list([]),
+        Encounter=_list([]),
+    )
+    return GffRoot(structs=[], top_level_struct=top, file_type="GIT ")
+
+
+def _node(rng: random.Random, links: str, targets: int) -> GffStruct:
+    return _struct(
+        0,
+        Text=_locstring(rng, rng.randrange(5, 60)),
+        Speaker=GffField(T.GFF_STRING, ""),
+        Script=_resref(rng, "dlg"),
+        Sound=GffField(T.GFF_RESREF, ""),
+        Quest=GffField(T.GFF_STRING, ""),
+        Comment=GffField(T.GFF_STRING, _text(rng, 4)),
+        Animation=GffField(T.GFF_DWORD, 0),
+        AnimLoop=GffField(T.GFF_BYTE, 1),
+        Delay=GffField(T.GFF_DWORD, 0xFFFFFFFF),
+        **{links: _list([
+            _struct(
+                0,
+                Index=GffField(T.GFF_DWORD, rng.randrange(targets)),
+                Active=_resref(rng, "cond"),
+                IsChild=GffField(T.GFF_BYTE, rng.randrange(2)),
+            )
+            for _ in range(rng.randrange(1, 5))
+        ])},
+    )
+
+
+def make_dlg(rng: random.Random, scale: int = 1) -> GffRoot:
+    entries = 2000 * scale
+    replies = 3000 * scale
+    top = _struct(
+        TOP_LEVEL_ID,
+        DelayEntry=GffField(T.GFF_DWORD, 0),
+        DelayReply=GffField(T.GFF_DWORD, 0),
+        NumWords=GffField(T.GFF_DWORD, rng.randrange(10 ** 5)),
+        EndConversation=_resref(rng, "end"),
+        EndConverAbort=_resref(rng, "abort"),
+        PreventZoomIn=GffField(T.GFF_BYTE, 0),
+        EntryList=_list([_node(rng, "RepliesList", replies) for _ in range(entries)]),
+        ReplyList=_list([_node(rng, "EntriesList", entries) for _ in range(replies)]),
+        StartingList=_list([
+            _struct(0, Index=GffField(T.GFF_DWORD, i), Active=_resref(rng, "cond")) for i in range(20)
+        ]),
+    )
+    return GffRoot(structs=[], top_level_struct=top, file_type="DLG ")
+
+
+def make_database(rng: random.Random, rows: int) -> bytes:
+    """A campaign-style SQLite database image"""
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        with sqlite3.connect(path) as db:
+            db.execute("CREATE TABLE vars (name TEXT PRIMARY KEY, type INTEGER, value BLOB, expires INTEGER)")
+            db.executemany(
+                "INSERT INTO vars VALUES (?, ?, ?, ?)",
+                [(f"var_{i}", rng.randrange(4), _text(rng, 20).encode("ascii"), 0) for i in range(rows)]
+            )
+        db.close()
+        with open(path, "rb") as fp:
+            return fp.read()
+    finally:
+        os.remove(path)
+
+
+def make_sqlite(rng: random.Random, scale: int = 1) -> bytes:
+    gff = GffParser().write_gff_root(make_bic(rng, scale))
+    return SqliteHandler().embed_sqlite(gff, make_database(rng, 50000 * scale))
+
+
+GENERATORS: Dict[str, Callable[[random.Random, int], object]] = {
+    "bic": make_bic,
+    "git": make_git,
+    "dlg": make_dlg,
+    "sqlite": make_sqlite,
+}
+
+
+def generate(name: str, seed: int = 0, scale: int = 1) -> bytes:
+    """Binary GFF for a corpus entry; identical for identical arguments"""
+    result = GENERATORS[name](random.Random(f"{name}:{seed}"), scale)
+    if isinstance(result, GffRoot):
+        return GffParser().write_gff_root(result)
+    return result
+
+
+def generate_corpus(seed: int = 0, scale: int = 1, names: Optional[List[str]] = None) -> Dict[str, bytes]:
+    return {name: generate(name, seed, scale) for name in (names or GENERATORS)}
@@ -0,0 +1,205 @@
+"""Benchmark the parse, convert and write stages on the synthetic corpus.
+
+    python -m benchmarks.run                      # print results
+    python -m benchmarks.run --save base.json     # record a baseline
+    python -m benchmarks.run --compare base.json  # exit 1 on regressions
+
+Every stage is timed best-of --repeat with time.perf_counter. Peak memory
+of the whole gff -> json -> gff pipeline is measured in a separate
+tracemalloc pass so tracing does not distort the timings.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.services.gff_converter import GffConverter, sorted_labels
+from app.services.gff_diff import content_hash
+from app.services.gff_parser import GffParser
+from app.services.gff_schema import GffSchema
+from app.services.sqlite_handler import SqliteHandler
+from .corpus import GENERATORS, generate_corpus
+
+
+DEFAULT_REPEAT = 5
+DEFAULT_TOLERANCE = 0.25  # fraction slower (or larger) than the baseline that counts as a regression
+
+
+def best_time(fn: Callable[[], Any], repeat: int) -> Tuple[float, Any]:
+    """Fastest of repeat runs, and the result of the last one"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def peak_memory(fn: Callable[[], Any]) -> int:
+    """Peak bytes allocated by Python while fn runs"""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def iter_structs(struct):
+    """Every struct in a tree, depth first"""
+    stack = [struct]
+    while stack:
+        struct = stack.pop()
+        yield struct
+        for gff_field in struct.fields.values():
+            if gff_field.structval is not None:
+                stack.append(gff_field.structval)
+            elif gff_field.listval is not None:
+                stack.extend(gff_field.listval)
+
+
+def sort_labels(root) -> None:
+    """The label ordering work of a conversion, measured cold"""
+    sorted_labels.cache_clear()
+    for struct in iter_structs(root.top_level_struct):
+        sorted_labels(struct.id, tuple(struct.fields))
+
+
+def bench_document(name: str, data: bytes, repeat: int) -> Dict[str, Any]:
+    parser = GffParser()
+    converter = GffConverter()
+    sqlite_handler = SqliteHandler()
+
+    stages: Dict[str, Tuple[float, Any]] = {}
+    stages["read"] = best_time(lambda: parser.read_gff_root(data), repeat)
+    root = stages["read"][1]
+    stages["sort"] = best_time(lambda: sort_labels(root), repeat)
+    stages["convert"] = best_time(lambda: converter.to_json(root), repeat)
+    document = stages["convert"][1]
+    stages["serialize"] = best_time(
+        lambda: json.dumps(document, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), repeat
+    )
+    stages["stream"] = best_time(lambda: converter.to_json_bytes(root), repeat)
+    stages["msgpack"] = best_time(lambda: converter.to_msgpack(root), repeat)
+    stages["from_json"] = best_time(lambda: converter.gff_root_from_json(document), repeat)
+    stages["write"] = best_time(lambda: parser.write_gff_root(root), repeat)
+    stages["hash"] = best_time(lambda: content_hash(data), repeat)
+    # The same read and stream with codecs compiled from the document's own layouts
+    schema = GffSchema.learn(root.file_type, [root])
+    schemas = {schema.file_type: schema}
+    stages["read_schema"] = best_time(lambda: GffParser(schemas).read_gff_root(data), repeat)
+    stages["stream_schema"] = best_time(lambda: GffConverter(schemas).to_json_bytes(root), repeat)
+    if name == "sqlite":
+        stages["extract"] = best_time(lambda: sqlite_handler.extract_sqlite(data), repeat)
+        database = stages["extract"][1]
+        stages["embed"] = best_time(lambda: sqlite_handler.embed_sqlite(data, database), repeat)
+
+    fields = sum(len(struct.fields) for struct in iter_structs(root.top_level_struct))
+    size_mb = len(data) / (1024 * 1024)
+
+    def pipeline():
+        converted = converter.to_json_bytes(parser.read_gff_root(data))
+        parser.write_gff_root(converter.gff_root_from_json(json.loads(converted)))
+
+    return {
+        "bytes": len(data),
+        "fields": fields,
+        "peak_bytes": peak_memory(pipeline),
+        "stages": {
+            stage: {
+                "seconds": round(seconds, 6),
+                "mb_per_s": round(size_mb / seconds, 2) if seconds else None,
+                "fields_per_s": round(fields / seconds) if seconds else None,
+            }
+            for stage, (seconds, _) in stages.items()
+        },
+    }
+
+
+def run(seed: int = 0, scale: int = 1, repeat: int = DEFAULT_REPEAT, names: Optional[List[str]] = None) -> Dict[str, Any]:
+    corpus = generate_corpus(seed, scale, names)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": seed,
+            "scale": scale,
+            "repeat": repeat,
+        },
+        "results": {name: bench_document(name, data, repeat) for name, data in corpus.items()},
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """Descriptions of every stage time or peak memory worse than baseline by more than tolerance"""
+    regressions = []
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        if base["bytes"] != result["bytes"]:
+            regressions.append(f"{name}: corpus differs from baseline ({result['bytes']} vs {base['bytes']} bytes)")
+            continue
+        for stage, timing in result["stages"].items():
+            base_timing = base["stages"].get(stage)
+            if base_timing and timing["seconds"] > base_timing["seconds"] * (1 + tolerance):
+                regressions.append(
+                    f"{name}/{stage}: {timing['seconds'] * 1000:.1f}ms vs {base_timing['seconds'] * 1000:.1f}ms"
+                )
+        if result["peak_bytes"] > base["peak_bytes"] * (1 + tolerance):
+            regressions.append(f"{name}/peak memory: {result['peak_bytes']} vs {base['peak_bytes']} bytes")
+    return regressions
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = []
+    for name, result in report["results"].items():
+        lines.append(
+            f"{name}: {result['bytes'] / 1024:.0f}KB, {result['fields']} fields, "
+            f"peak {result['peak_bytes'] / (1024 * 1024):.1f}MB"
+        )
+        for stage, timing in result["stages"].items():
+            lines.append(
+                f"  {stage:<13} {timing['seconds'] * 1000:9.2f}ms {timing['mb_per_s'] or 0:9.1f}MB/s "
+                f"{timing['fields_per_s'] or 0:>12,} fields/s"
+            )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scale", type=int, default=1, help="Multiplier for list sizes")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Runs per stage; the best is kept")
+    parser.add_argument("--only", action="append", choices=sorted(GENERATORS), help="Corpus entries to run")
+    parser.add_argument("--save", metavar="PATH", help="Write results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="Fail if results regress against a baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    report = run(args.seed, args.scale, args.repeat, args.only)
+    print(format_report(report))
+
+    if args.save:
+        with open(args.save, "w") as fp:
+            json.dump(report, fp, indent=2)
+        print(f"Baseline written to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as fp:
+            regressions = compare(json.load(fp), report, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print("No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""Hand-packed GFF V3.2 samples shared by the test suite"""
+import struct
+
+
+def pack_gff(file_type, structs, fields, labels, field_data=b"", field_indices=(), list_indices=()):
+    """Lay out raw GFF sections behind a 56-byte header.
+
+    structs are (id, data_or_offset, field_count) tuples and fields are
+    (type, label_index, data) tuples where data is the raw 4-byte slot.
+    """
+    struct_table = b"".join(struct.pack("<III", *s) for s in structs)
+    field_table = b"".join(struct.pack("<II", t, l) + d for t, l, d in fields)
+    label_table = b"".join(label.encode().ljust(16, b"\0") for label in labels)
+    field_index_table = struct.pack(f"<{len(field_indices)}I", *field_indices)
+    list_index_table = struct.pack(f"<{len(list_indices)}I", *list_indices)
+
+    sections = [struct_table, field_table, label_table, field_data, field_index_table, list_index_table]
+    counts = [len(structs), len(fields), len(labels), len(field_data), len(field_index_table), len(list_index_table)]
+    header = [file_type, b"V3.2"]
+    offset = 56
+    for section, count in zip(sections, counts):
+        header += [offset, count]
+        offset += len(section)
+    return struct.pack("<4s4s12I", *header) + b"".join(sections)
+
+
+def u32(value):
+    return struct.pack("<I", value)
+
+
+def simple_gff():
+    """Top-level struct with a CExoString "Test" and an INT "Version"""
+    return pack_gff(
+        b"GFF ",
+        structs=[(0xFFFFFFFF, 0, 2)],
+        fields=[(10, 0, u32(0)), (5, 1, u32(1))],
+        labels=["Test", "Version"],
+        field_data=u32(11) + b"Hello World",
+        field_indices=[0, 1],
+    )
+
+
+def creature_gff():
+    """A .utc-like file exercising every field type"""
+    field_data = b"".join([
+        u32(9) + b"nw_goblin",                                            # 0: Tag
+        struct.pack("<III", 22, 12345, 1) + struct.pack("<iI", 0, 6) + b"Goblin",  # 13: FirstName
+        struct.pack("<q", -5),                                            # 39: Experience
+        struct.pack("<d", 1.5),                                           # 47: ChallengeRating
+        bytes([6]) + b"nw_gob",                                           # 55: TemplateResRef
+        u32(3) + b"\x00\x01\x02",                                         # 62: Blob
+        struct.pack("<Q", 2 ** 40),                                       # 69: Big
+    ])
+    labels = [
+        "Tag", "Gold", "Str", "FirstName", "Experience", "ChallengeRating", "TemplateResRef",
+        "Blob", "ClassList", "Lawfulness", "Facing", "Info", "Class", "Big", "Subrace", "Wide",
+    ]
+    fields = [
+        (10, 0, u32(0)),
+        (4, 1, u32(150)),
+        (0, 2, u32(14)),
+        (12, 3, u32(13)),
+        (7, 4, u32(39)),
+        (9, 5, u32(47)),
+        (11, 6, u32(55)),
+        (13, 7, u32(62)),
+        (15, 8, u32(0)),
+        (3, 9, struct.pack("<hxx", -3)),
+        (8, 10, struct.pack("<f", 0.5)),
+        (14, 11, u32(3)),
+        (5, 12, u32(4)),
+        (5, 12, u32(7)),
+        (6, 13, u32(69)),
+        (1, 14, struct.pack("<bxxx", -2)),
+        (2, 15, struct.pack("<Hxx", 65535)),
+    ]
+    top_level = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 14, 15, 16]
+    return pack_gff(
+        b"UTC ",
+        structs=[(0xFFFFFFFF, 0, len(top_level)), (2, 12, 1), (2, 13, 1), (5, 0, 0)],
+        fields=fields,
+        labels=labels,
+        field_data=field_data,
+        field_indices=top_level,
+        list_indices=[2, 1, 2],
+    )
+
+
+def pack_erf(resources, file_type=b"MOD "):
+    """Build a V1.0 ERF from (resref, resource type id, payload) tuples"""
+    count = len(resources)
+    key_offset = 160
+    resource_offset = key_offset + 24 * count
+    data_offset = resource_offset + 8 * count
+    keys = b""
+    ranges = b""
+    payloads = b""
+    for res_id, (resref, res_type, payload) in enumerate(resources):
+        keys += struct.pack("<16sIHH", resref.encode(), res_id, res_type, 0)
+        ranges += struct.pack("<II", data_offset + len(payloads), len(payload))
+        payloads += payload
+    header = struct.pack("<4s4s9I", file_type, b"V1.0", 0, 0, count, 160, key_offset, resource_offset, 125, 10, 0)
+    return header.ljust(160, b"\0") + keys + ranges + payloads
+
+
+def module_erf():
+    """A .mod holding two GFF resources and one script"""
+    return pack_erf([
+        ("goblin", 2027, creature_gff()),
+        ("module", 2014, simple_gff()),
+        ("nw_s0_fireball", 2010, b"NCS V1.0"),
+    ])
+
+
+def pack_tlk(strings, language_id=0):
+    """Build a V3.0 talk table from {StrRef index: text}; missing indices have no text"""
+    count = max(strings, default=-1) + 1
+    entries_offset = 20 + 40 * count
+    entries = b""
+    data = b""
+    for index in range(count):
+        text = strings.get(index)
+        if text is None:
+            entries += struct.pack("<I16sIIIIf", 0, b"", 0, 0, 0, 0, 0.0)
+            continue
+        encoded = text.encode("cp1252")
+        entries += struct.pack("<I16sIIIIf", 0x1, b"vs_goblin", 0, 0, len(data), len(encoded), 0.0)
+        data += encoded
+    return struct.pack("<4s4sIII", b"TLK ", b"V3.0", language_id, count, entries_offset) + entries + data
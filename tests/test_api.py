@@ -1,7 +1,20 @@
 """API endpoint tests"""
+import io
+import json
+import sqlite3
+import struct
+import zipfile
+
 import pytest
 from fastapi.testclient import TestClient
+from app.api import endpoints
 from app.main import app
+from app.services.field_index import FieldIndex
+from app.services.gff_converter import GffConverter
+from app.services.msgpack_codec import unpackb
+from app.services.result_cache import ConversionCache
+from app.services.tlk_reader import TlkFile, TlkResolver
+from tests.gff_samples import creature_gff, module_erf, pack_gff, pack_tlk, simple_gff, u32
 
 
 client = TestClient(app)
@@ -67,20 +80,56 @@ def test_sqlite_extract_invalid_format():
 
 
 def test_gff_to_json_valid_gff():
-    """Test GFF to JSON conversion with valid GFF-like content"""
-    # Create a simple GFF-like content for testing
-    gff_content = b"GFF V1.0\nTest: Hello World\nVersion: 1\n"
+    """Test GFF to JSON conversion with a valid GFF file"""
+    response = client.post(
+        "/api/v1/convert/gff-to-json",
+        files={"file": ("test.gff", simple_gff(), "application/octet-stream")}
+    )
     
+    assert response.status_code == 200
+    data = response.json()
+    assert data["Test"] == "Hello World"
+    assert data["Version"] == 1
+
+
+def test_gff_to_json_nested():
+    """Test GFF to JSON conversion of lists, structs and localized strings"""
     response = client.post(
         "/api/v1/convert/gff-to-json",
-        files={"file": ("test.gff", gff_content, "application/octet-stream")}
+        files={"file": ("test.utc", creature_gff(), "application/octet-stream")}
     )
     
-    # Should succeed with stub implementation
     assert response.status_code == 200
     data = response.json()
-    assert "Test" in data
-    assert "Version" in data
+    assert data["ClassList"] == [{"Class": 4}, {"Class": 7}]
+    assert data["FirstName"] == {"id": 12345, "0": "Goblin"}
+    assert data["Info"] == {}
+    assert list(data) == sorted(data, key=str.lower)
+
+
+def test_gff_to_json_invalid_gff():
+    """Test GFF to JSON conversion with content that is not a GFF"""
+    response = client.post(
+        "/api/v1/convert/gff-to-json",
+        files={"file": ("test.gff", b"GFF V1.0\nTest: Hello World\n", "application/octet-stream")}
+    )
+    
+    assert response.status_code == 400
+    assert "Failed to parse GFF file" in response.json()["detail"]
+
+
+@pytest.mark.parametrize("params, headers", [({}, {}), ({"stream": "true"}, {}), ({}, {"Accept": "application/msgpack"})])
+def test_gff_to_json_self_referencing_struct(params, headers):
+    """Test that a struct pointing back at the top level is a 400 on every response path"""
+    data = pack_gff(b"UTC ", structs=[(0xFFFFFFFF, 0, 1)], fields=[(14, 0, u32(0))], labels=["Child"])
+    response = client.post(
+        "/api/v1/convert/gff-to-json",
+        params=params,
+        headers=headers,
+        files={"file": ("loop.utc", data, "application/octet-stream")}
+    )
+    assert response.status_code == 400
+    assert "referenced more than once" in response.json()["detail"]
 
 
 def test_json_to_gff_valid_json():
@@ -95,4 +144,521 @@ def test_json_to_gff_valid_json():
     # Should succeed and return binary data
     assert response.status_code == 200
     assert response.headers["content-type"] == "application/octet-stream"
-    assert "converted.gff" in response.headers["content-disposition"]
\ No newline at end of file
+    assert "converted.gff" in response.headers["content-disposition"]
+    
+    # The output should be a real GFF that converts back to the same JSON
+    response = client.post(
+        "/api/v1/convert/gff-to-json",
+        files={"file": ("converted.gff", response.content, "application/octet-stream")}
+    )
+    assert response.status_code == 200
+    assert response.json() == {"Test": "Hello World", "Version": 1}
+
+def test_query_path():
+    """Test reading a single value by path"""
+    response = client.post(
+        "/api/v1/query",
+        params={"path": "ClassList/0/Class"},
+        files={"file": ("test.utc", creature_gff(), "application/octet-stream")}
+    )
+    
+    assert response.status_code == 200
+    assert response.json() == {"path": "ClassList/0/Class", "type": "GFF_INT", "value": 4}
+
+
+def test_query_missing_path():
+    """Test querying a path that does not exist"""
+    response = client.post(
+        "/api/v1/query",
+        params={"path": "ClassList/9"},
+        files={"file": ("test.utc", creature_gff(), "application/octet-stream")}
+    )
+    
+    assert response.status_code == 404
+
+
+def test_patch():
+    """Test patching a field in place and the error responses"""
+    operations = json.dumps([{"path": "Gold", "value": 5000}, {"path": "ClassList/0/Class", "value": 2}])
+    response = client.post(
+        "/api/v1/patch",
+        files={"file": ("goblin.utc", creature_gff(), "application/octet-stream")},
+        data={"operations": operations}
+    )
+    assert response.status_code == 200
+    assert 'filename="goblin.utc"' in response.headers["content-disposition"]
+    assert response.headers["x-patched-in-place"] == "2"
+    assert len(response.content) == len(creature_gff())
+    
+    response = client.post(
+        "/api/v1/convert/gff-to-json",
+        files={"file": ("goblin.utc", response.content, "application/octet-stream")}
+    )
+    assert response.json()["Gold"] == 5000
+    assert response.json()["ClassList"][0] == {"Class": 2}
+    
+    for operations, status in (("[{", 400), ('[{"path": "Gold", "value": -1}]', 400), ('[{"path": "Nope", "value": 1}]', 404)):
+        response = client.post(
+            "/api/v1/patch",
+            files={"file": ("goblin.utc", creature_gff(), "application/octet-stream")},
+            data={"operations": operations}
+        )
+        assert response.status_code == status
+
+
+def test_diff():
+    """Test diffing a file against a patched copy of itself"""
+    patched = client.post(
+        "/api/v1/patch",
+        files={"file": ("goblin.utc", creature_gff(), "application/octet-stream")},
+        data={"operations": json.dumps([{"path": "Gold", "value": 7}])}
+    ).content
+    
+    response = client.post(
+        "/api/v1/diff",
+        files={
+            "old_file": ("old.utc", creature_gff(), "application/octet-stream"),
+            "new_file": ("new.utc", patched, "application/octet-stream")
+        }
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["equal"] is False
+    assert data["changes"] == [{
+        "path": "Gold",
+        "change": "changed",
+        "old": {"type": "GFF_DWORD", "value": 150},
+        "new": {"type": "GFF_DWORD", "value": 7}
+    }]
+    
+    response = client.post(
+        "/api/v1/diff",
+        files={
+            "old_file": ("old.utc", creature_gff(), "application/octet-stream"),
+            "new_file": ("new.utc", b"not a gff", "application/octet-stream")
+        }
+    )
+    assert response.status_code == 400
+
+
+def test_field_index(monkeypatch, tmp_path):
+    """Test refreshing and searching the field index"""
+    assert client.get("/api/v1/index/search?value=x").status_code == 404
+    
+    vault = tmp_path / "vault"
+    vault.mkdir()
+    (vault / "goblin.utc").write_bytes(creature_gff())
+    monkeypatch.setattr(endpoints, "field_index", FieldIndex(str(tmp_path / "index.sqlite")))
+    monkeypatch.setattr(endpoints.config, "INDEX_SOURCES", [str(vault)])
+    monkeypatch.setattr(endpoints.config, "ADMIN_TOKEN", "secret")
+    
+    assert client.post("/api/v1/index/refresh").status_code == 403
+    response = client.post("/api/v1/index/refresh", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    assert response.json()["sources"][str(vault)]["indexed"] == 1
+    
+    response = client.get("/api/v1/index/search", params={"label": "TemplateResRef", "value": "NW_GOB"})
+    assert response.status_code == 200
+    assert response.json()["results"] == [{
+        "source": str(vault),
+        "file": "goblin.utc",
+        "file_type": "UTC",
+        "path": "TemplateResRef",
+        "label": "TemplateResRef",
+        "type": "GFF_RESREF",
+        "value": "nw_gob"
+    }]
+    assert client.get("/api/v1/index/search").status_code == 400
+    assert client.get("/api/v1/index/stats").json()["files"] == 1
+
+
+def test_gff_to_json_stream():
+    """Test that streamed output matches the buffered response"""
+    files = {"file": ("test.utc", creature_gff(), "application/octet-stream")}
+    buffered = client.post("/api/v1/convert/gff-to-json", files=files)
+    streamed = client.post("/api/v1/convert/gff-to-json", params={"stream": "true"}, files=files)
+    
+    assert streamed.status_code == 200
+    assert streamed.headers["content-type"] == "application/json"
+    assert streamed.content == buffered.content
+    
+    # A malformed nested field is reported before the stream starts
+    data = bytearray(creature_gff())
+    struct.pack_into("<I", data, struct.unpack_from("<I", data, 16)[0] + 12 * 12, 99)
+    files = {"file": ("test.utc", bytes(data), "application/octet-stream")}
+    streamed = client.post("/api/v1/convert/gff-to-json", params={"stream": "true"}, files=files)
+    assert streamed.status_code == 400
+
+
+def test_convert_batch_ndjson():
+    """Test batch conversion with per-file errors"""
+    response = client.post(
+        "/api/v1/convert/batch",
+        files=[
+            ("files", ("a.utc", creature_gff(), "application/octet-stream")),
+            ("files", ("b.gff", simple_gff(), "application/octet-stream")),
+            ("files", ("c.gff", b"not a gff", "application/octet-stream")),
+            ("files", ("d.txt", b"text", "text/plain")),
+        ]
+    )
+    
+    assert response.status_code == 200
+    results = {r["name"]: r for r in map(json.loads, response.text.splitlines())}
+    assert results["a.utc"]["data"]["ClassList"] == [{"Class": 4}, {"Class": 7}]
+    assert results["b.gff"]["data"] == {"Test": "Hello World", "Version": 1}
+    assert results["c.gff"]["status"] == "error"
+    assert results["d.txt"]["status"] == "error"
+
+
+def test_convert_batch_zip():
+    """Test batch conversion of a zip archive into a zip of JSON files"""
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("vault/a.bic", creature_gff())
+        zf.writestr("../b.gff", simple_gff())
+    
+    response = client.post(
+        "/api/v1/convert/batch",
+        params={"format": "zip"},
+        files=[("files", ("vault.zip", archive.getvalue(), "application/zip"))]
+    )
+    
+    assert response.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(response.content)) as zf:
+        assert sorted(zf.namelist()) == ["b.gff.json", "errors.json", "vault/a.bic.json"]
+        assert json.loads(zf.read("b.gff.json")) == {"Test": "Hello World", "Version": 1}
+        assert json.loads(zf.read("errors.json")) == []
+
+
+def test_busy_pool_returns_503(monkeypatch):
+    """Test that a saturated worker pool sheds load while health stays up"""
+    monkeypatch.setattr(endpoints.worker_pool, "max_pending", 0)
+    monkeypatch.setattr(endpoints, "result_cache", ConversionCache(1024 * 1024))
+    response = client.post(
+        "/api/v1/convert/gff-to-json",
+        files={"file": ("test.gff", simple_gff(), "application/octet-stream")}
+    )
+    
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert client.get("/api/v1/health").status_code == 200
+    
+    monkeypatch.setattr(endpoints.batch_pool, "max_pending", 0)
+    response = client.post(
+        "/api/v1/convert/batch",
+        files=[("files", ("test.gff", simple_gff(), "application/octet-stream"))]
+    )
+    assert response.status_code == 503
+
+
+def test_erf_list_and_extract():
+    """Test listing and extracting module resources"""
+    files = {"file": ("test.mod", module_erf(), "application/octet-stream")}
+    response = client.post("/api/v1/erf/list", files=files)
+    assert response.status_code == 200
+    assert [r["name"] for r in response.json()["resources"]] == ["goblin.utc", "module.ifo", "nw_s0_fireball.ncs"]
+    
+    response = client.post("/api/v1/erf/extract", params={"name": "goblin.utc"}, files=files)
+    assert response.status_code == 200
+    assert response.content == creature_gff()
+    
+    response = client.post("/api/v1/erf/extract", params={"name": "missing.utc"}, files=files)
+    assert response.status_code == 404
+
+
+def test_erf_convert():
+    """Test converting every GFF resource in a module"""
+    response = client.post(
+        "/api/v1/erf/convert",
+        files={"file": ("test.mod", module_erf(), "application/octet-stream")}
+    )
+    
+    assert response.status_code == 200
+    results = {r["name"]: r for r in map(json.loads, response.text.splitlines())}
+    assert set(results) == {"goblin.utc", "module.ifo"}
+    assert results["module.ifo"]["data"] == {"Test": "Hello World", "Version": 1}
+
+
+def test_msgpack_round_trip(monkeypatch):
+    """Test Accept: application/msgpack on gff-to-json and msgpack uploads to json-to-gff"""
+    monkeypatch.setattr(endpoints, "result_cache", ConversionCache(1024 * 1024))
+    files = {"file": ("test.utc", creature_gff(), "application/octet-stream")}
+    
+    response = client.post("/api/v1/convert/gff-to-json", files=files, headers={"Accept": "application/msgpack"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/msgpack"
+    assert response.headers["vary"] == "Accept"
+    data = unpackb(response.content)
+    
+    as_json = client.post("/api/v1/convert/gff-to-json", files=files)
+    assert as_json.headers["x-cache"] == "MISS"
+    assert as_json.headers["etag"] != response.headers["etag"]
+    # VOID fields are bin rather than latin-1 strings
+    assert data["Blob"] == b"\x00\x01\x02"
+    assert dict(data, Blob=data["Blob"].decode("latin-1")) == as_json.json()
+    
+    response = client.post(
+        "/api/v1/convert/json-to-gff",
+        files={"file": ("test.msgpack", response.content, "application/octet-stream")}
+    )
+    assert response.status_code == 200
+    response = client.post(
+        "/api/v1/convert/gff-to-json",
+        files={"file": ("converted.gff", response.content, "application/octet-stream")},
+        headers={"Accept": "application/msgpack"}
+    )
+    assert unpackb(response.content)["Blob"] == b"\x00\x01\x02"
+    
+    response = client.post(
+        "/api/v1/convert/json-to-gff",
+        files={"file": ("test.msgpack", b"\x82\xa1a\x01\xa1a\x02", "application/octet-stream")}
+    )
+    assert response.status_code == 400
+    assert "Duplicate key" in response.json()["detail"]
+    
+    response = client.post(
+        "/api/v1/convert/json-to-gff",
+        files={"file": ("test.bin", b"\x92\x01", "application/msgpack")}
+    )
+    assert response.status_code == 400
+    assert "Invalid MessagePack" in response.json()["detail"]
+
+
+def test_conversion_cache_and_etag(monkeypatch):
+    """Test cache hits, If-None-Match and fetching results by ETag"""
+    monkeypatch.setattr(endpoints, "result_cache", ConversionCache(1024 * 1024))
+    files = {"file": ("test.utc", creature_gff(), "application/octet-stream")}
+    
+    first = client.post("/api/v1/convert/gff-to-json", files=files)
+    assert first.headers["x-cache"] == "MISS"
+    etag = first.headers["etag"]
+    
+    second = client.post("/api/v1/convert/gff-to-json", files=files)
+    assert second.headers["x-cache"] == "HIT"
+    assert second.content == first.content
+    
+    response = client.post("/api/v1/convert/gff-to-json", files=files, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    
+    response = client.get(f"/api/v1/convert/result/{etag.strip(chr(34))}")
+    assert response.status_code == 200
+    assert response.content == first.content
+    assert client.get("/api/v1/convert/result/" + "0" * 32).status_code == 404
+    
+    stats = client.get("/api/v1/cache/stats").json()
+    assert stats["memory"]["hits"] == 2
+    assert stats["memory"]["entries"] == 1
+
+
+def test_upload_too_large(monkeypatch):
+    """Test that oversized uploads are rejected with 413"""
+    monkeypatch.setitem(endpoints.MAX_UPLOAD_SIZES, "gff", 1024)
+    
+    # Declared body far over the limit: refused before the body is read
+    response = client.post(
+        "/api/v1/convert/gff-to-json",
+        files={"file": ("test.utc", b"\0" * (256 * 1024), "application/octet-stream")}
+    )
+    assert response.status_code == 413
+    assert response.json()["detail"] == "File too large (max 1KB)"
+    
+    # Just over the limit: refused once the upload has been measured
+    response = client.post(
+        "/api/v1/convert/gff-to-json",
+        files={"file": ("test.utc", b"\0" * 2048, "application/octet-stream")}
+    )
+    assert response.status_code == 413
+
+
+def test_mapped_upload(monkeypatch):
+    """Test that uploads over the spill threshold are converted from an mmap"""
+    files = {"file": ("test.utc", creature_gff(), "application/octet-stream")}
+    buffered = client.post("/api/v1/convert/gff-to-json", params={"stream": "true"}, files=files)
+    
+    monkeypatch.setattr(endpoints.config, "UPLOAD_SPILL_BYTES", 0)
+    monkeypatch.setattr(endpoints, "result_cache", ConversionCache(1024 * 1024))
+    streamed = client.post("/api/v1/convert/gff-to-json", params={"stream": "true"}, files=files)
+    assert streamed.status_code == 200
+    assert streamed.content == buffered.content
+    
+    response = client.post(
+        "/api/v1/query",
+        params={"path": "ClassList/1/Class"},
+        files=files
+    )
+    assert response.json()["value"] == 7
+
+
+@pytest.mark.parametrize("document", [
+    b'{"ThisLabelIsLongerThan16": 1}',
+    b'{"a": 99999999999999999999999}',
+    b'{"a": 1e300}',
+])
+@pytest.mark.parametrize("stream_bytes", [1 << 20, 0])
+def test_json_to_gff_unstorable_document(monkeypatch, document, stream_bytes):
+    """Test that labels and values a GFF cannot hold are a 400 on the buffered and streamed paths alike"""
+    monkeypatch.setattr(endpoints.config, "JSON_STREAM_BYTES", stream_bytes)
+    response = client.post(
+        "/api/v1/convert/json-to-gff",
+        files={"file": ("test.json", document, "application/json")}
+    )
+    assert response.status_code == 400
+    assert "Conversion failed" in response.json()["detail"]
+
+
+def test_streamed_json_to_gff(monkeypatch):
+    """Test that JSON over the stream threshold converts to the same GFF"""
+    document = json.dumps({"Tag": "goblin", "Items": [{"Id": 1}, {"Id": 2}], "Pos": {"X": 1.5}}).encode("utf-8")
+    files = {"file": ("test.json", document, "application/json")}
+    buffered = client.post("/api/v1/convert/json-to-gff", files=files)
+    
+    monkeypatch.setattr(endpoints.config, "JSON_STREAM_BYTES", 0)
+    monkeypatch.setattr(endpoints, "result_cache", ConversionCache(1024 * 1024))
+    streamed = client.post("/api/v1/convert/json-to-gff", files=files)
+    assert streamed.status_code == 200
+    assert streamed.content == buffered.content
+    
+    response = client.post(
+        "/api/v1/convert/json-to-gff",
+        files={"file": ("test.json", b'{"Tag": "goblin",}', "application/json")}
+    )
+    assert response.status_code == 400
+    assert "Invalid JSON format" in response.json()["detail"]
+
+
+def test_sqlite_embed_and_extract():
+    """Test embedding a database and extracting it again"""
+    database = b"SQLite format 3\0" + bytes(range(256)) * 64
+    response = client.post(
+        "/api/v1/convert/sqlite-embed",
+        files={
+            "gff_file": ("test.utc", creature_gff(), "application/octet-stream"),
+            "sqlite_file": ("data.db", database, "application/octet-stream")
+        }
+    )
+    assert response.status_code == 200
+    
+    response = client.post(
+        "/api/v1/convert/sqlite-extract",
+        files={"file": ("embedded.utc", response.content, "application/octet-stream")}
+    )
+    assert response.status_code == 200
+    assert response.content == database
+    
+    response = client.post(
+        "/api/v1/convert/sqlite-extract",
+        files={"file": ("test.utc", creature_gff(), "application/octet-stream")}
+    )
+    assert response.status_code == 400
+
+
+def test_sqlite_query(monkeypatch):
+    """Test querying an embedded database and reusing the decompressed copy"""
+    monkeypatch.setattr(endpoints, "sqlite_cache", endpoints.LruCache(1024 * 1024))
+    source = sqlite3.connect(":memory:")
+    source.execute("CREATE TABLE vars (name TEXT, value INTEGER)")
+    source.executemany("INSERT INTO vars VALUES (?, ?)", [("gold", 150), ("xp", 20)])
+    source.commit()
+    embedded = endpoints.sqlite_handler.embed_sqlite(creature_gff(), source.serialize())
+    files = {"file": ("test.bic", embedded, "application/octet-stream")}
+    
+    response = client.post(
+        "/api/v1/sqlite/query",
+        data={"sql": "SELECT * FROM vars WHERE value > ? ORDER BY name", "params": "[10]"},
+        files=files
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.headers["x-cache"] == "MISS"
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        {"name": "gold", "value": 150},
+        {"name": "xp", "value": 20},
+    ]
+    
+    response = client.post("/api/v1/sqlite/query", data={"sql": "SELECT COUNT(*) AS n FROM vars"}, files=files)
+    assert response.headers["x-cache"] == "HIT"
+    assert response.json() == {"n": 2}
+    
+    response = client.post("/api/v1/sqlite/query", data={"sql": "DROP TABLE vars"}, files=files)
+    assert response.status_code == 400
+    
+    # Databases over the per-entry limit are queried but never cached
+    monkeypatch.setattr(endpoints, "sqlite_cache", endpoints.LruCache(1024 * 1024))
+    monkeypatch.setattr(endpoints.config, "SQLITE_CACHE_MAX_ENTRY_BYTES", len(source.serialize()) - 1)
+    for _ in range(2):
+        response = client.post("/api/v1/sqlite/query", data={"sql": "SELECT COUNT(*) AS n FROM vars"}, files=files)
+        assert response.headers["x-cache"] == "MISS"
+        assert response.json() == {"n": 2}
+    assert endpoints.sqlite_cache.current_bytes == 0
+
+
+def test_server_timing_and_metrics(monkeypatch):
+    """Test per-request stage timings and the Prometheus endpoint"""
+    monkeypatch.setattr(endpoints, "result_cache", ConversionCache(1024 * 1024))
+    response = client.post(
+        "/api/v1/convert/gff-to-json",
+        files={"file": ("test.utc", creature_gff(), "application/octet-stream")}
+    )
+    stages = [entry.split(";")[0] for entry in response.headers["server-timing"].split(", ")]
+    assert {"read", "parse", "convert", "total"} <= set(stages)
+    
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'nwn_gff_stage_seconds_count{stage="parse"}' in response.text
+    assert 'nwn_gff_requests_total{method="POST",endpoint="gff_to_json",status="200"}' in response.text
+    assert "nwn_gff_worker_pending 0" in response.text
+
+
+def test_request_profiling(monkeypatch):
+    """Test admin-gated profiling and fetching the stored profile"""
+    monkeypatch.setattr(endpoints, "result_cache", ConversionCache(1024 * 1024))
+    files = {"file": ("test.utc", creature_gff(), "application/octet-stream")}
+    
+    # Disabled without an admin token: the header is ignored and the debug API is hidden
+    monkeypatch.setattr(endpoints.config, "ADMIN_TOKEN", None)
+    response = client.post("/api/v1/convert/gff-to-json", files=files, headers={"X-Profile": "cpu"})
+    assert response.status_code == 200
+    assert "x-profile-id" not in response.headers
+    assert client.get("/api/v1/debug/profiles").status_code == 404
+    
+    monkeypatch.setattr(endpoints.config, "ADMIN_TOKEN", "secret")
+    response = client.post("/api/v1/convert/gff-to-json", files=files, headers={"X-Profile": "cpu"})
+    assert response.status_code == 403
+    
+    headers = {"X-Profile": "cpu,memory", "X-Admin-Token": "secret"}
+    monkeypatch.setattr(endpoints, "result_cache", ConversionCache(1024 * 1024))
+    response = client.post("/api/v1/convert/gff-to-json", files=files, headers=headers)
+    assert response.status_code == 200
+    profile_id = response.headers["x-profile-id"]
+    
+    admin = {"X-Admin-Token": "secret"}
+    summary = client.get(f"/api/v1/debug/profiles/{profile_id}", params={"format": "json"}, headers=admin).json()
+    assert summary["stages"] == ["parse", "convert"]
+    assert summary["status"] == 200
+    text = client.get(f"/api/v1/debug/profiles/{profile_id}", headers=admin).text
+    assert "read_gff_root" in text
+    collapsed = client.get(f"/api/v1/debug/profiles/{profile_id}", params={"format": "collapsed"}, headers=admin)
+    assert "read_gff_root" in collapsed.text
+    memory = client.get(f"/api/v1/debug/profiles/{profile_id}", params={"format": "memory"}, headers=admin)
+    assert memory.text.startswith("Peak traced memory")
+    assert client.get("/api/v1/debug/profiles/unknown", headers=admin).status_code == 404
+
+
+def test_gff_to_json_resolve_tlk(monkeypatch):
+    """Test that resolve_tlk inlines talk table text, and is refused when no talk table is set"""
+    files = {"file": ("test.utc", creature_gff(), "application/octet-stream")}
+    monkeypatch.setattr(endpoints, "tlk_converter", None)
+    response = client.post("/api/v1/convert/gff-to-json", params={"resolve_tlk": "true"}, files=files)
+    assert response.status_code == 404
+    
+    monkeypatch.setattr(endpoints, "result_cache", ConversionCache(1024 * 1024))
+    resolver = TlkResolver(TlkFile(pack_tlk({12345: "Goblin"})))
+    monkeypatch.setattr(endpoints, "tlk_converter", GffConverter(tlk=resolver))
+    response = client.post("/api/v1/convert/gff-to-json", params={"resolve_tlk": "true"}, files=files)
+    assert response.status_code == 200
+    assert response.json()["FirstName"] == {"0": "Goblin", "id": 12345, "tlk": "Goblin"}
+    
+    plain = client.post("/api/v1/convert/gff-to-json", files=files)
+    assert "tlk" not in plain.json()["FirstName"]
+    assert plain.headers["etag"] != response.headers["etag"]
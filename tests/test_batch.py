@@ -0,0 +1,76 @@
+"""Batch conversion tests"""
+import asyncio
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+from app.services.batch import BatchBudget, BatchError, convert_many, iter_archive
+from app.services.worker_pool import WorkerPool
+from tests.gff_samples import creature_gff, simple_gff
+
+
+def zip_of(members):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, data in members:
+            zf.writestr(name, data)
+    return archive.getvalue()
+
+
+def test_iter_archive_budget():
+    """Test that oversized members are rejected alone and an exhausted budget stops the batch"""
+    data = zip_of([("a.gff", simple_gff()), ("bomb.gff", bytes(1024 * 1024)), ("notes.txt", b"x")])
+    members = list(iter_archive("vault.zip", data, BatchBudget(64 * 1024, 1024 * 1024)))
+    assert members[0] == ("a.gff", simple_gff(), None)
+    assert members[1][0] == "bomb.gff" and members[1][1] is None and "too large" in members[1][2]
+    assert members[2] == ("notes.txt", None, "Invalid file format. Expected GFF file")
+
+    members = iter_archive("vault.zip", zip_of([(f"{name}.gff", simple_gff()) for name in "abc"]), BatchBudget(1024, 2 * len(simple_gff())))
+    assert next(members)[1] == simple_gff()
+    assert next(members)[1] == simple_gff()
+    with pytest.raises(BatchError, match="expands past"):
+        next(members)
+
+
+def test_iter_archive_tar():
+    """Test that tar members are read the same way"""
+    archive = io.BytesIO()
+    with tarfile.open(fileobj=archive, mode="w:gz") as tf:
+        info = tarfile.TarInfo("vault/a.bic")
+        info.size = len(creature_gff())
+        tf.addfile(info, io.BytesIO(creature_gff()))
+    assert list(iter_archive("vault.tgz", archive.getvalue(), BatchBudget(1 << 20, 1 << 20))) == [
+        ("vault/a.bic", creature_gff(), None)
+    ]
+    with pytest.raises(BatchError, match="Unreadable archive"):
+        list(iter_archive("vault.tgz", b"not an archive", BatchBudget(1 << 20, 1 << 20)))
+
+
+@pytest.mark.parametrize("kind", ["thread", "process"])
+def test_convert_many_uses_worker_pool(kind):
+    """Test that conversions run as pool stages and pool refusals become per-file errors"""
+    async def inputs():
+        yield "a.gff", simple_gff(), None
+        yield "b.txt", None, "Invalid file format. Expected GFF file"
+        yield "c.gff", b"not a gff", None
+
+    async def collect(pool):
+        return {name: (ok, payload) async for name, ok, payload in convert_many(pool, inputs())}
+
+    pool = WorkerPool(kind, max_workers=2, max_pending=4)
+    try:
+        results = asyncio.run(collect(pool))
+    finally:
+        pool.shutdown()
+    assert results["a.gff"] == (True, b'{"Test":"Hello World","Version":1}')
+    assert results["b.txt"][0] is False
+    assert results["c.gff"][0] is False
+
+    pool = WorkerPool(kind, max_workers=1, max_pending=0)
+    try:
+        results = asyncio.run(collect(pool))
+    finally:
+        pool.shutdown()
+    assert results["a.gff"] == (False, b"Server busy, convert queue is full")
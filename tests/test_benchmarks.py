@@ -0,0 +1,29 @@
+"""Benchmark corpus and comparison tests"""
+from app.services.gff_parser import GffParser
+from benchmarks.corpus import generate
+from benchmarks.run import compare
+
+
+def test_corpus_is_deterministic():
+    """Test that the same seed produces the same bytes and a different seed does not"""
+    assert generate("git", seed=1) == generate("git", seed=1)
+    assert generate("git", seed=1) != generate("git", seed=2)
+    
+    root = GffParser().read_gff_root(generate("bic"))
+    assert root.file_type == "BIC "
+    assert len(root.top_level_struct.fields["EquipItemList"].listval) == 14
+
+
+def test_compare_flags_regressions():
+    """Test that slower stages and higher peak memory are reported"""
+    def report(read_seconds, peak):
+        return {"results": {"bic": {
+            "bytes": 100, "fields": 10, "peak_bytes": peak,
+            "stages": {"read": {"seconds": read_seconds}, "write": {"seconds": 1.0}},
+        }}}
+    
+    baseline = report(1.0, 1000)
+    assert compare(baseline, report(1.2, 1100), tolerance=0.25) == []
+    regressions = compare(baseline, report(1.5, 2000), tolerance=0.25)
+    assert len(regressions) == 2
+    assert regressions[0].startswith("bic/read")
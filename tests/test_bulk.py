@@ -0,0 +1,95 @@
+"""Bulk conversion CLI tests"""
+import json
+
+import pytest
+
+from app.cli import main
+from app.services.bulk import BulkError, BulkJob, output_name, plan_jobs, run_job, run_jobs
+from app.services.gff_converter import GffConverter
+from app.services.gff_parser import GffParser
+from app.services.msgpack_codec import packb
+from tests.gff_samples import creature_gff, simple_gff
+
+
+@pytest.fixture
+def source(tmp_path):
+    directory = tmp_path / "vault"
+    (directory / "alice").mkdir(parents=True)
+    (directory / "alice" / "goblin.bic").write_bytes(creature_gff())
+    (directory / "simple.utc").write_bytes(simple_gff())
+    (directory / "broken.bic").write_bytes(b"not a gff")
+    (directory / "notes.txt").write_bytes(b"ignored")
+    return directory
+
+
+def test_output_name():
+    """Test that output names round-trip between GFF and JSON"""
+    assert output_name("gff-to-json", "goblin.bic") == "goblin.bic.json"
+    assert output_name("json-to-gff", "goblin.bic.json") == "goblin.bic"
+    assert output_name("json-to-gff", "goblin.json") == "goblin.gff"
+    assert output_name("sqlite-extract", "goblin.bic") == "goblin.bic.db"
+    assert output_name("sqlite-embed", "goblin.bic") == "goblin.bic"
+
+
+def test_plan_jobs(source, tmp_path):
+    """Test directory walks, globs and output placement"""
+    jobs = plan_jobs([str(source)], "gff-to-json", str(tmp_path / "out"))
+    assert [job.dest for job in jobs] == [
+        str(tmp_path / "out" / "broken.bic.json"),
+        str(tmp_path / "out" / "simple.utc.json"),
+        str(tmp_path / "out" / "alice" / "goblin.bic.json"),
+    ]
+
+    jobs = plan_jobs([str(source / "**" / "*.bic")], "gff-to-json")
+    assert sorted(job.dest for job in jobs) == [
+        str(source / "alice" / "goblin.bic.json"),
+        str(source / "broken.bic.json"),
+    ]
+
+    with pytest.raises(BulkError):
+        plan_jobs([str(source / "missing.bic")], "gff-to-json")
+    with pytest.raises(BulkError):
+        plan_jobs([str(source), str(source)], "gff-to-json", str(tmp_path / "out"))
+    with pytest.raises(BulkError):
+        plan_jobs([str(source)], "sqlite-embed", database=str(tmp_path / "missing.db"))
+
+
+def test_round_trip(source, tmp_path):
+    """Test gff -> json -> gff through the workers, with failures reported per file"""
+    jobs = plan_jobs([str(source)], "gff-to-json", str(tmp_path / "json"))
+    results = list(run_jobs(jobs, workers=2))
+    assert [result.ok for result in results] == [False, True, True]
+    assert not (tmp_path / "json" / "broken.bic.json").exists()
+
+    expected = GffConverter().to_json(GffParser().read_gff_root(creature_gff()))
+    document = json.loads((tmp_path / "json" / "alice" / "goblin.bic.json").read_bytes())
+    assert document == json.loads(json.dumps(expected))
+
+    jobs = plan_jobs([str(tmp_path / "json")], "json-to-gff", str(tmp_path / "gff"))
+    assert all(result.ok for result in run_jobs(jobs, workers=1))
+    rebuilt = GffParser().read_gff_root((tmp_path / "gff" / "alice" / "goblin.bic").read_bytes())
+    assert GffConverter().to_json(rebuilt) == expected
+
+    # MessagePack inputs are accepted too
+    (tmp_path / "goblin.bic.msgpack").write_bytes(packb(document))
+    result = run_job(BulkJob("json-to-gff", str(tmp_path / "goblin.bic.msgpack"), str(tmp_path / "goblin.bic")))
+    assert result.ok
+    assert GffConverter().to_json(GffParser().read_gff_root((tmp_path / "goblin.bic").read_bytes())) == expected
+
+
+def test_cli_sqlite(source, tmp_path, capsys):
+    """Test embedding in place and extracting to an output directory"""
+    database = tmp_path / "campaign.db"
+    database.write_bytes(b"SQLite format 3\x00" + bytes(range(256)) * 8)
+    goblin = source / "alice" / "goblin.bic"
+
+    assert main(["sqlite-embed", str(goblin), "--database", str(database), "--workers", "1"]) == 0
+    assert "1 written, 0 failed" in capsys.readouterr().out
+
+    assert main(["sqlite-extract", str(goblin), str(source / "simple.utc"), "-o", str(tmp_path / "db"), "--json"]) == 1
+    stats = json.loads(capsys.readouterr().out)
+    assert (stats["written"], stats["failed"]) == (1, 1)
+    assert "No embedded SQLite" in stats["errors"][0]["error"]
+    assert (tmp_path / "db" / "goblin.bic.db").read_bytes() == database.read_bytes()
+
+    assert main(["convert", str(tmp_path / "missing")]) == 2
@@ -0,0 +1,37 @@
+"""ERF archive reader tests"""
+import tempfile
+
+import pytest
+
+from app.services.erf_reader import ErfArchive, ErfReaderError
+from app.services.gff_parser import GffParser
+from tests.gff_samples import module_erf
+
+
+def test_index_and_data():
+    """Test key/resource indexing and zero-copy payload access"""
+    with ErfArchive(module_erf()) as archive:
+        assert archive.file_type == "MOD "
+        assert [r.name for r in archive.resources] == ["goblin.utc", "module.ifo", "nw_s0_fireball.ncs"]
+        assert [r.name for r in archive.gff_resources()] == ["goblin.utc", "module.ifo"]
+        data = archive.data(archive.find("MODULE.IFO"))
+        assert isinstance(data, memoryview)
+        root = GffParser().read_gff_root(data)
+        assert root.top_level_struct.fields["Test"].strval == "Hello World"
+
+
+def test_open_mmaps_file():
+    """Test opening an archive from a file via mmap"""
+    with tempfile.NamedTemporaryFile(suffix=".mod") as fp:
+        fp.write(module_erf())
+        fp.flush()
+        with ErfArchive.open(fp.name) as archive:
+            assert bytes(archive.data(archive.find("nw_s0_fireball.ncs"))) == b"NCS V1.0"
+
+
+def test_invalid_archive():
+    """Test that non-ERF data is rejected"""
+    with pytest.raises(ErfReaderError):
+        ErfArchive(b"GFF V3.2" + b"\0" * 200)
+    with pytest.raises(ErfReaderError):
+        ErfArchive(module_erf()[:200])
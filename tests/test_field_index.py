@@ -0,0 +1,87 @@
+"""Field index tests"""
+import os
+import struct
+
+import pytest
+
+from app.services.field_index import FieldIndex, FieldIndexError, extract_rows
+from tests.gff_samples import creature_gff, module_erf, simple_gff
+
+
+@pytest.fixture
+def source(tmp_path):
+    directory = tmp_path / "vault"
+    (directory / "player").mkdir(parents=True)
+    (directory / "player" / "goblin.bic").write_bytes(creature_gff())
+    (directory / "simple.gff").write_bytes(simple_gff())
+    (directory / "broken.utc").write_bytes(b"not a gff")
+    (directory / "notes.txt").write_bytes(b"ignored")
+    return directory
+
+
+def test_extract_rows():
+    """Test that rows use /query paths and skip VOID fields"""
+    file_type, rows = extract_rows(creature_gff())
+    by_path = {path: (label, value) for path, label, _, value in rows}
+    assert file_type == "UTC "
+    assert by_path["ClassList/1/Class"] == ("Class", 7)
+    assert by_path["FirstName/0"] == ("FirstName", "Goblin")
+    assert by_path["FirstName/id"] == ("FirstName", 12345)
+    assert "Blob" not in by_path
+
+
+def test_incremental_update(source, tmp_path):
+    """Test that unchanged files are skipped and removed files dropped"""
+    index = FieldIndex(str(tmp_path / "index.sqlite"))
+    assert index.update(str(source)) == {"indexed": 2, "unchanged": 0, "removed": 0, "failed": 1}
+    assert index.update(str(source)) == {"indexed": 0, "unchanged": 3, "removed": 0, "failed": 0}
+    
+    # Touched but identical content is not parsed again
+    goblin = source / "player" / "goblin.bic"
+    os.utime(goblin, ns=(0, 0))
+    assert index.update(str(source))["unchanged"] == 3
+    
+    (source / "simple.gff").unlink()
+    assert index.update(str(source))["removed"] == 1
+    assert index.stats()["files"] == 2
+    
+    with pytest.raises(FieldIndexError):
+        index.update(str(tmp_path / "missing"))
+
+
+def test_search(source, tmp_path):
+    """Test value, label, path and wildcard searches across a directory and an ERF"""
+    archive = tmp_path / "module.mod"
+    archive.write_bytes(module_erf())
+    index = FieldIndex(str(tmp_path / "index.sqlite"))
+    index.update(str(source))
+    index.update(str(archive))
+    
+    results = index.search(value="NW_GOBLIN")
+    assert {(r["file"], r["path"]) for r in results} == {("player/goblin.bic", "Tag"), ("goblin.utc", "Tag")}
+    
+    # file_type is the type in the GFF header, not the extension
+    results = index.search(label="class", value="7", file_type="utc")
+    assert {(r["file"], r["path"], r["value"]) for r in results} == {
+        ("player/goblin.bic", "ClassList/1/Class", 7), ("goblin.utc", "ClassList/1/Class", 7)
+    }
+    assert index.search(label="class", file_type="bic") == []
+    
+    assert {r["value"] for r in index.search(path="FirstName/*")} == {"Goblin", 12345}
+    assert len(index.search(value="nw_gob*", limit=1)) == 1
+    assert index.search(value="100%") == []
+    with pytest.raises(FieldIndexError):
+        index.search()
+
+
+def test_dword64_past_signed_range(tmp_path):
+    """Test that a DWORD64 SQLite cannot bind as an integer is still indexed and searchable"""
+    data = bytearray(creature_gff())
+    field_data_offset = struct.unpack_from("<I", data, 32)[0]
+    struct.pack_into("<Q", data, field_data_offset + 69, 2 ** 64 - 1)  # Big
+    (tmp_path / "big.utc").write_bytes(data)
+    
+    index = FieldIndex(str(tmp_path / "index.sqlite"))
+    assert index.update(str(tmp_path / "big.utc"))["indexed"] == 1
+    assert [r["value"] for r in index.search(path="Big")] == [2 ** 64 - 1]
+    assert [r["file"] for r in index.search(value=str(2 ** 64 - 1))] == ["big.utc"]
@@ -0,0 +1,97 @@
+"""GFF/JSON converter tests"""
+import json
+
+import pytest
+
+from app.models.gff_models import GffDataType, GffField, GffLocString, GffRoot, GffStruct
+from app.services.gff_converter import GffConverter, GffConverterError, sorted_labels
+from app.services.gff_view import GffView
+from app.services.msgpack_codec import unpackb
+from tests.gff_samples import pack_gff, u32
+
+
+converter = GffConverter()
+
+
+def _key_order(data):
+    """Keys of every object in document order"""
+    if isinstance(data, dict):
+        return [list(data)] + [k for v in data.values() for k in _key_order(v)]
+    if isinstance(data, list):
+        return [k for v in data for k in _key_order(v)]
+    return []
+
+
+def test_to_json_emits_sorted_keys():
+    """Test that to_json output needs no post-processing"""
+    element = {"b": GffField(GffDataType.GFF_INT, ival=1), "A": GffField(GffDataType.GFF_INT, ival=2)}
+    root = GffRoot(structs=[], top_level_struct=GffStruct(id=0xFFFFFFFF, fields={
+        "zeta": GffField(GffDataType.GFF_BYTE, bval=1),
+        "List": GffField(GffDataType.GFF_LIST, listval=[
+            GffStruct(id=3, fields=dict(element)) for _ in range(3)
+        ]),
+        "alpha": GffField(GffDataType.GFF_STRING, strval="x"),
+    }))
+    
+    sorted_labels.cache_clear()
+    data = converter.to_json(root)
+    assert _key_order(data) == _key_order(converter.post_process_json(data))
+    assert list(data) == ["alpha", "List", "zeta"]
+    # Three identical list entries share one cached ordering
+    info = sorted_labels.cache_info()
+    assert info.hits == 2
+    assert info.misses == 2
+
+
+def test_to_msgpack_matches_json():
+    """Test that MessagePack output decodes to the JSON document, VOID as bytes"""
+    root = GffRoot(structs=[], top_level_struct=GffStruct(id=0xFFFFFFFF, fields={
+        "Name": GffField(GffDataType.GFF_LOCSTRING, locval=GffLocString(str_ref=7, entries={0: "Goblin"})),
+        "Scale": GffField(GffDataType.GFF_FLOAT, fval=0.5),
+        "Big": GffField(GffDataType.GFF_DWORD64, d64val=2 ** 40),
+        "Blob": GffField(GffDataType.GFF_VOID, voidval=b"\x00\xff"),
+        "List": GffField(GffDataType.GFF_LIST, listval=[
+            GffStruct(id=1, fields={"Class": GffField(GffDataType.GFF_INT, ival=-4)})
+        ]),
+    }))
+    
+    data = unpackb(converter.to_msgpack(root))
+    assert list(data) == list(converter.to_json(root))
+    assert data["Blob"] == b"\x00\xff"
+    assert dict(data, Blob="\x00\xff") == json.loads(converter.to_json_bytes(root))
+    
+    # Decoded MessagePack feeds the JSON import path; bytes come back as VOID
+    rebuilt = converter.gff_root_from_json(data)
+    assert rebuilt.top_level_struct.fields["Blob"].kind == GffDataType.GFF_VOID
+    assert rebuilt.top_level_struct.fields["Blob"].voidval == b"\x00\xff"
+
+
+def test_value_to_json():
+    """Test that single fields and structs take the same form as inside to_json output"""
+    element = GffStruct(id=3, fields={"b": GffField(GffDataType.GFF_INT, ival=1), "A": GffField(GffDataType.GFF_INT, ival=2)})
+    name = GffField(GffDataType.GFF_LOCSTRING, locval=GffLocString(str_ref=7, entries={0: "Goblin"}))
+    root = GffRoot(structs=[], top_level_struct=GffStruct(id=0xFFFFFFFF, fields={"Name": name, "Entry": GffField(GffDataType.GFF_STRUCT, structval=element)}))
+    
+    data = converter.to_json(root)
+    assert converter.value_to_json(name) == data["Name"]
+    assert converter.value_to_json(element) == data["Entry"]
+    assert list(converter.value_to_json(element)) == ["A", "b"]
+
+
+def test_iter_json_rejects_cycles():
+    """Test that a tree reaching a struct twice raises instead of streaming forever"""
+    top = GffStruct(id=0xFFFFFFFF, fields={})
+    top.fields["Child"] = GffField(GffDataType.GFF_STRUCT, structval=top)
+    with pytest.raises(GffConverterError, match="reachable more than once"):
+        converter.to_json_bytes(GffRoot(structs=[], top_level_struct=top))
+    
+    element = GffStruct(id=1, fields={})
+    shared = GffRoot(structs=[], top_level_struct=GffStruct(id=0xFFFFFFFF, fields={
+        "List": GffField(GffDataType.GFF_LIST, listval=[element, element]),
+    }))
+    with pytest.raises(GffConverterError):
+        b"".join(converter.iter_json(shared))
+    
+    loop = pack_gff(b"UTC ", structs=[(0xFFFFFFFF, 0, 1)], fields=[(14, 0, u32(0))], labels=["Child"])
+    with pytest.raises(GffConverterError):
+        b"".join(converter.iter_json(GffView(loop)))
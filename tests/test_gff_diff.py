@@ -0,0 +1,94 @@
+"""Structural diff and content hash tests"""
+from app.models.gff_models import GffDataType, GffField, GffLocString, GffRoot, GffStruct
+from app.services import gff_diff
+from app.services.gff_diff import content_hash, diff_gff
+from app.services.gff_parser import GffParser
+from app.services.gff_patch import PatchOperation, patch_gff
+from tests.gff_samples import creature_gff
+
+
+parser = GffParser()
+
+
+def _write(fields):
+    return parser.write_gff_root(GffRoot(structs=[], top_level_struct=GffStruct(id=0xFFFFFFFF, fields=fields)))
+
+
+def _classes(*classes):
+    return GffField(GffDataType.GFF_LIST, listval=[
+        GffStruct(id=2, fields={"Class": GffField(GffDataType.GFF_INT, ival=c)}) for c in classes
+    ])
+
+
+def test_content_hash_ignores_layout():
+    """Test that field order and rewriting do not change the content hash"""
+    data = creature_gff()
+    assert content_hash(parser.write_gff_root(parser.read_gff_root(data))) == content_hash(data)
+    
+    first = _write({
+        "A": GffField(GffDataType.GFF_INT, ival=1),
+        "Name": GffField(GffDataType.GFF_LOCSTRING, locval=GffLocString(1, {0: "a", 2: "b"})),
+    })
+    second = _write({
+        "Name": GffField(GffDataType.GFF_LOCSTRING, locval=GffLocString(1, {2: "b", 0: "a"})),
+        "A": GffField(GffDataType.GFF_INT, ival=1),
+    })
+    assert first != second
+    assert content_hash(first) == content_hash(second)
+    
+    # Same value, different type
+    assert content_hash(_write({"A": GffField(GffDataType.GFF_DWORD, dval=1)})) != content_hash(first)
+
+
+def test_diff_reports_typed_changes():
+    """Test that only patched paths are reported, with typed values"""
+    data = creature_gff()
+    patched = patch_gff(data, [PatchOperation("Gold", 1), PatchOperation("ClassList/1/Class", 9)]).data
+    
+    result = diff_gff(data, patched)
+    assert not result.equal
+    assert result.changes == [
+        {
+            "path": "ClassList/1/Class",
+            "change": "changed",
+            "old": {"type": "GFF_INT", "value": 7},
+            "new": {"type": "GFF_INT", "value": 9}
+        },
+        {
+            "path": "Gold",
+            "change": "changed",
+            "old": {"type": "GFF_DWORD", "value": 150},
+            "new": {"type": "GFF_DWORD", "value": 1}
+        },
+    ]
+    
+    same = diff_gff(data, parser.write_gff_root(parser.read_gff_root(data)))
+    assert same.equal and same.changes == []
+
+
+def test_diff_lists_and_fields():
+    """Test added/removed fields and list entries inserted mid-list"""
+    old = _write({"ClassList": _classes(1, 2, 3, 4), "Gone": GffField(GffDataType.GFF_BYTE, bval=1)})
+    new = _write({"ClassList": _classes(1, 2, 9, 3, 4), "New": GffField(GffDataType.GFF_STRING, strval="x")})
+    
+    changes = diff_gff(old, new).changes
+    assert changes == [
+        {"path": "ClassList/2", "change": "added", "new": {"type": "GFF_STRUCT", "id": 2, "value": {"Class": 9}}},
+        {"path": "Gone", "change": "removed", "old": {"type": "GFF_BYTE", "value": 1}},
+        {"path": "New", "change": "added", "new": {"type": "GFF_STRING", "value": "x"}},
+    ]
+
+
+def test_diff_reports_header_changes(monkeypatch):
+    """Test that a file type or version difference is reported, not just reflected in the hash"""
+    # Only V3.2 passes header validation; skip it to get a second version
+    monkeypatch.setattr(gff_diff._parser, "read_gff_root", lambda data, validate: parser.read_gff_root(data, False))
+    root = parser.read_gff_root(creature_gff())
+    root.file_type = "BIC "
+    root.file_version = "V3.3"
+    diff = diff_gff(creature_gff(), parser.write_gff_root(root))
+    assert not diff.equal
+    assert diff.changes == [
+        {"path": "", "change": "changed", "old": {"type": "FILE_TYPE", "value": "UTC "}, "new": {"type": "FILE_TYPE", "value": "BIC "}},
+        {"path": "", "change": "changed", "old": {"type": "FILE_VERSION", "value": "V3.2"}, "new": {"type": "FILE_VERSION", "value": "V3.3"}},
+    ]
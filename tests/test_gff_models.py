@@ -0,0 +1,33 @@
+"""GFF model tests"""
+import pickle
+
+import pytest
+
+from app.models.gff_models import GffDataType, GffField, GffStruct
+
+
+def test_field_is_compact():
+    """Test that GffField stores only kind and value"""
+    gff_field = GffField(GffDataType.GFF_INT, ival=5)
+    assert not hasattr(gff_field, "__dict__")
+    assert gff_field.value == 5
+
+
+def test_field_slot_attributes():
+    """Test the per-type attribute API"""
+    gff_field = GffField(kind=GffDataType.GFF_STRING, strval="abc")
+    assert gff_field.strval == "abc"
+    assert gff_field.ival is None
+    gff_field.dval = 7
+    assert gff_field.kind == GffDataType.GFF_DWORD
+    assert gff_field.dval == 7
+    assert gff_field.strval is None
+    with pytest.raises(TypeError):
+        GffField(GffDataType.GFF_INT, bogus=1)
+
+
+def test_field_equality_and_pickle():
+    """Test equality and pickling of slotted models"""
+    struct = GffStruct(id=1, fields={"A": GffField(GffDataType.GFF_BYTE, bval=1)})
+    assert pickle.loads(pickle.dumps(struct)) == struct
+    assert GffField(GffDataType.GFF_BYTE, 1) != GffField(GffDataType.GFF_CHAR, 1)
@@ -0,0 +1,130 @@
+"""GFF binary reader and writer tests"""
+import pytest
+
+from app.models.gff_models import GffDataType, GffField, GffRoot, GffStruct
+from app.services.gff_parser import GffInputError, GffParser, GffParserError, read_gff_header
+from app.services.gff_schema import GffSchema
+from tests.gff_samples import creature_gff, pack_gff, simple_gff, u32
+
+
+parser = GffParser()
+
+
+def test_read_simple_gff():
+    """Test reading a minimal top-level struct"""
+    root = parser.read_gff_root(simple_gff())
+    fields = root.top_level_struct.fields
+    assert root.file_type == "GFF "
+    assert root.file_version == "V3.2"
+    assert fields["Test"].kind == GffDataType.GFF_STRING
+    assert fields["Test"].strval == "Hello World"
+    assert fields["Version"].ival == 1
+
+
+def test_read_all_field_types():
+    """Test that every GFF field type decodes to the right slot"""
+    root = parser.read_gff_root(creature_gff())
+    fields = root.top_level_struct.fields
+    assert root.file_type == "UTC "
+    assert len(root.structs) == 4
+    assert fields["Tag"].strval == "nw_goblin"
+    assert fields["Gold"].dval == 150
+    assert fields["Str"].bval == 14
+    assert fields["Subrace"].cval == -2
+    assert fields["Wide"].wval == 65535
+    assert fields["Lawfulness"].sval == -3
+    assert fields["Facing"].fval == 0.5
+    assert fields["Experience"].i64val == -5
+    assert fields["Big"].d64val == 2 ** 40
+    assert fields["ChallengeRating"].dblval == 1.5
+    assert fields["TemplateResRef"].resval == "nw_gob"
+    assert fields["Blob"].voidval == b"\x00\x01\x02"
+    assert fields["FirstName"].locval.str_ref == 12345
+    assert fields["FirstName"].locval.entries == {0: "Goblin"}
+    assert fields["Info"].structval.id == 5
+    assert fields["Info"].structval.fields == {}
+    classes = fields["ClassList"].listval
+    assert [s.fields["Class"].ival for s in classes] == [4, 7]
+    assert classes[0].id == 2
+
+
+def test_read_from_memoryview():
+    """Test that the reader accepts any buffer without copying it first"""
+    data = bytearray(creature_gff())
+    root = parser.read_gff_root(memoryview(data))
+    assert root.top_level_struct.fields["Tag"].strval == "nw_goblin"
+
+
+def test_read_invalid_version():
+    """Test that non-V3.2 files are rejected"""
+    data = bytearray(simple_gff())
+    data[4:8] = b"V1.0"
+    with pytest.raises(GffParserError):
+        parser.read_gff_root(bytes(data))
+
+
+def test_read_truncated():
+    """Test that truncated files raise GffParserError"""
+    with pytest.raises(GffParserError):
+        parser.read_gff_root(creature_gff()[:100])
+    with pytest.raises(GffParserError):
+        parser.read_gff_root(b"GFF V3.2")
+
+
+@pytest.mark.parametrize("schemas", [None, {"UTC ": GffSchema("UTC ", [(("Child", GffDataType.GFF_STRUCT),)])}])
+def test_read_rejects_shared_structs(schemas):
+    """Test that a struct reachable twice fails the parse instead of building a cycle"""
+    self_reference = pack_gff(b"UTC ", structs=[(0xFFFFFFFF, 0, 1)], fields=[(14, 0, u32(0))], labels=["Child"])
+    with pytest.raises(GffParserError, match="Struct 0 is referenced more than once"):
+        GffParser(schemas).read_gff_root(self_reference)
+
+    shared = pack_gff(
+        b"UTC ",
+        structs=[(0xFFFFFFFF, 0, 2), (1, 0, 0)],
+        fields=[(14, 0, u32(1)), (15, 1, u32(0))],
+        labels=["Child", "List"],
+        field_indices=[0, 1],
+        list_indices=[1, 1],
+    )
+    with pytest.raises(GffParserError, match="Struct 1 is referenced more than once"):
+        GffParser(schemas).read_gff_root(shared)
+
+
+def test_write_round_trip():
+    """Test that writing a parsed file reads back identically"""
+    root = parser.read_gff_root(creature_gff())
+    written = parser.write_gff_root(root)
+    again = parser.read_gff_root(written)
+    assert again.file_type == "UTC "
+    assert again.top_level_struct == root.top_level_struct
+    assert parser.write_gff_root(again) == written
+
+
+def test_write_interns_labels_and_payloads():
+    """Test that repeated labels and identical payloads are stored once"""
+    root = GffRoot(
+        structs=[],
+        top_level_struct=GffStruct(id=0xFFFFFFFF, fields={
+            "List": GffField(GffDataType.GFF_LIST, listval=[
+                GffStruct(id=1, fields={"Tag": GffField(GffDataType.GFF_STRING, strval="same")}),
+                GffStruct(id=1, fields={"Tag": GffField(GffDataType.GFF_STRING, strval="same")}),
+            ])
+        })
+    )
+    header = read_gff_header(memoryview(parser.write_gff_root(root)))
+    assert header.label_count == 2
+    assert header.field_data_size == 8
+    assert header.struct_count == 3
+    assert header.list_indices_size == 12
+
+
+def test_write_rejects_long_label():
+    """Test that labels over 16 characters are rejected"""
+    root = GffRoot(
+        structs=[],
+        top_level_struct=GffStruct(id=0xFFFFFFFF, fields={
+            "A" * 17: GffField(GffDataType.GFF_INT, ival=1)
+        })
+    )
+    with pytest.raises(GffInputError, match="longer than 16"):
+        parser.write_gff_root(root)
@@ -0,0 +1,86 @@
+"""In-place GFF patch tests"""
+import pytest
+
+from app.models.gff_models import GffDataType, GffField, GffRoot, GffStruct
+from app.services.gff_converter import GffConverter
+from app.services.gff_parser import GffParser
+from app.services.gff_patch import GffPatchError, PatchOperation, parse_operations, patch_gff
+from app.services.gff_view import GffView, GffViewError
+from tests.gff_samples import creature_gff
+
+
+converter = GffConverter()
+
+
+def _json(data):
+    return converter.to_json(GffParser().read_gff_root(data))
+
+
+def test_fixed_size_values_patched_in_place():
+    """Test that inline and wide values change without moving any bytes"""
+    data = creature_gff()
+    result = patch_gff(data, [
+        PatchOperation("Gold", 999),
+        PatchOperation("ClassList/1/Class", -9),
+        PatchOperation("Experience", 77),
+        PatchOperation("Facing", 0.25),
+        PatchOperation("Tag", "orc"),
+    ])
+    assert (result.in_place, result.appended) == (5, 0)
+    assert len(result.data) == len(data)
+    assert sum(a != b for a, b in zip(data, result.data)) <= 4 + 4 + 8 + 4 + 7
+    
+    expected = dict(_json(data), Gold=999, Experience=77, Facing=0.25, Tag="orc")
+    expected["ClassList"] = [{"Class": 4}, {"Class": -9}]
+    assert _json(result.data) == expected
+
+
+def test_larger_values_are_appended():
+    """Test that growing a value only splices the field data block"""
+    data = creature_gff()
+    name = {"id": 1, "0": "A considerably longer goblin name"}
+    result = patch_gff(data, [PatchOperation("FirstName", name), PatchOperation("TemplateResRef", "nw_goblin_chief")])
+    assert (result.in_place, result.appended) == (0, 2)
+    
+    before, after = GffView(data).header, GffView(result.data).header
+    growth = len(result.data) - len(data)
+    assert after.field_data_size == before.field_data_size + growth
+    assert after.field_indices_offset == before.field_indices_offset + growth
+    assert after.list_indices_offset == before.list_indices_offset + growth
+    assert result.data[:before.field_data_offset] != data[:before.field_data_offset]
+    assert result.data[after.field_indices_offset:] == data[before.field_indices_offset:]
+    assert _json(result.data) == dict(_json(data), FirstName=name, TemplateResRef="nw_goblin_chief")
+
+
+def test_shared_payload_is_not_overwritten():
+    """Test that a payload the writer stored once for two fields is left alone"""
+    root = GffRoot(structs=[], top_level_struct=GffStruct(id=0xFFFFFFFF, fields={
+        "A": GffField(GffDataType.GFF_STRING, strval="same"),
+        "B": GffField(GffDataType.GFF_STRING, strval="same"),
+    }))
+    data = GffParser().write_gff_root(root)
+    result = patch_gff(data, [PatchOperation("A", "diff")])
+    assert result.appended == 1
+    assert _json(result.data) == {"A": "diff", "B": "same"}
+
+
+@pytest.mark.parametrize("operation, error", [
+    (PatchOperation("Missing", 1), GffViewError),
+    (PatchOperation("ClassList", 1), GffPatchError),
+    (PatchOperation("Gold", "lots"), GffPatchError),
+    (PatchOperation("Str", 256), GffPatchError),
+    (PatchOperation("TemplateResRef", "x" * 17), GffPatchError),
+    (PatchOperation("", 1), GffPatchError),
+])
+def test_invalid_operations(operation, error):
+    with pytest.raises(error):
+        patch_gff(creature_gff(), [operation])
+
+
+def test_parse_operations():
+    assert parse_operations([{"path": "Gold", "value": 1}]) == [PatchOperation("Gold", 1)]
+    for raw in ([], {"Gold": 1}, [{"path": "Gold"}]):
+        with pytest.raises(GffPatchError):
+            parse_operations(raw)
+    with pytest.raises(GffPatchError):
+        patch_gff(creature_gff(), [PatchOperation("Gold", 1), PatchOperation("/Gold", 2)])
@@ -0,0 +1,102 @@
+"""Compiled schema codec tests"""
+import pickle
+
+import pytest
+
+from app.models.gff_models import GffDataType, GffField, GffRoot, GffStruct
+from app.services import gff_schema
+from app.services.gff_converter import GffConverter
+from app.services.gff_parser import GffParser
+from app.services.gff_schema import GffSchema, GffSchemaError, compile_layout, load_schemas
+from benchmarks.corpus import generate
+from tests.gff_samples import creature_gff
+
+
+T = GffDataType
+
+
+def learned(data):
+    root = GffParser().read_gff_root(data)
+    schema = GffSchema.learn(root.file_type, [root])
+    return root, {schema.file_type: schema}
+
+
+@pytest.mark.parametrize("data", [creature_gff(), generate("bic"), generate("git")])
+def test_matches_generic_path(data):
+    """Test that compiled codecs give the same tree and the same JSON bytes"""
+    generic, schemas = learned(data)
+    root = GffParser(schemas).read_gff_root(data)
+    assert root == generic
+    assert GffConverter(schemas).to_json_bytes(root) == GffConverter().to_json_bytes(generic)
+
+
+def test_unknown_layouts_fall_back():
+    """Test that structs without a compiled layout take the generic path"""
+    generic = GffParser().read_gff_root(creature_gff())
+    schema = GffSchema("utc", [(("Class", T.GFF_INT),)])
+    assert schema.file_type == "UTC "
+    schemas = {schema.file_type: schema}
+    assert GffParser(schemas).read_gff_root(creature_gff()) == generic
+    assert GffConverter(schemas).to_json_bytes(generic) == GffConverter().to_json_bytes(generic)
+
+
+def test_encoder_matches_generic_values():
+    """Test that odd values and mismatched kinds encode exactly as the generic path does"""
+    fields = {
+        "Zero": GffField(T.GFF_FLOAT, -0.0),
+        "NaN": GffField(T.GFF_FLOAT, float("nan")),
+        "Inf": GffField(T.GFF_DOUBLE, float("-inf")),
+        "IntFloat": GffField(T.GFF_FLOAT, 3),
+        "Flag": GffField(T.GFF_BYTE, True),
+        "Missing": GffField(T.GFF_STRING, None),
+        "Quote": GffField(T.GFF_RESREF, 'a"b\n'),
+        "Blob": GffField(T.GFF_VOID, b"\xff"),
+        "List": GffField(T.GFF_LIST, [GffStruct(0, {"A": GffField(T.GFF_CHAR, -1)})]),
+    }
+    root = GffRoot(structs=[], top_level_struct=GffStruct(0xFFFFFFFF, fields), file_type="UTI ")
+    schema = GffSchema.learn("uti", [root])
+    assert len(schema) == 2
+    expected = GffConverter().to_json_bytes(root)
+    assert GffConverter({schema.file_type: schema}).to_json_bytes(root) == expected
+
+    # Same labels, different kinds: not this layout
+    fields["Flag"] = GffField(T.GFF_STRING, "yes")
+    assert GffConverter({schema.file_type: schema}).to_json_bytes(root) == GffConverter().to_json_bytes(root)
+
+
+def test_invalid_layouts():
+    """Test that layouts a struct cannot have are rejected"""
+    with pytest.raises(GffSchemaError):
+        compile_layout(())
+    with pytest.raises(GffSchemaError):
+        compile_layout((("A", T.GFF_INT), ("A", T.GFF_BYTE)))
+    with pytest.raises(GffSchemaError):
+        compile_layout((("A", 5),))
+
+
+def test_load_schemas(tmp_path, monkeypatch):
+    """Test that sample files are learned per file type and registered"""
+    monkeypatch.setattr(gff_schema, "SCHEMAS", {})
+    (tmp_path / "goblin.utc").write_bytes(creature_gff())
+    (tmp_path / "broken.utc").write_bytes(b"not a gff")
+    (tmp_path / "notes.txt").write_bytes(creature_gff())
+
+    schemas = load_schemas([str(tmp_path)])
+    assert list(schemas) == ["UTC "]
+    assert gff_schema.SCHEMAS == schemas
+    assert len(schemas["UTC "]) == 2  # top level and ClassList entries; the empty struct has none
+
+
+def test_pickle(monkeypatch):
+    """Test that schemas reach process workers: registered ones by file type, others by layouts"""
+    monkeypatch.setattr(gff_schema, "SCHEMAS", {})
+    root, schemas = learned(creature_gff())
+    schema = schemas["UTC "]
+    copy = pickle.loads(pickle.dumps(schema))
+    assert copy is not schema
+    assert list(copy.layouts) == list(schema.layouts)
+
+    gff_schema.register_schema(schema)
+    converter = pickle.loads(pickle.dumps(GffConverter(gff_schema.SCHEMAS)))
+    assert converter.schemas["UTC "] is schema
+    assert converter.to_json_bytes(root) == GffConverter().to_json_bytes(root)
@@ -0,0 +1,72 @@
+"""Lazy GFF view tests"""
+import json
+import struct
+
+import pytest
+
+from app.models.gff_models import GffDataType
+from app.services.gff_converter import GffConverter
+from app.services.gff_parser import GffParser, GffParserError
+from app.services.gff_view import GffStructView, GffView, GffViewError, lookup_json, validate_gff
+from tests.gff_samples import creature_gff
+
+
+def test_view_matches_full_reader():
+    """Test that converting a view gives the same JSON as the full reader"""
+    converter = GffConverter()
+    data = creature_gff()
+    assert converter.to_json(GffView(data)) == converter.to_json(GffParser().read_gff_root(data))
+
+
+def test_view_decodes_lazily():
+    """Test that only accessed fields are decoded"""
+    view = GffView(creature_gff())
+    fields = view.top_level_struct.fields
+    assert fields["Gold"].dval == 150
+    assert list(fields._decoded) == ["Gold"]
+
+
+def test_resolve_paths():
+    """Test path lookups through lists and structs"""
+    view = GffView(creature_gff())
+    assert view.resolve("ClassList/1/Class").ival == 7
+    assert view.resolve("FirstName").locval.entries == {0: "Goblin"}
+    assert view.resolve("Info").kind == GffDataType.GFF_STRUCT
+    assert isinstance(view.resolve(""), GffStructView)
+
+
+@pytest.mark.parametrize("path", ["Missing", "ClassList/5", "ClassList/x", "Gold/0", "ClassList/-1"])
+def test_resolve_missing(path):
+    """Test that unresolvable paths raise GffViewError"""
+    with pytest.raises(GffViewError):
+        GffView(creature_gff()).resolve(path)
+
+
+def test_iter_json_small_chunks():
+    """Test streaming JSON in many small chunks"""
+    converter = GffConverter()
+    view = GffView(creature_gff())
+    chunks = list(converter.iter_json(view, chunk_size=1))
+    expected = converter.post_process_json(converter.to_json(GffView(creature_gff())))
+    assert len(chunks) > 1
+    assert json.loads(b"".join(chunks)) == expected
+    assert list(json.loads(b"".join(chunks))) == list(expected)
+
+
+def test_validate_gff():
+    """Test that a malformed nested field is caught up front, not partway through a walk"""
+    validate_gff(creature_gff())
+    data = bytearray(creature_gff())
+    field_offset = struct.unpack_from("<I", data, 16)[0]
+    struct.pack_into("<I", data, field_offset + 12 * 12, 99)  # ClassList/0/Class
+    GffView(data).top_level_struct.fields["Tag"]
+    with pytest.raises(GffParserError, match="Unknown GFF field type 99"):
+        validate_gff(data)
+
+
+def test_lookup_json():
+    """Test that a path lookup returns the type name and the JSON form of the value"""
+    assert lookup_json(creature_gff(), "ClassList/1/Class") == ("GFF_INT", 7)
+    assert lookup_json(creature_gff(), "ClassList/0") == ("GFF_STRUCT", {"Class": 4})
+    with pytest.raises(GffViewError):
+        lookup_json(creature_gff(), "Nope")
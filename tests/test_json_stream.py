@@ -0,0 +1,121 @@
+"""Streaming JSON to GFF tests"""
+import json
+from itertools import takewhile
+
+import pytest
+
+from app.services.gff_converter import GffConverter, GffConverterError, loads_json, loads_msgpack
+from app.services.gff_parser import GffInputError, GffParser, GffParserError
+from app.services.json_stream import MAX_DEPTH, JsonStreamError, iter_tokens, stream_json_to_gff
+from tests.gff_samples import creature_gff
+
+
+def tree_to_gff(document: bytes) -> bytes:
+    """The json.loads + gff_root_from_json + write_gff_root path"""
+    return GffParser().write_gff_root(GffConverter().gff_root_from_json(loads_json(document)))
+
+
+def test_matches_tree_path():
+    """Test that streaming gives the same bytes as building the tree"""
+    document = GffConverter().to_json_bytes(GffParser().read_gff_root(creature_gff()))
+    assert stream_json_to_gff(document) == tree_to_gff(document)
+    assert stream_json_to_gff(memoryview(document)) == tree_to_gff(document)
+
+    document = json.dumps({
+        "Flag": True, "Off": False, "Small": -5, "Big": 2 ** 40, "Float": 0.25, "Exp": 1e3,
+        "Null": None, "Text": 'café "quoted"\n', "Empty": {}, "NoItems": [],
+        "Nested": {"Inner": {"Deep": [{"A": 1}, {}]}}
+    }, indent=2).encode("utf-8")
+    assert stream_json_to_gff(document) == tree_to_gff(document)
+    assert stream_json_to_gff(b"\xef\xbb\xbf" + document) == tree_to_gff(document)
+    assert stream_json_to_gff(document.decode("utf-8").encode("utf-16")) == tree_to_gff(document)
+
+
+def test_tokens():
+    """Test that keys carry their colon and any comma before them"""
+    def tokens(document):
+        return list(takewhile(lambda token: token[0] != "end", iter_tokens(document)))
+
+    kinds = [kind for kind, _, _ in tokens(b'{"a": [1, 2.5], "b": null}')]
+    assert kinds == ["{", "key", "[", "value", ",", "value", "]", ",key", "value", "}"]
+
+    values = [value for kind, value, _ in tokens(b'["\\u00e9", -0, 1E2, true]') if kind == "value"]
+    assert values == ["é", 0, 100.0, True]
+
+
+@pytest.mark.parametrize("document", [
+    b"",
+    b'{"a": 1',
+    b'{"a": 1,}',
+    b'{"a" 1}',
+    b'{"a": 1 "b": 2}',
+    b'{"a": [{}, ]}',
+    b'{"a": 01}',
+    b'{"a": tru}',
+    b'{"a": "line\nbreak"}',
+    b'{"a": "\\x"}',
+    b'{"a": 1} {}',
+    b'{"a": "\xff"}',
+])
+def test_malformed_json(document):
+    """Test that malformed documents are rejected"""
+    with pytest.raises(JsonStreamError):
+        stream_json_to_gff(document)
+
+
+def test_unconvertible_documents():
+    """Test that valid JSON that cannot be a GFF is rejected"""
+    with pytest.raises(GffConverterError):
+        stream_json_to_gff(b"[1, 2]")
+    with pytest.raises(GffConverterError):
+        stream_json_to_gff(b'{"List": [1]}')
+    with pytest.raises(GffConverterError):
+        stream_json_to_gff(b'{"a": 1, "a": 2}')
+    with pytest.raises(GffConverterError):
+        stream_json_to_gff(b'{"Huge": 100000000000000000000}')
+    with pytest.raises(GffParserError):
+        stream_json_to_gff(b'{"ThisLabelIsTooLong": 1}')
+
+
+@pytest.mark.parametrize("document", [
+    b'{"a": 1, "a": 2}',
+    b'{"List": [{"__struct_id": 1, "b": "x", "b": "y"}]}',
+])
+def test_duplicate_keys_rejected_on_both_paths(document):
+    """Test that the streaming and json.loads paths agree on duplicate keys"""
+    with pytest.raises(GffConverterError, match="Duplicate key"):
+        stream_json_to_gff(document)
+    with pytest.raises(GffConverterError, match="Duplicate key"):
+        tree_to_gff(document)
+
+
+def test_duplicate_keys_rejected_in_msgpack():
+    """Test that MessagePack uploads are held to the same rule as JSON"""
+    with pytest.raises(GffConverterError, match="Duplicate key 'a'"):
+        loads_msgpack(b"\x82\xa1a\x01\xa1a\x02")
+    with pytest.raises(GffConverterError, match="Duplicate key 'b'"):
+        loads_msgpack(b"\x81\xa4List\x91\x82\xa1b\x01\xa1b\x02")
+    assert loads_msgpack(b"\x82\xa1a\x01\xa1b\x02") == {"a": 1, "b": 2}
+    with pytest.raises(JsonStreamError):
+        stream_json_to_gff(b'{"a":' * (MAX_DEPTH + 1) + b"1" + b"}" * (MAX_DEPTH + 1))
+
+
+def test_fails_early():
+    """Test that an error is raised at the first bad token, not at the end"""
+    document = b'{"a": 1, "b" 2, ' + b'"x": 1, ' * 10000 + b'"z": 0}'
+    with pytest.raises(JsonStreamError, match=r"at byte 9$"):
+        stream_json_to_gff(document)
+
+
+@pytest.mark.parametrize("document, error", [
+    (b'{"ThisLabelIsLongerThan16": 1}', GffInputError),
+    (b'{"a": 99999999999999999999999}', GffConverterError),
+    (b'{"List": [{"a": -99999999999999999999999}]}', GffConverterError),
+    (b'{"a": 1e300}', GffInputError),
+])
+def test_unstorable_documents_rejected_on_both_paths(document, error):
+    """Test that both paths raise the same input error for labels and values a GFF cannot hold"""
+    with pytest.raises(error):
+        stream_json_to_gff(document)
+    with pytest.raises(error):
+        tree_to_gff(document)
@@ -0,0 +1,38 @@
+"""Metrics and Server-Timing tests"""
+from app.services.metrics import Counter, Gauge, Histogram, MetricsRegistry, server_timing
+
+
+def test_histogram_rendering():
+    """Test cumulative buckets, sum and count in Prometheus text format"""
+    registry = MetricsRegistry()
+    histogram = registry.register(Histogram("stage_seconds", "Stage time", ("stage",), buckets=(0.1, 1.0)))
+    histogram.observe(0.05, "parse")
+    histogram.observe(0.1, "parse")
+    histogram.observe(5.0, "parse")
+    
+    lines = registry.render().splitlines()
+    assert lines[:2] == ["# HELP stage_seconds Stage time", "# TYPE stage_seconds histogram"]
+    assert 'stage_seconds_bucket{stage="parse",le="0.1"} 2' in lines
+    assert 'stage_seconds_bucket{stage="parse",le="1.0"} 2' in lines
+    assert 'stage_seconds_bucket{stage="parse",le="+Inf"} 3' in lines
+    assert 'stage_seconds_sum{stage="parse"} 5.15' in lines
+    assert 'stage_seconds_count{stage="parse"} 3' in lines
+
+
+def test_counter_and_gauge():
+    """Test label escaping and callback gauges"""
+    registry = MetricsRegistry()
+    counter = registry.register(Counter("requests_total", "Requests", ("path",)))
+    counter.inc('a"b')
+    counter.inc('a"b')
+    registry.register(Gauge("pending", "Pending", callback=lambda: 3))
+    
+    text = registry.render()
+    assert 'requests_total{path="a\\"b"} 2' in text
+    assert "pending 3" in text
+
+
+def test_server_timing():
+    """Test that repeated stages are summed and a total is appended"""
+    header = server_timing([("parse", 0.002), ("convert", 0.001), ("parse", 0.001)], 0.01)
+    assert header == "parse;dur=3.00, convert;dur=1.00, total;dur=10.00"
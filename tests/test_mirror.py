@@ -0,0 +1,104 @@
+"""Vault mirror tests"""
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.cli import main
+from app.services.gff_converter import GffConverter
+from app.services.gff_parser import GffParser
+from app.services.mirror import MANIFEST_NAME, MirrorError, SourceFile, VaultMirror
+from tests.gff_samples import creature_gff, simple_gff
+
+
+@pytest.fixture
+def vault(tmp_path):
+    directory = tmp_path / "servervault"
+    (directory / "alice").mkdir(parents=True)
+    (directory / "alice" / "goblin.bic").write_bytes(creature_gff())
+    (directory / "alice" / "simple.bic").write_bytes(simple_gff())
+    (directory / "broken.bic").write_bytes(b"not a gff")
+    (directory / "notes.txt").write_bytes(b"ignored")
+    return directory
+
+
+def test_sync_is_incremental(vault, tmp_path):
+    """Test that only new or changed files are converted and removed ones unmirrored"""
+    dest = tmp_path / "mirror"
+    mirror = VaultMirror(str(vault), str(dest))
+    stats = mirror.sync()
+    assert (stats["converted"], stats["unchanged"], stats["removed"], stats["failed"]) == (2, 0, 0, 1)
+    assert stats["errors"][0]["file"] == "broken.bic"
+    
+    expected = GffConverter().to_json(GffParser().read_gff_root(creature_gff()))
+    assert json.loads((dest / "alice" / "goblin.bic.json").read_bytes()) == json.loads(json.dumps(expected))
+    assert (dest / MANIFEST_NAME).exists()
+    
+    # A fresh instance picks the manifest up; nothing is converted again
+    stats = VaultMirror(str(vault), str(dest)).sync()
+    assert (stats["converted"], stats["unchanged"], stats["failed"]) == (0, 3, 0)
+    
+    # Touched but identical content is not reconverted
+    os.utime(vault / "alice" / "goblin.bic", ns=(0, 0))
+    assert mirror.sync()["unchanged"] == 3
+    
+    (vault / "alice" / "simple.bic").write_bytes(creature_gff())
+    assert mirror.sync()["converted"] == 1
+    
+    # A deleted mirror is rebuilt even though the source did not change
+    (dest / "alice" / "simple.bic.json").unlink()
+    assert mirror.sync()["converted"] == 1
+    
+    (vault / "alice" / "goblin.bic").unlink()
+    (vault / "alice" / "simple.bic").unlink()
+    (vault / "broken.bic").unlink()
+    stats = mirror.sync()
+    assert stats["removed"] == 3
+    assert not (dest / "alice").exists()
+
+
+def test_sync_with_executor(vault, tmp_path):
+    """Test that conversions on an executor give the same mirror"""
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        stats = VaultMirror(str(vault), str(tmp_path / "mirror"), executor=executor, window=1).sync()
+    assert (stats["converted"], stats["failed"]) == (2, 1)
+    assert (tmp_path / "mirror" / "alice" / "simple.bic.json").exists()
+
+
+def test_convert_draws_files_lazily(vault, tmp_path):
+    """Test that changed files are converted while the walk goes on, window at a time"""
+    drawn = []
+
+    def jobs():
+        for name in ("a.bic", "b.bic", "c.bic"):
+            drawn.append(name)
+            yield SourceFile(name, name, 0, 0), name, simple_gff()
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        mirror = VaultMirror(str(vault), str(tmp_path / "mirror"), executor=executor, window=1)
+        results = mirror._convert(jobs())
+        (source_file, _), (_, ok, _) = next(results)
+        assert ok and source_file.name == "a.bic"
+        assert drawn == ["a.bic", "b.bic"]
+        assert [source_file.name for (source_file, _), _ in results] == ["b.bic", "c.bic"]
+
+
+def test_invalid_setup(vault, tmp_path):
+    """Test that a missing source, nested mirror or non-GFF extension is rejected"""
+    with pytest.raises(MirrorError):
+        VaultMirror(str(tmp_path / "missing"), str(tmp_path / "mirror"))
+    with pytest.raises(MirrorError):
+        VaultMirror(str(vault), str(vault / "mirror"))
+    with pytest.raises(MirrorError):
+        VaultMirror(str(vault), str(tmp_path / "mirror"), extensions=["txt"])
+
+
+def test_cli_mirror(vault, tmp_path, capsys):
+    """Test the mirror subcommand's summary and exit status"""
+    assert main(["mirror", str(vault), str(tmp_path / "mirror"), "--workers", "1", "--json"]) == 1
+    assert json.loads(capsys.readouterr().out)["converted"] == 2
+    
+    (vault / "broken.bic").unlink()
+    assert main(["mirror", str(vault), str(tmp_path / "mirror"), "--workers", "1"]) == 0
+    assert "0 converted, 2 unchanged, 1 removed" in capsys.readouterr().out
@@ -0,0 +1,54 @@
+"""MessagePack codec tests"""
+import struct
+
+import pytest
+from app.services.msgpack_codec import MsgpackError, accepts_msgpack, packb, unpackb
+
+
+@pytest.mark.parametrize("value", [
+    None, True, False, 0, 127, 128, 255, 65535, 2 ** 32, 2 ** 64 - 1,
+    -1, -32, -33, -129, -32769, -2 ** 63,
+    1.5, "", "x" * 31, "y" * 32, "é" * 300, b"", b"\x00" * 70000,
+    [], list(range(16)), {"a": {"b": [1, {"c": None}]}}, {str(i): i for i in range(20)},
+])
+def test_round_trip(value):
+    """Test that every encoded width decodes to the original value"""
+    assert unpackb(packb(value)) == value
+
+
+def test_known_encodings():
+    """Test a few encodings against the MessagePack spec"""
+    assert packb(-1) == b"\xff"
+    assert packb(200) == b"\xcc\xc8"
+    assert packb("abc") == b"\xa3abc"
+    assert packb([1, 2]) == b"\x92\x01\x02"
+    assert packb({"a": 1}) == b"\x81\xa1a\x01"
+    assert unpackb(b"\xca" + struct.pack(">f", 0.25)) == 0.25
+
+
+@pytest.mark.parametrize("data", [b"", b"\xa3ab", b"\x92\x01", b"\x01\x02", b"\xc1", b"\xd4\x00\x00"])
+def test_malformed_input(data):
+    """Test truncated, trailing and unsupported data"""
+    with pytest.raises(MsgpackError):
+        unpackb(data)
+
+
+def test_unencodable_values():
+    with pytest.raises(MsgpackError):
+        packb(2 ** 64)
+    with pytest.raises(MsgpackError):
+        packb({1, 2})
+
+
+def test_object_pairs_hook():
+    data = b"\x82\xa1a\x01\xa1a\x02"  # {"a": 1, "a": 2}
+    assert unpackb(data) == {"a": 2}
+    assert unpackb(data, object_pairs_hook=list) == [("a", 1), ("a", 2)]
+
+
+def test_accept_negotiation():
+    assert accepts_msgpack("application/msgpack")
+    assert accepts_msgpack("application/json;q=0.5, application/x-msgpack")
+    assert not accepts_msgpack(None)
+    assert not accepts_msgpack("*/*")
+    assert not accepts_msgpack("application/json, application/msgpack;q=0.9")
@@ -0,0 +1,68 @@
+"""Request profiling tests"""
+import cProfile
+import pstats
+
+from app.services.profiling import (
+    ProfileStore,
+    RequestProfile,
+    collapsed_stacks,
+    parse_profile_modes,
+    profiled_call,
+)
+
+
+def _work(n):
+    return sum(_square(i) for i in range(n))
+
+
+def _square(i):
+    return i * i
+
+
+def test_profiled_call_collects_stats():
+    """Test that a stage run under the profiler returns its value and stats"""
+    result = profiled_call(True, True, _work, 1000)
+    assert result.value == sum(i * i for i in range(1000))
+    assert any(name == "_square" for _, _, name in result.cpu_stats)
+    peak, top = result.memory
+    assert peak > 0
+    
+    profile = RequestProfile("POST", "/api/v1/convert/gff-to-json", cpu=True, memory=True)
+    profile.add_stage("parse", result)
+    profile.add_stage("convert", profiled_call(True, False, _work, 10))
+    assert profile.stages == ["parse", "convert"]
+    assert "_square" in profile.pstats_text()
+    assert "Peak traced memory" in profile.memory_text()
+
+
+def test_collapsed_stacks():
+    """Test that collapsed output nests callees under their callers"""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    _work(20000)
+    profiler.disable()
+    stats = pstats.Stats(profiler).stats
+    
+    lines = collapsed_stacks(stats).splitlines()
+    assert any("_work (test_profiling.py" in line and "_square (test_profiling.py" in line for line in lines)
+    for line in lines:
+        stack, value = line.rsplit(" ", 1)
+        assert int(value) > 0
+
+
+def test_profile_store_is_bounded():
+    """Test that only the most recent profiles are kept"""
+    store = ProfileStore(2)
+    profiles = [RequestProfile("POST", "/", cpu=True, memory=False) for _ in range(3)]
+    for profile in profiles:
+        store.add(profile)
+    assert store.get(profiles[0].id) is None
+    assert [entry["id"] for entry in store.list()] == [profiles[2].id, profiles[1].id]
+
+
+def test_parse_profile_modes():
+    """Test X-Profile values"""
+    assert parse_profile_modes("cpu") == (True, False)
+    assert parse_profile_modes("memory") == (False, True)
+    assert parse_profile_modes("cpu, memory") == (True, True)
+    assert parse_profile_modes("1") == (True, False)
@@ -0,0 +1,47 @@
+"""Conversion result cache tests"""
+from app.services import result_cache
+from app.services.result_cache import CachedResult, ConversionCache, LruCache, content_key
+
+
+def test_lru_byte_budget():
+    """Test that the LRU evicts least recently used entries by size"""
+    cache = LruCache(10)
+    cache.put("a", b"12345")
+    cache.put("b", b"12345")
+    assert cache.get("a") == b"12345"
+    cache.put("c", b"12345")
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.stats()["evictions"] == 1
+    cache.put("huge", b"x" * 11)
+    assert "huge" not in cache
+
+
+def test_content_key_includes_options():
+    """Test that options change the key"""
+    assert content_key(b"data", "gff-to-json") != content_key(b"data", "json-to-gff")
+    assert content_key(b"data", "gff-to-json") == content_key(memoryview(b"data"), "gff-to-json")
+
+
+def test_content_key_includes_format_version(monkeypatch):
+    """Test that results cached by an older output format are not reused"""
+    key = content_key(b"data", "gff-to-json")
+    monkeypatch.setattr(result_cache, "FORMAT_VERSION", result_cache.FORMAT_VERSION + 1)
+    assert content_key(b"data", "gff-to-json") != key
+
+
+def test_disk_tier(tmp_path):
+    """Test that results survive in the disk tier and are evicted by size"""
+    key_a = content_key(b"a")
+    key_b = content_key(b"b")
+    cache = ConversionCache(1024, disk_dir=str(tmp_path), disk_max_bytes=40)
+    cache.put(key_a, CachedResult("application/json", b"{}" * 8))
+    
+    reloaded = ConversionCache(1024, disk_dir=str(tmp_path), disk_max_bytes=40)
+    assert reloaded.get(key_a) == CachedResult("application/json", b"{}" * 8)
+    assert reloaded.stats()["disk"]["hits"] == 1
+    
+    reloaded.put(key_b, CachedResult("application/json", b"[]" * 8))
+    assert not (tmp_path / key_a).exists()
+    assert (tmp_path / key_b).exists()
+    assert reloaded.get("../" + key_a[3:]) is None
@@ -0,0 +1,105 @@
+"""SQLite embedding tests"""
+import sqlite3
+import zlib
+
+import pytest
+
+from app.models.gff_models import GffDataType
+from app.services.gff_parser import GffParser, GffWriter
+from app.services.sqlite_handler import SQLITE_FIELD, SqliteHandler, SqliteHandlerError
+from tests.gff_samples import creature_gff
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = tmp_path / "campaign.db"
+    with sqlite3.connect(str(path)) as db:
+        db.execute("CREATE TABLE vars (name TEXT, value INTEGER)")
+        db.executemany("INSERT INTO vars VALUES (?, ?)", [(f"v{i}", i) for i in range(500)])
+    data = path.read_bytes()
+    return data
+
+
+def test_embed_as_void_field(database):
+    """Test that the database is stored as a VOID field of the top-level struct"""
+    handler = SqliteHandler()
+    handler.chunk_size = 1024
+    embedded = handler.embed_sqlite(creature_gff(), database)
+    
+    root = GffParser().read_gff_root(embedded)
+    sqlite_field = root.top_level_struct.fields[SQLITE_FIELD]
+    assert sqlite_field.kind == GffDataType.GFF_VOID
+    assert zlib.decompress(sqlite_field.voidval) == database
+    assert root.top_level_struct.fields["Tag"].strval == "nw_goblin"
+    
+    assert handler.extract_sqlite(embedded) == database
+    assert handler.extract_sqlite(memoryview(embedded)) == database
+
+
+def test_embed_replaces_existing(database):
+    """Test that embedding twice keeps a single database"""
+    handler = SqliteHandler()
+    embedded = handler.embed_sqlite(handler.embed_sqlite(creature_gff(), b"old"), database)
+    
+    fields = GffParser().read_gff_root(embedded).top_level_struct.fields
+    assert list(fields).count(SQLITE_FIELD) == 1
+    assert handler.extract_sqlite(embedded) == database
+    # The old payload is dropped rather than left behind in the field data
+    assert len(embedded) == len(handler.embed_sqlite(creature_gff(), database))
+
+
+@pytest.mark.parametrize("top_level", [{}, {"Tag": "x"}, {"Tag": "x", "Gold": 5}])
+def test_embed_keeps_everything_else(database, top_level):
+    """Test that splicing in the field leaves the rest of the tree as it was"""
+    writer = GffWriter()
+    writer.begin_struct(0xFFFFFFFF)
+    for label, value in top_level.items():
+        writer.add_field(label, GffDataType.GFF_STRING if isinstance(value, str) else GffDataType.GFF_INT, value)
+    writer.begin_list("Items")
+    writer.begin_struct(1)
+    writer.add_field("Note", GffDataType.GFF_STRING, "kept")
+    writer.end_struct()
+    writer.end_list()
+    writer.end_struct()
+    original = writer.finish("IFO ")
+    
+    handler = SqliteHandler()
+    embedded = handler.embed_sqlite(original + b"SQL3" + zlib.compress(b"legacy"), database)
+    root = GffParser().read_gff_root(embedded)
+    expected = GffParser().read_gff_root(original)
+    sqlite_field = root.top_level_struct.fields.pop(SQLITE_FIELD)
+    assert root == expected
+    assert zlib.decompress(sqlite_field.voidval) == database
+    assert handler.extract_sqlite(embedded) == database
+
+
+def test_extract_missing_and_legacy(database):
+    """Test files without a database and files in the old appended layout"""
+    handler = SqliteHandler()
+    assert handler.extract_sqlite(creature_gff()) is None
+    
+    legacy = creature_gff() + b"SQL3" + zlib.compress(database)
+    assert handler.extract_sqlite(legacy) == database
+
+
+def test_extract_truncated(database):
+    """Test that a cut-off compressed stream is reported"""
+    handler = SqliteHandler()
+    legacy = creature_gff() + b"SQL3" + zlib.compress(database)[:-20]
+    with pytest.raises(SqliteHandlerError):
+        handler.extract_sqlite(legacy)
+
+
+def test_extract_size_cap(database):
+    """Test that a payload expanding past max_size is refused, in bounded chunks"""
+    bomb = creature_gff() + b"SQL3" + zlib.compress(bytes(8 * 1024 * 1024), 9)
+    handler = SqliteHandler(max_size=1024 * 1024)
+    handler.chunk_size = 64 * 1024
+    assert max(map(len, handler.iter_decompress(zlib.compress(database)))) <= handler.chunk_size
+    with pytest.raises(SqliteHandlerError, match="expands past 1048576 bytes"):
+        handler.extract_sqlite(bomb)
+    with pytest.raises(SqliteHandlerError, match="expands past"):
+        handler.decompress_data(zlib.compress(bytes(8 * 1024 * 1024), 9))
+    
+    handler.max_size = len(database)
+    assert handler.extract_sqlite(creature_gff() + b"SQL3" + zlib.compress(database)) == database
@@ -0,0 +1,65 @@
+"""Embedded SQLite query tests"""
+import json
+import sqlite3
+
+import pytest
+
+from app.services.sqlite_query import (
+    SqliteQueryError,
+    SqliteQueryTimeout,
+    iter_ndjson_rows,
+    open_database,
+    run_query,
+)
+
+
+@pytest.fixture
+def database():
+    source = sqlite3.connect(":memory:")
+    source.execute("CREATE TABLE vars (name TEXT, value INTEGER, blob BLOB)")
+    source.executemany("INSERT INTO vars VALUES (?, ?, ?)", [(f"v{i}", i, b"\x01\xff") for i in range(3)])
+    source.commit()
+    data = source.serialize()
+    source.close()
+    return data
+
+
+def test_query_rows(database):
+    """Test that rows come back as NDJSON objects"""
+    connection = open_database(database)
+    cursor = run_query(connection, "SELECT name, value, blob FROM vars WHERE value >= ?", [1])
+    lines = b"".join(iter_ndjson_rows(cursor, connection, batch_size=1)).splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {"name": "v1", "value": 1, "blob": "\x01\xff"},
+        {"name": "v2", "value": 2, "blob": "\x01\xff"},
+    ]
+
+
+@pytest.mark.parametrize("sql", [
+    "DELETE FROM vars",
+    "UPDATE vars SET value = 0",
+    "CREATE TABLE other (x)",
+    "ATTACH DATABASE 'other.db' AS other",
+    "PRAGMA writable_schema = ON",
+    "SELECT 1; DELETE FROM vars",
+])
+def test_query_is_read_only(database, sql):
+    """Test that anything but a single read is refused"""
+    connection = open_database(database)
+    with pytest.raises(SqliteQueryError):
+        run_query(connection, sql)
+    assert run_query(connection, "SELECT COUNT(*) FROM vars").fetchone() == (3,)
+
+
+def test_query_timeout(database):
+    """Test that long-running statements are interrupted"""
+    connection = open_database(database)
+    sql = "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) SELECT MAX(i) FROM n"
+    with pytest.raises(SqliteQueryTimeout):
+        run_query(connection, sql, timeout=0.05)
+
+
+def test_invalid_database():
+    """Test that data that is not a database is rejected"""
+    with pytest.raises(SqliteQueryError):
+        run_query(open_database(b"not a database" * 100), "SELECT 1 FROM sqlite_master")
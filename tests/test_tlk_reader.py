@@ -0,0 +1,87 @@
+"""Talk table reader and StrRef resolver tests"""
+import pickle
+
+import pytest
+
+from app.models.gff_models import GffDataType, GffField, GffLocString, GffRoot, GffStruct
+from app.services import tlk_reader
+from app.services.gff_converter import GffConverter
+from app.services.tlk_reader import TlkFile, TlkReaderError, TlkResolver
+from tests.gff_samples import pack_tlk
+
+
+def test_read_entries():
+    """Test that entries and text are read per StrRef"""
+    tlk = TlkFile(pack_tlk({0: "Bad Strref", 2: "Goblin"}))
+    assert len(tlk) == 3
+    assert tlk.text(0) == "Bad Strref"
+    assert tlk.text(1) is None
+    assert tlk.text(2) == "Goblin"
+    assert tlk.text(3) is None
+    entry = tlk.entry(2)
+    assert entry.text_present
+    assert entry.sound_resref == "vs_goblin"
+    assert entry.size == 6
+
+
+def test_invalid_files(tmp_path):
+    """Test that files that are not V3.0 talk tables are rejected"""
+    with pytest.raises(TlkReaderError):
+        TlkFile(b"TLK ")
+    with pytest.raises(TlkReaderError):
+        TlkFile(b"GFF V3.2" + bytes(12))
+    with pytest.raises(TlkReaderError):
+        TlkFile(pack_tlk({0: "a", 1: "b"})[:50])
+    (tmp_path / "empty.tlk").write_bytes(b"")
+    with pytest.raises(TlkReaderError):
+        TlkFile.open(str(tmp_path / "empty.tlk"))
+
+
+def test_resolver(tmp_path):
+    """Test that StrRefs resolve against dialog.tlk or the custom table, and are cached"""
+    (tmp_path / "dialog.tlk").write_bytes(pack_tlk({1: "Goblin"}))
+    (tmp_path / "custom.tlk").write_bytes(pack_tlk({0: "Chieftain"}))
+    resolver = TlkResolver.open(str(tmp_path / "dialog.tlk"), str(tmp_path / "custom.tlk"))
+    try:
+        assert resolver.resolve(1) == "Goblin"
+        assert resolver.resolve(0x01000000) == "Chieftain"
+        assert resolver.resolve(0) is None
+        assert resolver.resolve(0xFFFFFFFF) is None
+        assert resolver.cache.get("1") == "Goblin"
+        assert resolver.cache.get("0") is None
+    finally:
+        resolver.close()
+
+    resolver = TlkResolver(TlkFile(pack_tlk({1: "Goblin"})))
+    assert resolver.resolve(0x01000001) is None
+
+
+def test_pickle(tmp_path, monkeypatch):
+    """Test that resolvers reach process workers as one shared resolver per process"""
+    monkeypatch.setattr(tlk_reader, "_shared", {})
+    path = str(tmp_path / "dialog.tlk")
+    (tmp_path / "dialog.tlk").write_bytes(pack_tlk({1: "Goblin"}))
+    resolver = tlk_reader.shared_resolver(path)
+    assert pickle.loads(pickle.dumps(resolver)) is resolver
+
+    with pytest.raises(TypeError):
+        pickle.dumps(TlkResolver(TlkFile(pack_tlk({}))))
+
+
+def test_converter_inlines_text():
+    """Test that a converter with a resolver adds the StrRef's text to CExoLocStrings"""
+    fields = {
+        "FirstName": GffField(GffDataType.GFF_LOCSTRING, locval=GffLocString(1, {0: "Grub"})),
+        "LastName": GffField(GffDataType.GFF_LOCSTRING, locval=GffLocString(5)),
+        "Description": GffField(GffDataType.GFF_LOCSTRING, locval=GffLocString()),
+    }
+    root = GffRoot(structs=[], top_level_struct=GffStruct(0xFFFFFFFF, fields), file_type="UTC ")
+    converter = GffConverter(tlk=TlkResolver(TlkFile(pack_tlk({1: "Goblin"}))))
+
+    document = converter.to_json(root)
+    assert document["FirstName"] == {"0": "Grub", "id": 1, "tlk": "Goblin"}
+    assert document["LastName"] == {"id": 5}
+    assert document["Description"] == {}
+    assert converter.to_json_bytes(root) == (
+        b'{"Description":{},"FirstName":{"0":"Grub","id":1,"tlk":"Goblin"},"LastName":{"id":5}}'
+    )
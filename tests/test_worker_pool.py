@@ -0,0 +1,55 @@
+"""Worker pool tests"""
+import asyncio
+import threading
+
+import pytest
+
+from app.services.worker_pool import WorkerPool, WorkerPoolFull, WorkerTimeout
+
+
+def test_run_returns_result():
+    """Test that stages run on the pool and return their result"""
+    pool = WorkerPool(max_workers=2)
+    try:
+        result = asyncio.run(pool.run("parse", threading.current_thread))
+        assert result is not threading.main_thread()
+        assert pool.pending == 0
+    finally:
+        pool.shutdown()
+
+
+def test_full_queue_rejects():
+    """Test that submissions beyond max_pending fail fast"""
+    pool = WorkerPool(max_workers=1, max_pending=1, retry_after=7)
+    gate = threading.Event()
+
+    async def scenario():
+        first = asyncio.ensure_future(pool.run("parse", gate.wait))
+        await asyncio.sleep(0.01)
+        with pytest.raises(WorkerPoolFull) as exc_info:
+            await pool.run("parse", gate.wait)
+        assert exc_info.value.retry_after == 7
+        gate.set()
+        await first
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        pool.shutdown()
+
+
+def test_stage_timeout():
+    """Test that a slow stage times out but keeps its slot until it finishes"""
+    pool = WorkerPool(max_workers=1, max_pending=2, timeouts={"parse": 0.01})
+    gate = threading.Event()
+
+    async def scenario():
+        with pytest.raises(WorkerTimeout):
+            await pool.run("parse", gate.wait)
+        assert pool.pending == 1
+        gate.set()
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        pool.shutdown()